@@ -0,0 +1,4 @@
+from tu_bs_scripts.quick_cli import quick_run
+
+# 'python -m tu_bs_scripts <name> <args...>' only imports the module that owns the command
+quick_run()
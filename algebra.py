@@ -1,107 +1,312 @@
 from dataclasses import dataclass, field
 from itertools import batched
-from math import ceil, floor, log10, sqrt
+from math import floor, gcd, isqrt, log10
 
-from colorama import Fore, Style
-from tabulate import tabulate
-
-from tu_bs_scripts.quick_cli import cli, quick_run
+from tu_bs_scripts.euclid import LEHMER_WORD, batch_gcd, binary_gcd, lehmer_gcd, lehmer_step
+from tu_bs_scripts.inputs import read_numbers, read_tokens
+from tu_bs_scripts.primes import fermat, is_probable_prime, lehman, prime_segments
+from tu_bs_scripts.quick_cli import COUNTERS, cli, quick_run
+from tu_bs_scripts.radix import check_base, from_base, to_base
+from tu_bs_scripts.render import OUTPUT, Table, emit, trace_print, tracing
 
 TABLE_FORMAT: str = "presto"
 
 
+# subtraction steps shown by euklid-old, the rest is left to the binary gcd
+EUKLID_OLD_TRACE_LIMIT: int = 1000
+
+
 @cli
 def euklid_old(a: int, b: int) -> int:
-    data: list[tuple[int, int]] = []
+    table: Table = Table(("a", "b"), tablefmt=TABLE_FORMAT)
+    
+    a, b = abs(a), abs(b)
+    if not table.enabled:
+        # the same result without one step per subtraction
+        return binary_gcd(a, b)
     
     if a == 0:
         return b
-    while b != 0:
+    
+    steps: int = 0
+    while b != 0 and steps < EUKLID_OLD_TRACE_LIMIT:
         if a > b:
             a = a - b
         else:
             b = b - a
-        data.append((a, b))
+        steps += 1
+        table.add((a, b))
+    
+    COUNTERS["euklid-old.iterations"] += steps
+    table.show()
+    
+    if b != 0:
+        trace_print(f"stopped after {steps} subtractions, the binary gcd finishes")
+        return binary_gcd(a, b)
+    
+    return a
+
+
+@cli("euklid-binary")
+def euklid_binary(a: int, b: int) -> int:
+    table: Table = Table(("a", "b", "halvings"), tablefmt=TABLE_FORMAT)
+    
+    a, b = abs(a), abs(b)
+    if not table.enabled:
+        return binary_gcd(a, b)
+    
+    if a == 0 or b == 0:
+        return a | b
+    
+    shift: int = ((a | b) & -(a | b)).bit_length() - 1
+    trace_print(f"common factor 2^{shift}")
+    a >>= (a & -a).bit_length() - 1
     
-    print(tabulate(data, headers=("a", "b"), tablefmt=TABLE_FORMAT))
+    while b != 0:
+        halvings: int = (b & -b).bit_length() - 1
+        b >>= halvings
+        if a > b:
+            a, b = b, a
+        b -= a
+        table.add((a, b, halvings))
+    
+    table.show()
+    return a << shift
+
+
+@cli("euklid-lehmer")
+def euklid_lehmer(a: int, b: int) -> int:
+    table: Table = Table(("a", "b", "step"), tablefmt=TABLE_FORMAT)
+    
+    if not table.enabled:
+        return lehmer_gcd(a, b)
+    
+    a, b = abs(a), abs(b)
+    if a < b:
+        a, b = b, a
+    
+    while b.bit_length() > LEHMER_WORD:
+        matrix: tuple[int, int, int, int] | None = lehmer_step(a, b)
+        
+        if matrix is None:
+            a, b = b, a % b
+            table.add((a, b, "mod"))
+        else:
+            big_a, big_b, big_c, big_d = matrix
+            a, b = big_a * a + big_b * b, big_c * a + big_d * b
+            table.add((a, b, f"[{big_a} {big_b}; {big_c} {big_d}]"))
+    
+    while b != 0:
+        a, b = b, a % b
+        table.add((a, b, "mod"))
+    
+    table.show()
     return a
 
 
+@cli("batch-gcd")
+def batch_gcd_file(path: str) -> dict[int, int]:
+    # moduli sharing a factor with any other one, with that shared part
+    moduli: list[int] = list(read_numbers(path))
+    
+    return { m: g for m, g in zip(moduli, batch_gcd(moduli)) if g > 1 }
+
+
 @cli
 def euklid_modern(a: int, b: int) -> int:
-    data: list[tuple[int, int, int]] = []
+    table: Table = Table(("a", "b", "mod"), tablefmt=TABLE_FORMAT)
     
     while b != 0:
         h: int = a % b
         a = b
         b = h
-        data.append((a, b, h))
+        COUNTERS["euklid-modern.iterations"] += 1
+        if table.enabled:
+            table.add((a, b, h))
     
-    print(tabulate(data, headers=("a", "b", "mod"), tablefmt=TABLE_FORMAT))
+    table.show()
     return a
 
 
+# above this many digits, the division table is left out
+BASE_CHANGE_TEACHING_DIGITS: int = 64
+
+
+def format_in_base(value: int, base: int) -> str:
+    # hexadecimal keeps its usual prefix
+    digits: str = to_base(abs(value), base)
+    return ("-" if value < 0 else "") + ("0x" if base == 16 else "") + digits
+
+
 @cli
 def base_change(number: str | int, source_base: int, target_base: int) -> str:
-    data: list[tuple[int, int, int, int]] = []
-    values: list[int] = []
+    try:
+        check_base(source_base)
+        check_base(target_base)
+    except ValueError as e:
+        print(e)
+        exit(1)
     
-    rest: int = int(str(number), source_base)
-    if source_base != 10:
+    rest: int = from_base(str(number), source_base)
+    if source_base != 10 and tracing():
         print(f"necessary conversion: ({number}){source_base} to ({rest})10")
         print()
     
-    while rest != 0:
-        rest_save: int = rest
-        rest, mod = divmod(rest, target_base)
-        data.append((rest_save, target_base, rest, mod))
-        values.append(mod)
+    table: Table = Table(("current", "/ base", "= div", "% mod"), tablefmt="plain")
     
-    print(tabulate(data, headers=("current", "/ base", "= div", "% mod"), tablefmt="plain"))
+    # the table shows the classic way, the result itself comes from to_base
+    if table.enabled and abs(rest) < target_base ** BASE_CHANGE_TEACHING_DIGITS:
+        current: int = abs(rest)
+        while current != 0:
+            quotient, mod = divmod(current, target_base)
+            table.add((current, target_base, quotient, mod))
+            current = quotient
+        
+        table.show()
     
-    values.reverse()
-    if target_base <= 10:
-        # a number can be created nicely
-        return "".join([str(value) for value in values])
-    elif target_base == 16:
-        # hex returns '0x...', so it must be stripped
-        return "0x" + "".join([hex(value)[2:].upper() for value in values])
-    else:
-        # fallback: just dump the array
-        return repr(values)
+    return format_in_base(rest, target_base)
+
+
+@cli("base-change-batch")
+def base_change_batch(source_base: int, target_base: int, path: str = "-") -> int:
+    try:
+        check_base(source_base)
+        check_base(target_base)
+    except ValueError as e:
+        print(e)
+        exit(1)
+    
+    # one number per token, converted and written right away
+    count: int = 0
+    for token in read_tokens(path):
+        emit(format_in_base(from_base(token, source_base), target_base))
+        count += 1
+    
+    return count
+
+
+# rows of the fermat trace, longer searches only show their beginning and their end
+FERMAT_TRACE_LIMIT: int = 100
 
 
 @cli("fermat-factor")
-def fermat_factorization(n: int) -> tuple[int, int]:
-    data: list[tuple[int, int]] = []
+def fermat_factorization(n: int, multiplier: int = 1) -> tuple[int, int]:
+    if n < 2:
+        # 1 is neither prime nor a product of two factors
+        print("n must be at least 2")
+        exit(1)
+    if multiplier < 1:
+        print("the multiplier must be positive")
+        exit(1)
+    
+    if is_probable_prime(n):
+        trace_print(n, "is prime")
+        return n, 1
+    
+    if n % 4 == 2:
+        # no difference of squares, fermat would never stop
+        trace_print("n is 2 mod 4, splitting off 2")
+        return n // 2, 2
+    
+    shared: int = gcd(multiplier, n)
+    if shared == n:
+        print("the multiplier must not be a multiple of n")
+        exit(1)
+    if shared > 1:
+        trace_print("the multiplier shares the factor", shared)
+        return n // shared, shared
     
-    x: int = ceil(sqrt(n))
-    r: int = x ** 2 - n
+    # with a multiplier k, 4kn = (x - y)(x + y) is searched instead, which suits factors far from sqrt(n)
+    target: int = n if multiplier == 1 else 4 * multiplier * n
+    # x - y and x + y are both even for 4kn, (x + y) / 2 is the factor of kn
+    halves: int = 1 if multiplier == 1 else 2
     
-    data.append((x, r))
+    x, y, steps = fermat(target)
+    # the representation may put all of n on one side, the search then continues
+    while not 1 < gcd((x + y) // halves, n) < n:
+        x, y, more_steps = fermat(target, x + 1)
+        steps += more_steps + 1
     
-    while not sqrt(r).is_integer():
-        r = r + 2 * x + 1
-        x = x + 1
+    COUNTERS["fermat.iterations"] += steps
+    
+    table: Table = Table(("x", "r"), tablefmt=TABLE_FORMAT, showindex=True)
+    if table.enabled:
+        # only the first steps are replayed, the table stays small for any amount of steps
+        row_x: int = isqrt(target - 1) + 1
+        row_r: int = row_x * row_x - target
+        
+        for _ in range(min(steps, FERMAT_TRACE_LIMIT)):
+            table.add((row_x, row_r))
+            row_r += 2 * row_x + 1
+            row_x += 1
         
-        data.append((x, r))
+        if steps > FERMAT_TRACE_LIMIT:
+            table.add(("...", f"{steps - FERMAT_TRACE_LIMIT} steps more"))
+        table.add((x, y * y))
+        
+        table.show()
+    
+    trace_print("y =", y)
     
-    print(tabulate(data, headers=("x", "r"), tablefmt=TABLE_FORMAT, showindex=True))
+    a: int = gcd((x + y) // halves, n)
+    b: int = n // a
     
-    y: int = int(sqrt(r))
+    trace_print(f"verifying: {a} * {b} = {a * b}")
     
-    print("y =", y)
+    return max(a, b), min(a, b)
+
+
+@cli("lehman-factor")
+def lehman_factorization(n: int) -> tuple[int, int]:
+    if n < 2:
+        print("n must be at least 2")
+        exit(1)
     
-    a: int = x + y
-    b: int = x - y
+    # lehman would need n^(1/3) steps to find nothing
+    a: int = n if is_probable_prime(n) else lehman(n)
+    b: int = n // a
     
-    print(f"verifying: {a} * {b} = {a * b}")
+    trace_print(f"verifying: {a} * {b} = {a * b}")
     
-    return a, b
+    return max(a, b), min(a, b)
+
+
+# above this, the step-by-step tables are unreadable anyway
+SIEVE_TEACHING_LIMIT: int = 1000
 
 
 @cli("sieve")
-def sieve_of_eratosthenes(n: int) -> list[int]:
+@cli("sieve-q", default_kwargs={ "quiet": True })
+def sieve_of_eratosthenes(n: int, *, quiet: bool = False) -> list[int] | int:
+    if quiet or n > SIEVE_TEACHING_LIMIT:
+        if not quiet:
+            trace_print(f"n is larger than {SIEVE_TEACHING_LIMIT}, streaming primes without the sieve steps")
+        
+        # stream the primes segment by segment, returning the amount instead of a giant list
+        text: bool = OUTPUT.get().format == "text"
+        count: int = 0
+        line: list[int] = []
+        for segment in prime_segments(2, n + 1):
+            count += len(segment)
+            
+            if not text:
+                # one item per prime, so every record of the machine formats has the same shape
+                for prime in segment:
+                    emit(prime)
+                continue
+            
+            # a line per segment, a line per prime would make the text output several times slower.
+            # 2 is a segment of its own and goes on the line of the next one
+            line += segment
+            if line and line != [2]:
+                emit(line, " ".join(map(str, line)))
+                line = []
+        
+        if line:
+            emit(line, " ".join(map(str, line)))
+        
+        return count
+    
     numbers: list[int] = list(range(2, n + 1))
     primes: list[int] = []
     
@@ -110,25 +315,26 @@ def sieve_of_eratosthenes(n: int) -> list[int]:
         primes.append(prime)
         
         multiplicatives: list[int] = list(range(prime, n + 1, prime))
-        numbers = [number for number in numbers if number not in multiplicatives]
+        filtered: set[int] = set(multiplicatives)
+        numbers = [number for number in numbers if number not in filtered]
         
-        print(
-            tabulate(
-                [
-                    (f"current sieve: {prime}", multiplicatives),
-                    ("remaining numbers", numbers),
-                    ("primes", primes),
-                ],
-                tablefmt="plain",
-            ),
-        )
-        print()
+        table: Table = Table((), tablefmt="plain")
+        if table.enabled:
+            table.add((f"current sieve: {prime}", multiplicatives))
+            table.add(("remaining numbers", numbers))
+            # copied, the list keeps growing after this step
+            table.add(("primes", list(primes)))
+            table.show()
+            print()
     
     return primes
 
 
 @cli("sieve-colour")
 def sieve_of_eratosthenes(n: int) -> list[int]:
+    # only this command needs colours
+    from colorama import Fore, Style
+    
     max_length: int = floor(log10(n)) + 1
     
     @dataclass
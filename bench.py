@@ -0,0 +1,400 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import nullcontext, redirect_stdout
+from dataclasses import dataclass
+from pathlib import Path
+from random import Random
+from typing import Any, Callable
+
+from tu_bs_scripts.primes import is_probable_prime
+from tu_bs_scripts.quick_cli import Function, convert_if_possible, pop_option, registered_functions, run_warmup
+from tu_bs_scripts.registry import import_modules
+from tu_bs_scripts.render import quiet, tabulate
+
+# same seed every run, so two result files measure the same inputs
+SEED: int = 0x7B5
+
+# slower than this, the larger sizes of a command are skipped
+MAX_SECONDS: float = 5.0
+
+# new / old time (or memory) above this is a regression, below its inverse an improvement
+REGRESSION_THRESHOLD: float = 1.25
+
+
+def random_number(bits: int, rng: Random) -> int:
+    # exactly `bits` bits long
+    return rng.getrandbits(bits) | (1 << (bits - 1))
+
+
+def random_prime(bits: int, rng: Random) -> int:
+    while not is_probable_prime(n := random_number(bits, rng) | 1):
+        pass
+    
+    return n
+
+
+def next_prime(n: int) -> int:
+    while not is_probable_prime(n := n + 1):
+        pass
+    
+    return n
+
+
+def coprime_moduli(count: int, bits: int, rng: Random) -> list[int]:
+    # distinct primes are always coprime
+    moduli: set[int] = set()
+    while len(moduli) < count:
+        moduli.add(random_prime(bits, rng))
+    
+    return sorted(moduli)
+
+
+def random_congruences(count: int, bits: int, rng: Random) -> list[str]:
+    return [f"{rng.randrange(m)}:{m}" for m in coprime_moduli(count, bits, rng)]
+
+
+def close_semiprime(bits: int, rng: Random) -> int:
+    # factors about 2^(bits / 4) apart, fermat needs only a few steps for those
+    p: int = random_prime(bits // 2, rng)
+    return p * next_prime(p + rng.getrandbits(max(bits // 4, 1)))
+
+
+def pair(bits: int, rng: Random, _: Path) -> list[str]:
+    return [str(random_number(bits, rng)), str(random_number(bits, rng))]
+
+
+def pair_with_iterations(bits: int, rng: Random, directory: Path) -> list[str]:
+    # euclid needs less than 1.5 iterations per bit, the default maximum of 100 is too low for large numbers
+    return [*pair(bits, rng, directory), str(2 * bits + 10)]
+
+
+def matrix_rows(n: int, rng: Random, extra_column: bool = False) -> list[str]:
+    # n x n entries of 32 bits, with the right side of a system as one more column
+    columns: int = n + 1 if extra_column else n
+    return [",".join(str(rng.getrandbits(32) - (1 << 31)) for _ in range(columns)) for _ in range(n)]
+
+
+def matrix_rows_mod(n: int, rng: Random, extra_column: bool = False) -> list[str]:
+    return [str(random_prime(61, rng)), *matrix_rows(n, rng, extra_column)]
+
+
+def write_lines(directory: Path, name: str, lines: list[str]) -> str:
+    path: Path = directory / name
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+@dataclass(frozen=True)
+class Workload:
+    # bit lengths or amounts, depending on the command
+    sizes: tuple[int, ...]
+    # size, rng and a temporary directory for input files to the arguments of the command
+    arguments: Callable[[int, Random, Path], list[str]]
+    # sizes measured with tracing as well, for commands whose explanations cost more than the result. explanations
+    # grow faster than the results, so these are usually smaller (and the teaching euclid gives up on large ones)
+    traced_sizes: tuple[int, ...] = ()
+
+
+WORKLOADS: dict[str, Workload] = {
+    "base-change": Workload(
+        (64, 8192, 1 << 17),
+        lambda bits, rng, _: [str(random_number(bits, rng)), "10", "7"],
+        traced_sizes=(64, 8192),
+    ),
+    "base-change-batch": Workload(
+        (64, 1024, 8192),
+        lambda bits, rng, directory: [
+            "10",
+            "36",
+            write_lines(directory, "numbers.txt", [str(random_number(bits, rng)) for _ in range(1000)]),
+        ],
+    ),
+    "batch-gcd": Workload(
+        (100, 1000, 5000),
+        lambda n, rng, directory: [
+            write_lines(directory, "moduli.txt", [str(random_number(256, rng) | 1) for _ in range(n)]),
+        ],
+    ),
+    "binom": Workload((100, 1000, 10_000), lambda n, rng, _: [str(n), str(n // 2)]),
+    "chin": Workload(
+        (16, 64, 256),
+        lambda bits, rng, _: random_congruences(8, bits, rng),
+        traced_sizes=(16, 64),
+    ),
+    "chin-alg": Workload(
+        (16, 64, 256),
+        lambda bits, rng, _: random_congruences(8, bits, rng),
+        traced_sizes=(16, 64),
+    ),
+    "chin-alg-q": Workload((16, 64, 256), lambda bits, rng, _: random_congruences(8, bits, rng)),
+    "chin-q": Workload((16, 64, 256), lambda bits, rng, _: random_congruences(8, bits, rng)),
+    "chin-batch": Workload(
+        (16, 64, 256),
+        lambda bits, rng, directory: [
+            write_lines(directory, "remainders.txt", [
+                " ".join(str(rng.getrandbits(bits - 1)) for _ in range(8)) for _ in range(1000)
+            ]),
+            *[str(m) for m in coprime_moduli(8, bits, rng)],
+        ],
+    ),
+    "collatz": Workload((10, 100, 1000), lambda n, rng, _: ["1", str(n)]),
+    "collatz-numpy": Workload((10_000, 100_000, 1_000_000), lambda n, rng, _: ["1", str(n)]),
+    "collatz-numpy-glide": Workload((10_000, 100_000, 1_000_000), lambda n, rng, _: ["1", str(n)]),
+    "collatz-parallel": Workload((10_000, 100_000, 1_000_000), lambda n, rng, _: ["1", str(n)]),
+    "collatz-summary": Workload((10_000, 100_000, 1_000_000), lambda n, rng, _: ["1", str(n)]),
+    "collatz-summary-q": Workload((10_000, 100_000, 1_000_000), lambda n, rng, _: ["1", str(n)]),
+    "euklid-modern": Workload((64, 1024, 8192), pair, traced_sizes=(64, 1024)),
+    "euklid-binary": Workload((64, 1024, 8192), pair, traced_sizes=(64, 1024)),
+    "euklid-lehmer": Workload((64, 1024, 8192), pair, traced_sizes=(64, 1024)),
+    "euklid-old": Workload((64, 1024, 8192), pair, traced_sizes=(64, 1024)),
+    "fermat-factor": Workload(
+        (32, 128, 512),
+        lambda bits, rng, _: [str(close_semiprime(bits, rng))],
+        traced_sizes=(32, 128),
+    ),
+    "ggt": Workload((64, 1024, 8192), pair_with_iterations, traced_sizes=(64, 1024)),
+    "ggt-ext": Workload((64, 1024, 8192), pair_with_iterations, traced_sizes=(64, 1024)),
+    "ggt-multi": Workload((64, 1024, 8192), pair_with_iterations, traced_sizes=(64, 256)),
+    "inverse-batch": Workload(
+        (100, 1000, 10_000),
+        lambda n, rng, _: [str(p := random_prime(256, rng)), *[str(rng.randrange(1, p)) for _ in range(n)]],
+    ),
+    "is-prime": Workload((64, 256, 1024, 4096), lambda bits, rng, _: [str(random_prime(bits, rng))]),
+    "is-prime-batch": Workload(
+        (64, 256, 1024),
+        lambda bits, rng, _: [str(random_number(bits, rng) | 1) for _ in range(100)],
+    ),
+    "is-prime-range": Workload(
+        (32, 64, 128),
+        lambda bits, rng, _: [str(start := random_number(bits, rng)), str(start + 100_000)],
+    ),
+    "kgv": Workload((64, 1024, 8192), lambda bits, rng, _: [str(random_number(bits, rng)) for _ in range(100)]),
+    "kgv-file": Workload(
+        (100, 1000, 10_000),
+        lambda n, rng, directory: [
+            write_lines(directory, "numbers.txt", [str(random_number(64, rng)) for _ in range(n)]),
+        ],
+    ),
+    "kgv-table": Workload(
+        (16, 32, 48),
+        lambda bits, rng, _: [str(random_number(bits, rng)) for _ in range(10)],
+        traced_sizes=(16, 32, 48),
+    ),
+    "lehman-factor": Workload(
+        (24, 36, 48),
+        lambda bits, rng, _: [str(random_prime(bits // 3, rng) * random_prime(bits - bits // 3, rng))],
+    ),
+    "matrix-det": Workload((4, 16, 48), lambda n, rng, _: matrix_rows(n, rng)),
+    "matrix-det-float": Workload((4, 16, 64), lambda n, rng, _: matrix_rows(n, rng)),
+    "matrix-det-mod": Workload((4, 16, 64), lambda n, rng, _: matrix_rows_mod(n, rng)),
+    "matrix-inverse": Workload((4, 16, 32), lambda n, rng, _: matrix_rows(n, rng)),
+    "matrix-inverse-float": Workload((4, 16, 64), lambda n, rng, _: matrix_rows(n, rng)),
+    "matrix-inverse-mod": Workload((4, 16, 64), lambda n, rng, _: matrix_rows_mod(n, rng)),
+    "matrix-rank": Workload((4, 16, 48), lambda n, rng, _: matrix_rows(n, rng)),
+    "matrix-rank-float": Workload((4, 16, 64), lambda n, rng, _: matrix_rows(n, rng)),
+    "matrix-rank-mod": Workload((4, 16, 64), lambda n, rng, _: matrix_rows_mod(n, rng)),
+    "matrix-solve": Workload((4, 16, 48), lambda n, rng, _: matrix_rows(n, rng, extra_column=True)),
+    "matrix-solve-float": Workload((4, 16, 64), lambda n, rng, _: matrix_rows(n, rng, extra_column=True)),
+    "matrix-solve-mod": Workload((4, 16, 64), lambda n, rng, _: matrix_rows_mod(n, rng, extra_column=True)),
+    "multinom": Workload((100, 1000, 10_000), lambda n, rng, _: [str(n), *[str(n // 4)] * 3, str(n - 3 * (n // 4))]),
+    "prime-decomp": Workload((32, 48, 64), lambda bits, rng, _: [str(close_semiprime(bits, rng) * 12)]),
+    "recurrence": Workload(
+        (1000, 10_000, 100_000),
+        lambda n, rng, _: ["1,1", "0,1", *[str(rng.randrange(n)) for _ in range(10)]],
+    ),
+    "recurrence-mod": Workload(
+        (2, 8, 32),
+        lambda k, rng, _: [
+            str(random_prime(61, rng)),
+            ",".join(str(rng.getrandbits(16)) for _ in range(k)),
+            ",".join(str(rng.getrandbits(16)) for _ in range(k)),
+            *[str(rng.getrandbits(60)) for _ in range(90)],
+        ],
+    ),
+    "sieve": Workload((100, 1000, 100_000, 1_000_000), lambda n, rng, _: [str(n)], traced_sizes=(100, 1000)),
+    "sieve-colour": Workload((100, 1000), lambda n, rng, _: [str(n)]),
+    "sieve-q": Workload((100_000, 1_000_000, 10_000_000), lambda n, rng, _: [str(n)]),
+}
+
+
+# suffix of the results measured with tracing
+TRACED: str = " (traced)"
+
+
+def call(function: Function, args: list[str], traced: bool = False) -> None:
+    # like run_function, but without printing the result, and errors are raised.
+    # traced builds and renders the explanations like a text run, only the output is discarded
+    with open(os.devnull, "w") as null, redirect_stdout(null), nullcontext() if traced else quiet():
+        function.method(*convert_if_possible(args), **function.default_kwargs)
+
+
+def measure(function: Function, args: list[str], repeats: int, traced: bool = False) -> dict[str, Any]:
+    """ Best wall time out of `repeats` calls, and the peak of python allocations of one more call.
+    
+    Memory is measured separately, tracemalloc slows everything down. Allocations of worker processes are not
+    included.
+    """
+    best: float = float("inf")
+    
+    for _ in range(repeats):
+        start: float = time.perf_counter()
+        call(function, args, traced)
+        best = min(best, time.perf_counter() - start)
+    
+    tracemalloc.start()
+    try:
+        call(function, args, traced)
+        peak: int = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    
+    return { "seconds": best, "peak_bytes": peak }
+
+
+def run_benchmarks(names: list[str], repeats: int, max_seconds: float = MAX_SECONDS) -> dict[str, dict[str, Any]]:
+    """ Measure every command in `names` over its ladder of sizes.
+    
+    Commands run without their explanations. Those with `traced_sizes` are measured a second time with tracing,
+    under their name with TRACED appended.
+    Results are keyed by command and size, failing sizes contain the error instead of a measurement.
+    """
+    results: dict[str, dict[str, Any]] = { }
+    
+    for name in names:
+        function: Function = registered_functions[name]
+        workload: Workload = WORKLOADS[name]
+        
+        for traced, sizes in ((False, workload.sizes), (True, workload.traced_sizes)):
+            if not sizes:
+                continue
+            
+            label: str = name + TRACED if traced else name
+            results[label] = { }
+            
+            with tempfile.TemporaryDirectory() as directory:
+                for size in sizes:
+                    # inputs only depend on the seed, the command and the size
+                    args: list[str] = workload.arguments(size, Random(f"{SEED}:{name}:{size}"), Path(directory))
+                    
+                    try:
+                        result: dict[str, Any] = measure(function, args, repeats, traced)
+                    except (Exception, SystemExit) as e:
+                        results[label][str(size)] = { "error": f"{type(e).__name__}: {e}" }
+                        # larger sizes would fail the same way
+                        break
+                    
+                    results[label][str(size)] = result
+                    print(
+                        f"{label} {size}: {result["seconds"] * 1000:.3f} ms, {result["peak_bytes"]} bytes",
+                        file=sys.stderr,
+                    )
+                    
+                    if result["seconds"] > max_seconds:
+                        break
+    
+    return results
+
+
+def compare(old: dict[str, Any], new: dict[str, Any], threshold: float) -> list[list[Any]]:
+    """ One row per command and size measured in both, with the ratios new / old and a verdict.
+    """
+    rows: list[list[Any]] = []
+    
+    for name, sizes in sorted(new["results"].items()):
+        for size, result in sizes.items():
+            previous: dict[str, Any] | None = old["results"].get(name, { }).get(size)
+            
+            if previous is None or "error" in previous or "error" in result:
+                continue
+            
+            time_ratio: float = result["seconds"] / max(previous["seconds"], 1e-9)
+            memory_ratio: float = result["peak_bytes"] / max(previous["peak_bytes"], 1)
+            
+            if time_ratio > threshold or memory_ratio > threshold:
+                verdict: str = "regression"
+            elif time_ratio < 1 / threshold or memory_ratio < 1 / threshold:
+                verdict = "improvement"
+            else:
+                verdict = ""
+            
+            rows.append([name, size, f"{time_ratio:.2f}", f"{memory_ratio:.2f}", verdict])
+    
+    return rows
+
+
+def main() -> None:
+    # results like kgv over many numbers easily exceed the default limit of 4300 digits
+    sys.set_int_max_str_digits(0)
+    
+    args: list[str] = sys.argv[1:]
+    
+    if args[:1] == ["run"]:
+        output: str | None = pop_option(args, "--out")
+        repeats: int = int(pop_option(args, "--repeats", "5"))
+        max_seconds: float = float(pop_option(args, "--max-seconds", str(MAX_SECONDS)))
+        
+        import_modules()
+        run_warmup()
+        
+        names: list[str] = args[1:] or sorted(registered_functions)
+        
+        for name in names:
+            if name not in registered_functions:
+                print(f"cannot find function '{name}'")
+                exit(1)
+        
+        # new commands need a workload, they should not silently stay unmeasured
+        missing: list[str] = [name for name in names if name not in WORKLOADS]
+        if missing:
+            print("no workload for:", ", ".join(missing))
+            exit(1)
+        
+        results: dict[str, Any] = {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "seed": SEED,
+            "results": run_benchmarks(names, repeats, max_seconds),
+        }
+        
+        rows: list[list[Any]] = []
+        for name, sizes in results["results"].items():
+            for size, result in sizes.items():
+                if "error" in result:
+                    rows.append([name, size, result["error"], ""])
+                else:
+                    rows.append([name, size, f"{result["seconds"] * 1000:.3f}", result["peak_bytes"]])
+        print(tabulate(rows, headers=["command", "size", "ms", "peak bytes"], tablefmt="presto"))
+        print(f"without trace output, except for the rows marked{TRACED}")
+        
+        if output is not None:
+            Path(output).write_text(json.dumps(results, indent=2) + "\n")
+        return
+    
+    if args[:1] == ["compare"] and len(args) >= 3:
+        threshold: float = float(pop_option(args, "--threshold", str(REGRESSION_THRESHOLD)))
+        old: dict[str, Any] = json.loads(Path(args[1]).read_text())
+        new: dict[str, Any] = json.loads(Path(args[2]).read_text())
+        
+        rows = compare(old, new, threshold)
+        print(tabulate(rows, headers=["command", "size", "time new/old", "memory new/old", ""], tablefmt="presto"))
+        
+        # fails on regressions, so it can guard a change
+        if any(row[-1] == "regression" for row in rows):
+            exit(1)
+        return
+    
+    print(
+        "usage: bench run [--out FILE] [--repeats N] [--max-seconds S] [<name>...]"
+        " | compare OLD NEW [--threshold RATIO]",
+    )
+    exit(1)
+
+
+if __name__ == "__main__":
+    main()
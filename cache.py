@@ -0,0 +1,209 @@
+import ast
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+from typing import Any, Sequence
+
+from tu_bs_scripts.quick_cli import pop_option
+
+# set TU_BS_CACHE to use another file
+CACHE_PATH: Path = Path(
+    os.environ.get("TU_BS_CACHE")
+    or Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "tu-bs-scripts" / "results.sqlite",
+)
+
+# least recently used results beyond this are evicted
+MAX_ENTRIES: int = 100_000
+# results not used for this many seconds are evicted
+MAX_AGE: float = 30 * 24 * 60 * 60
+# the last use of an entry is only written again once it is this much older, so most hits only read
+USED_RESOLUTION: float = 60 * 60
+# a full cache is evicted down to this share of its entries, so not every store has to evict again
+EVICT_TO: float = 0.9
+# results whose literal is longer than this are not stored, like the primes of a large is-prime-range
+MAX_VALUE_SIZE: int = 1 << 20
+
+# values are stored as python literals, written with repr and read with ast.literal_eval, which never runs code
+LITERAL_TYPES: tuple[type, ...] = (int, str, bool, type(None), list, tuple, dict)
+
+# the results table of older files held pickles, it is dropped
+SCHEMA: str = """
+DROP TABLE IF EXISTS results;
+CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value TEXT NOT NULL, used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+"""
+
+
+def cache_key(function_name: str, args: Sequence[Any]) -> str:
+    # arguments are already converted, so '007' and '7' share an entry
+    return repr((function_name, tuple(args)))
+
+
+def is_literal(value: Any) -> bool:
+    """ Whether ast.literal_eval(repr(value)) gives the value back.
+    """
+    if not isinstance(value, LITERAL_TYPES):
+        return False
+    if isinstance(value, (list, tuple)):
+        return all(is_literal(item) for item in value)
+    if isinstance(value, dict):
+        return all(is_literal(key) and is_literal(item) for key, item in value.items())
+    
+    return True
+
+
+def encode(value: Any) -> str | None:
+    # None if the value cannot or should not be stored
+    if not is_literal(value):
+        return None
+    
+    try:
+        text: str = repr(value)
+    except ValueError:
+        # an int beyond sys.get_int_max_str_digits()
+        return None
+    
+    return text if len(text) <= MAX_VALUE_SIZE else None
+
+
+class ResultCache:
+    """ Results of commands in a SQLite file, keyed by command and arguments.
+    
+    Lookups refresh the last use of an entry at most once per USED_RESOLUTION. Storing evicts entries that are too
+    old once per process, and the least recently used ones only when there are more than `max_entries`, down to
+    EVICT_TO of them.
+    """
+    
+    def __init__(self, path: Path = CACHE_PATH, max_entries: int = MAX_ENTRIES, max_age: float = MAX_AGE) -> None:
+        self.path: Path = path
+        self.max_entries: int = max_entries
+        self.max_age: float = max_age
+        self._connection: sqlite3.Connection | None = None
+        # amount of entries, counted on the first store and then only estimated
+        self._entries: int | None = None
+    
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # opened on first use, most runs never touch the cache
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # batch workers share the file, waiting for a lock is fine
+            self._connection = sqlite3.connect(self.path, timeout=30)
+            self._connection.executescript(SCHEMA)
+        
+        return self._connection
+    
+    def get(self, function_name: str, args: Sequence[Any]) -> tuple[bool, Any]:
+        """ Whether there is a result, and the result itself. A result may be None.
+        """
+        key: str = cache_key(function_name, args)
+        
+        row: tuple[str, float] | None = self.connection.execute(
+            "SELECT value, used FROM entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        
+        if row is None:
+            return False, None
+        
+        try:
+            result: Any = ast.literal_eval(row[0])
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            # damaged entries are computed again and replaced
+            return False, None
+        
+        now: float = time.time()
+        if now - row[1] > USED_RESOLUTION:
+            with self.connection as connection:
+                connection.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+        
+        return True, result
+    
+    def put(self, function_name: str, args: Sequence[Any], result: Any) -> None:
+        """ Store a result, unless it is too large or no python literal.
+        """
+        value: str | None = encode(result)
+        if value is None:
+            return
+        
+        with self.connection as connection:
+            if self._entries is None:
+                # old entries only need to go once per process, the index on used makes this cheap
+                connection.execute("DELETE FROM entries WHERE used < ?", (time.time() - self.max_age,))
+                self._entries = len(self)
+            
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, used) VALUES (?, ?, ?)",
+                (cache_key(function_name, args), value, time.time()),
+            )
+            self._entries += 1
+            
+            if self._entries > self.max_entries:
+                self._evict(connection, int(self.max_entries * EVICT_TO))
+                self._entries = len(self)
+    
+    def _evict(self, connection: sqlite3.Connection, keep: int) -> None:
+        connection.execute("DELETE FROM entries WHERE used < ?", (time.time() - self.max_age,))
+        connection.execute(
+            "DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (keep,),
+        )
+    
+    def evict(self) -> None:
+        with self.connection as connection:
+            self._evict(connection, self.max_entries)
+    
+    def clear(self) -> None:
+        with self.connection as connection:
+            connection.execute("DELETE FROM entries")
+        
+        # give the space back
+        self.connection.execute("VACUUM")
+    
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+
+_result_cache: ResultCache | None = None
+
+
+def result_cache() -> ResultCache:
+    # one per process, shared by every invocation of a batch
+    global _result_cache
+    
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    
+    return _result_cache
+
+
+def main() -> None:
+    args: list[str] = sys.argv[1:]
+    
+    # '--max-entries N' and '--max-age SECONDS' change the limits for evict
+    cache: ResultCache = ResultCache(
+        max_entries=int(pop_option(args, "--max-entries", str(MAX_ENTRIES))),
+        max_age=float(pop_option(args, "--max-age", str(MAX_AGE))),
+    )
+    
+    if args[:1] == ["clear"]:
+        cache.clear()
+        return
+    
+    if args[:1] == ["evict"]:
+        cache.evict()
+        return
+    
+    if args[:1] == ["info"]:
+        print(f"{cache.path}: {len(cache)} results")
+        return
+    
+    print("usage: cache clear | evict [--max-entries N] [--max-age SECONDS] | info")
+    exit(1)
+
+
+if __name__ == "__main__":
+    main()
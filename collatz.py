@@ -0,0 +1,306 @@
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from multiprocessing.shared_memory import SharedMemory
+
+# amount of values outside the queried range that are remembered
+LRU_SIZE: int = 1 << 16
+
+# entries that do not fit into the arrays are kept separately
+PEAK_LIMIT: int = (1 << 64) - 1
+STEPS_LIMIT: int = (1 << 16) - 1
+
+# values at the start of the range an engine memoizes, 10 bytes each, so at most 40 MB per engine.
+# beyond it, only the lru cache remembers values
+MEMO_LIMIT: int = 1 << 22
+
+# starting numbers in the memo shared by parallel workers, about 20 MB of /dev/shm
+SHARED_MEMO_LIMIT: int = 1 << 21
+
+
+def collatz_step(n: int) -> int:
+    if n % 2 == 0:
+        return n // 2
+    else:
+        return 3 * n + 1
+
+
+def trajectory_summary(n: int, glide: bool = False) -> tuple[int, int]:
+    """ Steps and peak of a single trajectory, until 1 or with `glide` until it drops below n.
+    """
+    steps: int = 0
+    peak: int = n
+    current: int = n
+    
+    while current != 1 and not (glide and current < n):
+        current = collatz_step(current)
+        steps += 1
+        if current > peak:
+            peak = current
+    
+    return steps, peak
+
+
+class CollatzEngine:
+    """ Total stopping time and peak of Collatz trajectories, memoized for the values in [begin, end].
+    
+    Values of the range are stored in a compact buffer (8 bytes peak + 2 bytes steps each), every other value that
+    is touched lands in a bounded LRU cache. The buffer covers at most MEMO_LIMIT values from `begin`, so a range
+    of any size needs at most about 40 MB. It may be shared memory used by several processes at once.
+    """
+    
+    def __init__(self, begin: int, end: int, lru_size: int = LRU_SIZE, buffer: memoryview | None = None) -> None:
+        self.begin: int = begin
+        # the end of the memoized part, the rest of the range is not stored
+        self.end: int = min(end, begin + MEMO_LIMIT - 1)
+        
+        size: int = max(self.end - begin + 1, 0)
+        if buffer is None:
+            buffer = memoryview(bytearray(self.buffer_size(begin, end)))
+        
+        # peaks first, they need the 8 byte alignment
+        self.peaks: memoryview = buffer[:8 * size].cast("Q")
+        # 0 steps means unknown, only 1 itself has 0 steps and that is never looked up
+        self.steps: memoryview = buffer[8 * size:10 * size].cast("H")
+        # values of the range whose peak or steps are too large for the buffer, only seen by this process
+        self.large: dict[int, tuple[int, int]] = { }
+        
+        self.lru: OrderedDict[int, tuple[int, int]] = OrderedDict()
+        self.lru_size: int = lru_size
+        
+        self.hits: int = 0
+        self.misses: int = 0
+    
+    @staticmethod
+    def buffer_size(begin: int, end: int) -> int:
+        return 10 * max(min(end - begin + 1, MEMO_LIMIT), 0)
+    
+    def release(self) -> None:
+        # views on shared memory must be released before it can be closed
+        self.peaks.release()
+        self.steps.release()
+    
+    def _lookup(self, n: int) -> tuple[int, int] | None:
+        if self.begin <= n <= self.end:
+            index: int = n - self.begin
+            steps: int = self.steps[index]
+            
+            if steps == 0:
+                # either unknown or too large for the buffer
+                return self.large.get(n) if self.large else None
+            
+            return steps, self.peaks[index]
+        
+        known: tuple[int, int] | None = self.lru.get(n)
+        if known is not None:
+            self.lru.move_to_end(n)
+        
+        return known
+    
+    def _store(self, n: int, steps: int, peak: int) -> None:
+        if self.begin <= n <= self.end:
+            index: int = n - self.begin
+            
+            if peak > PEAK_LIMIT or steps > STEPS_LIMIT:
+                # the buffer entry stays unknown for other processes
+                self.large[n] = (steps, peak)
+            else:
+                # peak before steps, other processes treat a set step count as complete
+                self.peaks[index] = peak
+                self.steps[index] = steps
+            
+            return
+        
+        self.lru[n] = (steps, peak)
+        if len(self.lru) > self.lru_size:
+            self.lru.popitem(last=False)
+    
+    def stopping_time(self, n: int) -> tuple[int, int]:
+        """ Steps until 1 is reached and the highest value on the way.
+        """
+        path: list[int] = []
+        current: int = n
+        
+        while True:
+            if current == 1:
+                steps, peak = 0, 1
+                break
+            
+            known: tuple[int, int] | None = self._lookup(current)
+            if known is not None:
+                self.hits += 1
+                steps, peak = known
+                break
+            
+            path.append(current)
+            current = current >> 1 if current % 2 == 0 else 3 * current + 1
+        
+        # every value on the path was a miss
+        self.misses += len(path)
+        
+        for value in reversed(path):
+            steps += 1
+            if value > peak:
+                peak = value
+            self._store(value, steps, peak)
+        
+        return steps, peak
+
+
+@dataclass
+class CollatzStats:
+    begin: int
+    end: int
+    # (value, starting number)
+    longest: tuple[int, int] = (-1, 0)
+    highest: tuple[int, int] = (-1, 0)
+    # stopping time -> amount of starting numbers
+    histogram: Counter[int] = field(default_factory=Counter)
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    # memo lookups of the engine while scanning
+    hits: int = 0
+    misses: int = 0
+    
+    def add(self, n: int, steps: int, peak: int) -> None:
+        if steps > self.longest[0]:
+            self.longest = (steps, n)
+        if peak > self.highest[0]:
+            self.highest = (peak, n)
+        self.histogram[steps] += 1
+    
+    def merge(self, other: "CollatzStats") -> None:
+        self.begin = min(self.begin, other.begin)
+        self.end = max(self.end, other.end)
+        
+        # chunks are merged in order, so ties keep the smallest starting number
+        if other.longest[0] > self.longest[0]:
+            self.longest = other.longest
+        if other.highest[0] > self.highest[0]:
+            self.highest = other.highest
+        
+        self.histogram.update(other.histogram)
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.hits += other.hits
+        self.misses += other.misses
+
+
+# set per worker process by init_worker
+_worker_engine: CollatzEngine | None = None
+_worker_memory: "SharedMemory | None" = None
+
+
+def init_worker(memory_name: str, begin: int, end: int) -> None:
+    """ Attach a worker process to the shared memo of the whole range, so chunks profit from each other.
+    """
+    global _worker_engine, _worker_memory
+    
+    from multiprocessing.shared_memory import SharedMemory
+    
+    _worker_memory = SharedMemory(name=memory_name)
+    _worker_engine = CollatzEngine(begin, end, buffer=_worker_memory.buf)
+
+
+def scan_chunk(bounds: tuple[int, int]) -> CollatzStats:
+    """ Statistics for all starting numbers in [begin, end], meant to run in a worker process.
+    """
+    begin, end = bounds
+    start_time: float = time.perf_counter()
+    start_cpu_time: float = time.process_time()
+    
+    engine: CollatzEngine = _worker_engine if _worker_engine is not None else CollatzEngine(begin, end)
+    stats: CollatzStats = CollatzStats(begin, end)
+    # the worker engine is reused across chunks
+    hits, misses = engine.hits, engine.misses
+    
+    for n in range(begin, end + 1):
+        stats.add(n, *engine.stopping_time(n))
+    
+    stats.hits = engine.hits - hits
+    stats.misses = engine.misses - misses
+    stats.wall_seconds = time.perf_counter() - start_time
+    stats.cpu_seconds = time.process_time() - start_cpu_time
+    return stats
+
+
+def chunk_bounds(begin: int, end: int, chunk_size: int) -> list[tuple[int, int]]:
+    return [(low, min(low + chunk_size - 1, end)) for low in range(begin, end + 1, chunk_size)]
+
+
+def numpy_trajectories(begin: int, end: int, glide: bool = False) -> tuple[Any, Any, dict[int, tuple[int, int]]]:
+    """ Steps and peaks for all starting numbers in [begin, end] as NumPy arrays, advancing all of them at once.
+    
+    Like trajectory_summary, but entries whose next value would overflow int64 are left out of the arrays and
+    are computed with Python integers instead. They are returned separately, keyed by their starting number.
+    """
+    # optional, only needed for this backend
+    import numpy as np
+    
+    starts = np.arange(begin, end + 1, dtype=np.int64)
+    peaks = starts.copy()
+    steps = np.zeros(starts.shape, dtype=np.int32)
+    
+    # 3n + 1 overflows above this
+    limit: int = (np.iinfo(np.int64).max - 1) // 3
+    overflowed: list[int] = []
+    
+    # compacted state of all trajectories that are still running
+    indices = np.flatnonzero(starts > 1)
+    current = starts[indices]
+    current_starts = current.copy()
+    current_peaks = current.copy()
+    
+    # lock-step: every running trajectory has done exactly this many steps
+    iteration: int = 0
+    
+    while indices.size > 0:
+        iteration += 1
+        odd = (current & 1).astype(bool)
+        
+        overflow = odd & (current > limit)
+        if overflow.any():
+            overflowed.extend(indices[overflow].tolist())
+            keep = ~overflow
+            indices, current, current_starts, current_peaks, odd = (
+                indices[keep], current[keep], current_starts[keep], current_peaks[keep], odd[keep]
+            )
+        
+        current = np.where(odd, 3 * current + 1, current >> 1)
+        np.maximum(current_peaks, current, out=current_peaks)
+        
+        done = current < current_starts if glide else current == 1
+        if done.any():
+            steps[indices[done]] = iteration
+            peaks[indices[done]] = current_peaks[done]
+            
+            keep = ~done
+            indices, current, current_starts, current_peaks = (
+                indices[keep], current[keep], current_starts[keep], current_peaks[keep]
+            )
+    
+    large: dict[int, tuple[int, int]] = { }
+    for index in overflowed:
+        n: int = begin + index
+        large[n] = trajectory_summary(n, glide)
+        steps[index] = -1
+        peaks[index] = -1
+    
+    return steps, peaks, large
+
+
+__all__ = [
+    "MEMO_LIMIT",
+    "SHARED_MEMO_LIMIT",
+    "collatz_step",
+    "trajectory_summary",
+    "CollatzEngine",
+    "CollatzStats",
+    "init_worker",
+    "scan_chunk",
+    "chunk_bounds",
+    "numpy_trajectories",
+]
@@ -0,0 +1,54 @@
+# generated by 'python -m tu_bs_scripts.registry update', do not edit
+# name: (module, min args, max args, default kwargs)
+COMMANDS: dict[str, tuple[str, int, int, dict]] = {
+    'base-change': ('tu_bs_scripts.algebra', 3, 3, {}),
+    'base-change-batch': ('tu_bs_scripts.algebra', 2, 3, {}),
+    'batch-gcd': ('tu_bs_scripts.algebra', 1, 1, {}),
+    'binom': ('tu_bs_scripts.stochastik', 2, 2, {}),
+    'chin': ('tu_bs_scripts.discmath', 0, 100, {}),
+    'chin-alg': ('tu_bs_scripts.discmath', 0, 100, {}),
+    'chin-alg-q': ('tu_bs_scripts.discmath', 0, 100, {'show_ggt': False}),
+    'chin-batch': ('tu_bs_scripts.discmath', 1, 100, {}),
+    'chin-q': ('tu_bs_scripts.discmath', 0, 100, {'show_ggt': False}),
+    'collatz': ('tu_bs_scripts.discmath', 1, 2, {}),
+    'collatz-numpy': ('tu_bs_scripts.discmath', 1, 2, {}),
+    'collatz-numpy-glide': ('tu_bs_scripts.discmath', 1, 2, {'glide': True}),
+    'collatz-parallel': ('tu_bs_scripts.discmath', 2, 4, {}),
+    'collatz-summary': ('tu_bs_scripts.discmath', 1, 2, {}),
+    'collatz-summary-q': ('tu_bs_scripts.discmath', 1, 2, {'quiet': True}),
+    'euklid-binary': ('tu_bs_scripts.algebra', 2, 2, {}),
+    'euklid-lehmer': ('tu_bs_scripts.algebra', 2, 2, {}),
+    'euklid-modern': ('tu_bs_scripts.algebra', 2, 2, {}),
+    'euklid-old': ('tu_bs_scripts.algebra', 2, 2, {}),
+    'fermat-factor': ('tu_bs_scripts.algebra', 1, 2, {}),
+    'ggt': ('tu_bs_scripts.discmath', 2, 3, {}),
+    'ggt-ext': ('tu_bs_scripts.discmath', 2, 3, {}),
+    'ggt-multi': ('tu_bs_scripts.discmath', 2, 3, {'print_multiplications': True}),
+    'inverse-batch': ('tu_bs_scripts.discmath', 1, 100, {}),
+    'is-prime': ('tu_bs_scripts.discmath', 1, 1, {}),
+    'is-prime-batch': ('tu_bs_scripts.discmath', 0, 100, {}),
+    'is-prime-range': ('tu_bs_scripts.discmath', 2, 2, {}),
+    'kgv': ('tu_bs_scripts.discmath', 0, 100, {}),
+    'kgv-file': ('tu_bs_scripts.discmath', 1, 3, {}),
+    'kgv-table': ('tu_bs_scripts.discmath', 0, 100, {}),
+    'lehman-factor': ('tu_bs_scripts.algebra', 1, 1, {}),
+    'matrix-det': ('tu_bs_scripts.lina', 0, 100, {}),
+    'matrix-det-float': ('tu_bs_scripts.lina', 0, 100, {'numeric': True}),
+    'matrix-det-mod': ('tu_bs_scripts.lina', 1, 100, {}),
+    'matrix-inverse': ('tu_bs_scripts.lina', 0, 100, {}),
+    'matrix-inverse-float': ('tu_bs_scripts.lina', 0, 100, {'numeric': True}),
+    'matrix-inverse-mod': ('tu_bs_scripts.lina', 1, 100, {}),
+    'matrix-rank': ('tu_bs_scripts.lina', 0, 100, {}),
+    'matrix-rank-float': ('tu_bs_scripts.lina', 0, 100, {'numeric': True}),
+    'matrix-rank-mod': ('tu_bs_scripts.lina', 1, 100, {}),
+    'matrix-solve': ('tu_bs_scripts.lina', 0, 100, {}),
+    'matrix-solve-float': ('tu_bs_scripts.lina', 0, 100, {'numeric': True}),
+    'matrix-solve-mod': ('tu_bs_scripts.lina', 1, 100, {}),
+    'multinom': ('tu_bs_scripts.stochastik', 2, 100, {}),
+    'prime-decomp': ('tu_bs_scripts.discmath', 1, 1, {}),
+    'recurrence': ('tu_bs_scripts.lina', 2, 100, {}),
+    'recurrence-mod': ('tu_bs_scripts.lina', 3, 100, {}),
+    'sieve': ('tu_bs_scripts.algebra', 1, 1, {}),
+    'sieve-colour': ('tu_bs_scripts.algebra', 1, 1, {}),
+    'sieve-q': ('tu_bs_scripts.algebra', 1, 1, {'quiet': True}),
+}
@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from math import gcd, prod
+from typing import Iterable, Sequence
+
+# amount of moduli sets whose basis is kept
+BASIS_CACHE_SIZE: int = 128
+
+# above this many moduli, the cofactors modulo m(i) come from a remainder tree instead of prefix/suffix products
+REMAINDER_TREE_THRESHOLD: int = 64
+
+
+def parse_congruences(remainder_mod: Iterable[str]) -> tuple[list[int], list[int]]:
+    # every congruence is given as 'remainder:modulus'
+    remainders: list[int] = []
+    moduli: list[int] = []
+    
+    for r in remainder_mod:
+        remainder, mod = r.split(":")
+        remainders.append(int(remainder))
+        moduli.append(int(mod))
+    
+    return remainders, moduli
+
+
+def cofactors(moduli: Sequence[int]) -> list[int]:
+    """ M(i), the product of all moduli except the i-th one, from prefix and suffix products.
+    """
+    length: int = len(moduli)
+    
+    prefix: list[int] = [1] * (length + 1)
+    suffix: list[int] = [1] * (length + 1)
+    
+    for i in range(length):
+        prefix[i + 1] = prefix[i] * moduli[i]
+        suffix[length - i - 1] = suffix[length - i] * moduli[length - i - 1]
+    
+    return [prefix[i] * suffix[i + 1] for i in range(length)]
+
+
+def product_tree(values: Sequence[int]) -> list[list[int]]:
+    # leaves first, the last level only contains the product of everything
+    tree: list[list[int]] = [list(values)]
+    
+    while len(tree[-1]) > 1:
+        level: list[int] = tree[-1]
+        tree.append([prod(level[i:i + 2]) for i in range(0, len(level), 2)])
+    
+    return tree
+
+
+def cofactors_mod(moduli: Sequence[int]) -> list[int]:
+    """ M(i) mod m(i), without ever building the M(i) themselves.
+    
+    For many moduli, a remainder tree computes M mod m(i)^2, and M(i) mod m(i) is that divided by m(i).
+    """
+    if len(moduli) <= REMAINDER_TREE_THRESHOLD:
+        return [cofactor % m for cofactor, m in zip(cofactors(moduli), moduli)]
+    
+    tree: list[list[int]] = product_tree(moduli)
+    
+    remainders: list[int] = tree[-1]
+    for level in reversed(tree[:-1]):
+        # divmod switches to a subquadratic division for huge numbers, % does not
+        remainders = [divmod(remainders[i // 2], node * node)[1] for i, node in enumerate(level)]
+    
+    return [(r // m) % m for r, m in zip(remainders, moduli)]
+
+
+def garner(remainders: Sequence[int], moduli: Sequence[int]) -> tuple[int, int]:
+    """ Solve x === a(i) mod m(i) incrementally, returning x and the combined modulus.
+    
+    Moduli do not have to be coprime, congruences sharing a factor are merged. Contradicting ones raise an
+    ArithmeticError.
+    """
+    x: int = 0
+    big_m: int = 1
+    
+    for a, m in zip(remainders, moduli):
+        if m <= 0:
+            raise ArithmeticError(f"modulus must be positive, got {m}")
+        
+        # x + M * t === a mod m
+        g: int = gcd(big_m, m)
+        difference: int = a - x
+        
+        if difference % g != 0:
+            raise ArithmeticError(f"x === {x} mod {big_m} contradicts x === {a} mod {m}")
+        
+        reduced_m: int = m // g
+        t: int = difference // g * pow(big_m // g, -1, reduced_m) % reduced_m if reduced_m > 1 else 0
+        
+        x += big_m * t
+        big_m *= reduced_m
+        x %= big_m
+    
+    return x, big_m
+
+
+@dataclass(frozen=True)
+class CrtBasis:
+    moduli: tuple[int, ...]
+    modulus: int
+    # e(i) = M(i)y(i) mod M, so e(i) === 1 mod m(i) and e(i) === 0 mod every other m(j)
+    basis: tuple[int, ...]
+    
+    def solve(self, remainders: Sequence[int]) -> int:
+        if len(remainders) != len(self.basis):
+            raise ValueError(f"expected {len(self.basis)} remainders, got {len(remainders)}")
+        
+        return sum(a * e for a, e in zip(remainders, self.basis)) % self.modulus
+
+
+@lru_cache(maxsize=BASIS_CACHE_SIZE)
+def crt_basis(moduli: tuple[int, ...]) -> CrtBasis:
+    """ Precompute everything that only depends on the moduli, which have to be pairwise coprime.
+    """
+    big_m: int = prod(moduli)
+    
+    # garner would merge them, but a basis only exists for coprime moduli
+    if garner([0] * len(moduli), moduli)[1] != big_m:
+        raise ArithmeticError(f"moduli {moduli} are not pairwise coprime")
+    
+    basis: tuple[int, ...] = tuple(
+        big_m // m * pow(cofactor, -1, m) % big_m for cofactor, m in zip(cofactors_mod(moduli), moduli)
+    )
+    
+    return CrtBasis(moduli, big_m, basis)
+
+
+__all__ = [
+    "parse_congruences",
+    "cofactors",
+    "product_tree",
+    "cofactors_mod",
+    "garner",
+    "CrtBasis",
+    "crt_basis",
+]
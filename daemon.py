@@ -0,0 +1,262 @@
+import os
+import signal
+import socket
+import stat
+import struct
+import sys
+import tempfile
+from typing import TYPE_CHECKING, TextIO
+
+from tu_bs_scripts.quick_cli import (
+    Measurement,
+    init_worker,
+    pop_flag,
+    pop_option,
+    report_total,
+    run_line,
+    run_line_captured,
+)
+from tu_bs_scripts.render import OUTPUT, PROFILERS, OutputSettings
+
+if TYPE_CHECKING:
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+
+
+def socket_path(create: bool = False) -> str:
+    """ Where the daemon listens, TU_BS_SOCKET or a directory only this user can enter.
+    
+    Raises OSError if the directory in the shared temp directory is missing (unless `create`) or not private.
+    """
+    if (path := os.environ.get("TU_BS_SOCKET")) is not None:
+        return path
+    
+    # private to the user by definition
+    if directory := os.environ.get("XDG_RUNTIME_DIR"):
+        return os.path.join(directory, "tu-bs-scripts.sock")
+    
+    # anyone can take a name in the shared temp directory first, so it must be a directory of this user that
+    # nobody else can enter
+    directory = os.path.join(tempfile.gettempdir(), f"tu-bs-scripts-{os.getuid()}")
+    if create:
+        try:
+            os.mkdir(directory, 0o700)
+        except FileExistsError:
+            pass
+    
+    status: os.stat_result = os.lstat(directory)
+    if not stat.S_ISDIR(status.st_mode) or status.st_uid != os.getuid() or status.st_mode & 0o077:
+        raise PermissionError(f"{directory} is not a directory only this user can access")
+    
+    return os.path.join(directory, "daemon.sock")
+
+
+def peer_uid(connection: socket.socket) -> int | None:
+    # user of the process on the other end of a unix socket, None where the system cannot tell
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    
+    credentials: bytes = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", credentials)
+    return uid
+
+
+# protocol, one request per line:
+#   client: 'name arg arg...'
+#   daemon: 'OK <n> <m>' or 'ERR <n> <m>', followed by the n lines of output and the m lines of errors of the command
+def encode_response(output: str, errors: str, succeeded: bool) -> bytes:
+    lines: list[str] = output.splitlines()
+    error_lines: list[str] = errors.splitlines()
+    header: str = f"{"OK" if succeeded else "ERR"} {len(lines)} {len(error_lines)}"
+    
+    return "".join(f"{line}\n" for line in [header, *lines, *error_lines]).encode()
+
+
+async def handle_client(
+    reader: "asyncio.StreamReader",
+    writer: "asyncio.StreamWriter",
+    executor: "ProcessPoolExecutor",
+    total: Measurement,
+) -> None:
+    import asyncio
+    
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    line_number: int = 0
+    
+    # the socket is only accessible to this user anyway, but TU_BS_SOCKET may point anywhere
+    if peer_uid(writer.get_extra_info("socket")) not in (None, os.getuid()):
+        writer.close()
+        return
+    
+    try:
+        while line := await reader.readline():
+            line_number += 1
+            
+            # commands are cpu bound, the event loop only waits for the workers
+            output, errors, succeeded, measurement = await loop.run_in_executor(
+                executor,
+                run_line_captured,
+                line_number,
+                line.decode().strip(),
+            )
+            total.merge(measurement)
+            
+            writer.write(encode_response(output, errors, succeeded))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def request_available(path: str) -> bool:
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(path)
+        return True
+    except OSError:
+        return False
+
+
+async def serve(path: str, jobs: int) -> None:
+    # only the daemon itself needs these, clients would pay for them on every call
+    import asyncio
+    from concurrent.futures import ProcessPoolExecutor
+    
+    if os.path.exists(path):
+        if request_available(path):
+            print(f"a daemon is already listening on {path}")
+            exit(1)
+        
+        # left over from a daemon that did not shut down cleanly
+        os.unlink(path)
+    
+    # measurements of every request, reported on shutdown
+    total: Measurement = Measurement()
+    
+    # every worker imports the commands and builds their tables once
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(OUTPUT.get(),)) as executor:
+        # the socket is created without any permissions for others, there is no window before a chmod
+        umask: int = os.umask(0o177)
+        try:
+            server: asyncio.Server = await asyncio.start_unix_server(
+                lambda reader, writer: handle_client(reader, writer, executor, total),
+                path=path,
+            )
+        finally:
+            os.umask(umask)
+        
+        # shut down cleanly on ctrl-c and kill
+        stop: asyncio.Event = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signal_number, stop.set)
+        
+        print(f"listening on {path} with {jobs} workers", flush=True)
+        
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            os.unlink(path)
+    
+    report_total(total)
+
+
+def read_lines(response: TextIO, count: int) -> str:
+    lines: list[str] = [response.readline() for _ in range(count)]
+    if lines and not lines[-1].endswith("\n"):
+        raise ValueError("the response of the daemon ended early")
+    
+    return "".join(lines)
+
+
+def request(line: str, path: str | None = None) -> tuple[str, str, bool]:
+    """ Send a single 'name arg arg...' line to the daemon and return its output, its errors and whether it
+    succeeded.
+    
+    Raises OSError if no daemon of this user is listening, ValueError if the response is malformed.
+    """
+    path = path or socket_path()
+    
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        
+        # a daemon of another user could answer anything
+        uid: int | None = peer_uid(connection)
+        if (uid if uid is not None else os.stat(path).st_uid) != os.getuid():
+            raise PermissionError(f"the daemon on {path} belongs to another user")
+        
+        connection.sendall(f"{line}\n".encode())
+        
+        with connection.makefile("r") as response:
+            status, count, error_count = response.readline().split()
+            if status not in ("OK", "ERR"):
+                raise ValueError(f"unknown status '{status}' from the daemon")
+            
+            output: str = read_lines(response, int(count))
+            errors: str = read_lines(response, int(error_count))
+    
+    return output, errors, status == "OK"
+
+
+def client(args: list[str]) -> None:
+    line: str = " ".join(args)
+    
+    try:
+        output, errors, succeeded = request(line)
+        sys.stdout.write(output)
+        sys.stderr.write(errors)
+    except (OSError, ValueError):
+        # no daemon running, or none that answers properly, just do it here, only importing the module of the command
+        succeeded = run_line(1, line)
+    
+    if not succeeded:
+        exit(1)
+
+
+def main() -> None:
+    # results like kgv over many numbers easily exceed the default limit of 4300 digits
+    sys.set_int_max_str_digits(0)
+    
+    args: list[str] = sys.argv[1:]
+    
+    if not args:
+        print("usage: daemon serve [--jobs N] [--time] [--stats] [--profile cpu|memory] | daemon <name> <args...>")
+        exit(1)
+    
+    if args[0] != "serve":
+        client(args)
+        return
+    
+    jobs: int = int(pop_option(args, "--jobs", str(os.cpu_count() or 1)))
+    
+    # passed to the workers, every request is reported to its client, the total on stderr of the daemon
+    settings: OutputSettings = OutputSettings(
+        time=pop_flag(args, "--time"),
+        stats=pop_flag(args, "--stats"),
+        profile=pop_option(args, "--profile"),
+    )
+    
+    if settings.profile is not None and settings.profile not in PROFILERS:
+        print(f"unknown profiler '{settings.profile}', available are: {", ".join(PROFILERS)}")
+        exit(1)
+    
+    OUTPUT.set(settings)
+    # forked workers find everything imported already, the others import it in init_worker
+    from tu_bs_scripts.registry import import_modules
+    
+    import_modules()
+    
+    try:
+        path: str = socket_path(create=True)
+    except OSError as e:
+        print(f"cannot listen: {e}")
+        exit(1)
+    
+    import asyncio
+    
+    asyncio.run(serve(path, jobs))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,53 @@
 #!/usr/bin/python
 
-import builtins
-from functools import cache
-from typing import Any, Generator
-
-from tabulate import tabulate
-
-from tu_bs_scripts.quick_cli import cli, quick_run
+import atexit
+import os
+import sys
+import time
+from collections import deque
+from itertools import batched
+from math import lcm, prod
+from types import ModuleType
+from typing import Iterable, Iterator
+
+from tu_bs_scripts.collatz import (
+    SHARED_MEMO_LIMIT,
+    CollatzEngine,
+    CollatzStats,
+    chunk_bounds,
+    collatz_step,
+    init_worker,
+    numpy_trajectories,
+    scan_chunk,
+)
+from tu_bs_scripts.crt import CrtBasis, cofactors, cofactors_mod, crt_basis, garner, parse_congruences
+from tu_bs_scripts.euclid import batch_inverse, extended_gcd, extended_gcd_steps
+from tu_bs_scripts.inputs import read_lines, read_numbers
+from tu_bs_scripts.primes import (
+    TRIAL_DIVISION_LIMIT,
+    PrimeStore,
+    are_probable_primes,
+    factorize,
+    is_probable_prime,
+    primes_in_range,
+    smallest_prime_factors,
+)
+from tu_bs_scripts.quick_cli import COUNTERS, cli, counters, quick_run, warmup
+from tu_bs_scripts.render import Table, emit, trace_print, tracing
 
 NO_DATA: str = "-"
 TABLE_FORMAT: str = "presto"
 
 
-# disabling printing is significantly faster
-class Printer:
-    enabled: bool = True
-    
-    @classmethod
-    def print(cls, *args, **kwargs):
-        if cls.enabled:
-            cls.force_print(*args, **kwargs)
-    
-    force_print = builtins.print
-
-
-print = Printer.print
-
-
 def indexed_print(*args, unit: str | None = None):
+    if not tracing():
+        # not even the strings are built
+        return
+    
     if unit is None:
-        print(", ".join([f"{i}: {entry}" for i, entry in enumerate(args)]))
+        trace_print(", ".join([f"{i}: {entry}" for i, entry in enumerate(args)]))
     else:
-        print(", ".join([f"{unit}{i}: {entry}" for i, entry in enumerate(args)]))
+        trace_print(", ".join([f"{unit}{i}: {entry}" for i, entry in enumerate(args)]))
 
 
 def n_alignment(n: int, alignment: str) -> list[str]:
@@ -42,18 +58,10 @@ def n_alignment(n: int, alignment: str) -> list[str]:
     return l
 
 
-@cache
-def collatz(n: int) -> int:
-    if n % 2 == 0:
-        return int(n / 2)
-    else:
-        return 3 * n + 1
-
-
 @cli("collatz")
 def collatz_range(begin: int, end: int = -1) -> None:
     if begin <= 0:
-        print("begin cannot be less or equal than 0, using 2")
+        trace_print("begin cannot be less or equal than 0, using 2")
         begin = 2
     
     if end == -1:
@@ -64,16 +72,163 @@ def collatz_range(begin: int, end: int = -1) -> None:
         current_n = i
         
         while current_n != 1:
-            current_n = collatz(current_n)
+            current_n = collatz_step(current_n)
             vals.append(current_n)
         
-        print(i, ":", *vals)
+        # the trajectory is the output of this command, not an explanation
+        emit([i, *vals], " ".join(map(str, [i, ":", *vals])))
+
+
+@cli("collatz-summary")
+@cli("collatz-summary-q", default_kwargs={ "quiet": True })
+def collatz_summary(begin: int, end: int = -1, *, quiet: bool = False) -> tuple[int, int]:
+    if begin <= 0:
+        trace_print("begin cannot be less or equal than 0, using 2")
+        begin = 2
+    
+    if end == -1:
+        end = begin
+    
+    engine: CollatzEngine = CollatzEngine(begin, end)
+    
+    # (value, starting number)
+    longest: tuple[int, int] = (-1, begin)
+    highest: tuple[int, int] = (-1, begin)
+    
+    for i in range(begin, end + 1):
+        steps, peak = engine.stopping_time(i)
+        
+        if not quiet:
+            trace_print(i, ":", "steps", steps, "peak", peak)
+        
+        if steps > longest[0]:
+            longest = (steps, i)
+        if peak > highest[0]:
+            highest = (peak, i)
+    
+    COUNTERS["collatz.hits"] += engine.hits
+    COUNTERS["collatz.misses"] += engine.misses
+    
+    trace_print(f"longest trajectory: {longest[1]} ({longest[0]} steps)")
+    trace_print(f"highest peak: {highest[1]} (peak {highest[0]})")
+    
+    # starting values of both records
+    return longest[1], highest[1]
+
+
+@cli("collatz-parallel")
+def collatz_parallel(begin: int, end: int, jobs: int = 0, chunk_size: int = 100_000) -> tuple[int, int]:
+    if begin <= 0:
+        trace_print("begin cannot be less or equal than 0, using 2")
+        begin = 2
+    
+    # 0 uses every core
+    jobs = jobs or os.cpu_count() or 1
+    
+    total: CollatzStats = CollatzStats(begin, end)
+    start_time: float = time.perf_counter()
+    
+    # process pools are only imported when needed, they are expensive to import
+    from concurrent.futures import ProcessPoolExecutor
+    from multiprocessing.shared_memory import SharedMemory
+    
+    # all workers share one memo of the start of the range, chunks are handed out in ascending order.
+    # it is capped, /dev/shm is small in containers, values above it land in the lru cache of each worker
+    shared_end: int = min(end, begin + SHARED_MEMO_LIMIT - 1)
+    memory: SharedMemory | None = None
+    
+    try:
+        memory = SharedMemory(create=True, size=max(CollatzEngine.buffer_size(begin, shared_end), 1))
+    except OSError as e:
+        print(f"no shared memo ({e}), every chunk uses its own")
+    
+    try:
+        with ProcessPoolExecutor(
+            max_workers=jobs,
+            initializer=init_worker if memory is not None else None,
+            initargs=(memory.name, begin, shared_end) if memory is not None else (),
+        ) as executor:
+            # map yields in order, each chunk as soon as it and all before it are done
+            for chunk in executor.map(scan_chunk, chunk_bounds(begin, end, chunk_size)):
+                trace_print(
+                    f"{chunk.begin}-{chunk.end}: longest {chunk.longest[1]} ({chunk.longest[0]} steps),",
+                    f"highest peak {chunk.highest[1]} ({chunk.highest[0]}),",
+                    f"{chunk.wall_seconds:.3f}s wall, {chunk.cpu_seconds:.3f}s cpu",
+                )
+                total.merge(chunk)
+    finally:
+        if memory is not None:
+            memory.close()
+            memory.unlink()
+    
+    wall_time: float = time.perf_counter() - start_time
+    
+    COUNTERS["collatz.hits"] += total.hits
+    COUNTERS["collatz.misses"] += total.misses
+    
+    trace_print()
+    histogram: Table = Table(["steps", "count"], tablefmt=TABLE_FORMAT, colalign=n_alignment(2, "right"))
+    histogram.extend(sorted(total.histogram.items()))
+    histogram.show()
+    trace_print()
+    trace_print(f"longest trajectory: {total.longest[1]} ({total.longest[0]} steps)")
+    trace_print(f"highest peak: {total.highest[1]} (peak {total.highest[0]})")
+    # with perfect scaling, the cpu time of all chunks is spread evenly over the workers
+    trace_print(
+        f"{jobs} workers: {wall_time:.3f}s wall, {total.cpu_seconds:.3f}s cpu in chunks,",
+        f"{total.cpu_seconds / wall_time:.2f} cores busy on average",
+    )
+    
+    # starting values of both records
+    return total.longest[1], total.highest[1]
+
+
+@cli("collatz-numpy")
+@cli("collatz-numpy-glide", default_kwargs={ "glide": True })
+def collatz_numpy(begin: int, end: int = -1, *, glide: bool = False) -> tuple[int, int]:
+    if begin <= 0:
+        trace_print("begin cannot be less or equal than 0, using 2")
+        begin = 2
+    
+    if end == -1:
+        end = begin
+    
+    steps, peaks, large = numpy_trajectories(begin, end, glide)
+    
+    # (value, starting number), like collatz-summary an empty range keeps these
+    longest: tuple[int, int] = (-1, begin)
+    highest: tuple[int, int] = (-1, begin)
+    
+    # entries that overflowed int64 are marked with -1 in the arrays
+    if steps.size > 0:
+        longest = (int(steps.max()), begin + int(steps.argmax()))
+        highest = (int(peaks.max()), begin + int(peaks.argmax()))
+    
+    for n, (n_steps, n_peak) in sorted(large.items()):
+        if n_steps > longest[0]:
+            longest = (n_steps, n)
+        if n_peak > highest[0]:
+            highest = (n_peak, n)
+    
+    if large:
+        trace_print(len(large), "trajectories exceeded int64 and were computed with python integers")
+    
+    trace_print(f"{"longest glide" if glide else "longest trajectory"}: {longest[1]} ({longest[0]} steps)")
+    trace_print(f"highest peak: {highest[1]} (peak {highest[0]})")
+    
+    # starting values of both records
+    return longest[1], highest[1]
 
 
 @cli
 @cli("ggt-multi", default_kwargs={ "print_multiplications": True })
 def ggt(num1: int, num2: int, maximum_iterations: int = 100, *, print_multiplications: bool = False) -> int:
-    data: list[list[str | int]] = []
+    headers: list[str] = ["i", "factor", "rest"]
+    
+    if print_multiplications:
+        headers.append("multiplications")
+    
+    table: Table = Table(headers, tablefmt=TABLE_FORMAT)
     
     iteration: int = 1
     
@@ -91,14 +246,14 @@ def ggt(num1: int, num2: int, maximum_iterations: int = 100, *, print_multiplica
         
         # print(f"{iteration}:: q{iteration}: {factor} ({factor * r1}) r{iteration+2}: {r2}", end=" | ")
         
-        multiplications: list[str] = []
-        for i in range(2, factor + 2):
-            multiplications.append(f"{i}:{r1 * i}")
-        
-        data.append([iteration, f"q{iteration}={factor}", f"r{iteration + 2}={r2}"])
-        
-        if print_multiplications:
-            data[-1].append(", ".join(multiplications))
+        if table.enabled:
+            row: list[str | int] = [iteration, f"q{iteration}={factor}", f"r{iteration + 2}={r2}"]
+            
+            if print_multiplications:
+                # one entry per multiple of r1, only worth building if it is shown
+                row.append(", ".join([f"{i}:{r1 * i}" for i in range(2, factor + 2)]))
+            
+            table.add(row)
         
         r0 = r1
         r1 = r2
@@ -107,190 +262,203 @@ def ggt(num1: int, num2: int, maximum_iterations: int = 100, *, print_multiplica
             print("max iteration depth reached")
             exit(1)
     
-    headers: list[str] = ["i", "factor", "rest"]
-    
-    if print_multiplications:
-        headers.append("multiplications")
+    COUNTERS["ggt.iterations"] += iteration - 1
     
-    print(tabulate(data, headers=headers, tablefmt=TABLE_FORMAT))
+    table.show()
     return r2_save
 
 
 @cli("ggt-ext")
 def ggt_extended(num1: int, num2: int, maximum_iterations: int = 100) -> tuple[int, int, int]:
     if num1 < 0 or num2 < 0:
-        print("using absolute values instead of negatives")
+        trace_print("using absolute values instead of negatives")
     
     num1 = abs(num1)
     num2 = abs(num2)
     
-    saved_ri: list[int] = [num1, num2]
-    saved_qi: list[int | str] = [NO_DATA]
-    saved_si: list[int | str] = [1, 0]
-    saved_ti: list[int | str] = [0, 1]
+    table: Table = Table(["i", "ri", "qi", "si", "ti"], tablefmt=TABLE_FORMAT, colalign=n_alignment(5, "right"))
     
-    current_r: int = num2
+    if not table.enabled:
+        # internal calls only need the coefficients
+        x, y, result, steps = extended_gcd_steps(num1, num2)
+        COUNTERS["ggt-ext.iterations"] += steps
+        return x, y, result
     
-    # no iteration 0 is done
-    iteration: int = 0
-    while current_r != 0:
-        iteration += 1
-        
-        current_q, current_r = divmod(saved_ri[iteration - 1], current_r)
-        
-        saved_ri.append(current_r)
-        saved_qi.append(current_q)
-        
-        if iteration == 1:
-            # do not adjust s1, t1
-            continue
+    # rows are added as they are computed, only the last two are kept
+    r_previous, r = num1, num2
+    s_previous, s = 1, 0
+    t_previous, t = 0, 1
+    
+    table.add([0, r_previous, NO_DATA, s_previous, t_previous])
+    
+    iteration: int = 1
+    while r != 0:
+        q: int = r_previous // r
+        table.add([iteration, r, q, s, t])
         
-        saved_si.append(-saved_qi[iteration - 1] * saved_si[iteration - 1] + saved_si[iteration - 2])
-        saved_ti.append(-saved_qi[iteration - 1] * saved_ti[iteration - 1] + saved_ti[iteration - 2])
+        r_previous, r = r, r_previous - q * r
+        s_previous, s = s, s_previous - q * s
+        t_previous, t = t, t_previous - q * t
         
         if iteration > maximum_iterations:
             print("too many iterations, exiting")
             exit(1)
+        
+        iteration += 1
     
-    saved_qi.append(NO_DATA)
-    saved_si.append(NO_DATA)
-    saved_ti.append(NO_DATA)
-    
-    data: list[list[str | int]] = []
-    
-    for i in range(iteration + 2):
-        data.append([i, saved_ri[i], saved_qi[i], saved_si[i], saved_ti[i]])
+    table.add([iteration, r, NO_DATA, NO_DATA, NO_DATA])
+    table.show()
     
-    print(
-        tabulate(
-            data,
-            headers=["i", "ri", "qi", "si", "ti"],
-            tablefmt=TABLE_FORMAT,
-            colalign=n_alignment(5, "right"),
-        ),
-    )
+    COUNTERS["ggt-ext.iterations"] += iteration - 1
     
-    x: int = saved_si[iteration]
-    y: int = saved_ti[iteration]
+    x: int = s_previous
+    y: int = t_previous
     result: int = x * num1 + y * num2
     
-    print(f"verifying: {x}*{num1}{"+" if y >= 0 else ""}{y}*{num2}={result}")
+    trace_print(f"verifying: {x}*{num1}{"+" if y >= 0 else ""}{y}*{num2}={result}")
     
     return x, y, result
 
 
-# Sieve of Eratosthenes
-# Code by David Eppstein, UC Irvine, 28 Feb 2002
-# http://code.activestate.com/recipes/117119/
-def gen_primes():
-    """ Generate an infinite sequence of prime numbers.
-    """
-    # Maps composites to primes witnessing their compositeness.
-    # This is memory efficient, as the sieve is not "run forward"
-    # indefinitely, but only as long as required by the current
-    # number being tested.
-    #
-    D = { }
-    
-    # The running integer that's checked for primeness
-    q = 2
-    
-    while True:
-        if q not in D:
-            # q is a new prime.
-            # Yield it and mark its first multiple that isn't
-            # already marked in previous iterations
-            #
-            yield q
-            D[q * q] = [q]
-        else:
-            # q is composite. D[q] is the list of primes that
-            # divide it. Since we've reached q, we no longer
-            # need it in the map, but we'll mark the next
-            # multiples of its witnesses to prepare for larger
-            # numbers
-            #
-            for p in D[q]:
-                D.setdefault(p + q, []).append(p)
-            del D[q]
-        
-        q += 1
+@cli("inverse-batch")
+def inverse_batch(modulus: int, *values: int) -> list[int]:
+    # one modular inversion for all values
+    return batch_inverse(values, modulus)
 
 
-PRIME_CACHE: list[int] = []
+# set TU_BS_PRIME_TABLE to a file path to keep the primes across runs, it is read on the first cache miss
+PRIME_CACHE: PrimeStore = PrimeStore(os.environ.get("TU_BS_PRIME_TABLE"))
 
 
-def get_prime(n: int) -> int:
-    # the first prime is the 0-th element in the cache
-    n -= 1
-    
-    cached_size: int = len(PRIME_CACHE)
-    
-    if n < cached_size:
-        return PRIME_CACHE[n]
+@atexit.register
+def save_prime_table() -> None:
+    # workers of a pool exit as well, only the process that started them writes the table
+    multiprocessing: ModuleType | None = sys.modules.get("multiprocessing")
     
-    generator: Generator[int, Any, None] = gen_primes()
-    for i in range(0, n + 1):
-        prime = next(generator)
-        
-        if i < cached_size:
-            continue
-        
-        PRIME_CACHE.append(prime)
-    
-    return PRIME_CACHE[n]
+    if multiprocessing is None or multiprocessing.parent_process() is None:
+        PRIME_CACHE.save_table()
+
+
+@warmup
+def warm_prime_tables() -> None:
+    PRIME_CACHE.extend_to(TRIAL_DIVISION_LIMIT)
+    smallest_prime_factors()
+
+
+@counters
+def prime_cache_counters() -> dict[str, int]:
+    return { "prime_cache.hits": PRIME_CACHE.hits, "prime_cache.misses": PRIME_CACHE.misses }
+
+
+def get_prime(n: int) -> int:
+    # the first prime is get_prime(1)
+    return PRIME_CACHE.nth(n)
 
 
 @cli
 def is_prime(number: int) -> bool:
-    # 1 is not a prime
-    if number <= 1:
-        return False
-    
-    if number == 2:
-        return True
-    
-    if number % 2 == 0:
-        return False
-    
-    for n in range(3, number // 2, 2):
-        if number % n == 0:
-            return False
-    
-    return True
+    return is_probable_prime(number)
+
+
+@cli("is-prime-batch")
+def is_prime_batch(*numbers: int) -> list[bool]:
+    return are_probable_primes(numbers)
 
 
-@cli("prime-decomp")
+@cli("is-prime-range", cache=True)
+def is_prime_range(begin: int, end: int) -> list[int]:
+    # both ends are included, like collatz
+    return primes_in_range(begin, end + 1)
+
+
+@cli("prime-decomp", cache=True)
 def prime_decomposition(number: int) -> dict[int, int]:
-    result: dict[int, int] = { }
+    return factorize(number, PRIME_CACHE)
+
+
+def lcm_stream(numbers: Iterable[int]) -> int:
+    # balanced product tree: like a binary counter, only equally large subtrees are merged,
+    # so the operands stay similar in size and at most log(n) partial results are kept
+    stack: list[tuple[int, int]] = []
     
-    while number > 1:
-        i = 1
-        while number % (prime := get_prime(i)) != 0:
-            i += 1
+    for number in numbers:
+        level: int = 0
+        value: int = abs(number)
         
-        number //= prime
+        while stack and stack[-1][0] == level:
+            value = lcm(stack.pop()[1], value)
+            level += 1
         
-        result[prime] = result.get(prime, 0) + 1
+        stack.append((level, value))
+    
+    result: int = 1
+    while stack:
+        result = lcm(stack.pop()[1], result)
     
     return result
 
 
-@cli
+@cli("kgv")
 def kgv(*numbers: int) -> int:
+    # lcm(a, b) = a // gcd(a, b) * b, no factorization needed
+    return lcm_stream(numbers)
+
+
+@cli("kgv-file")
+def kgv_file(path: str, jobs: int = 1, chunk_size: int = 10_000) -> int:
+    numbers: Iterator[int] = read_numbers(path)
+    
+    if jobs <= 1:
+        return lcm_stream(numbers)
+    
+    from concurrent.futures import Future, ProcessPoolExecutor
+    
+    # every worker reduces whole chunks, the partial results are reduced here
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        def partial_results() -> Iterator[int]:
+            # only a few chunks per worker are read ahead, the rest of the file is not touched yet
+            pending: deque[Future[int]] = deque()
+            
+            for chunk in batched(numbers, chunk_size):
+                pending.append(executor.submit(lcm_stream, chunk))
+                
+                if len(pending) > 2 * jobs:
+                    yield pending.popleft().result()
+            
+            while pending:
+                yield pending.popleft().result()
+        
+        return lcm_stream(partial_results())
+
+
+@cli("kgv-table")
+def kgv_table(*numbers: int) -> int:
     all_primes: dict[int, int] = { }
+    decompositions: list[dict[int, int]] = []
+    
     for number in numbers:
         number_primes: dict[int, int] = prime_decomposition(number)
+        decompositions.append(number_primes)
         
         # merge prime factors
         for prime in number_primes:
             if prime not in all_primes or all_primes[prime] < number_primes[prime]:
                 all_primes[prime] = number_primes[prime]
     
+    primes: list[int] = sorted(all_primes)
+    
+    table: Table = Table(["number", *primes], tablefmt=TABLE_FORMAT)
+    if table.enabled:
+        for number, number_primes in zip(numbers, decompositions):
+            table.add([number, *[number_primes.get(prime, NO_DATA) for prime in primes]])
+        table.add(["kgv", *[all_primes[prime] for prime in primes]])
+        
+        table.show()
+    
     # multiply everything together
     prime_sum: int = 1
-    for prime, factor in all_primes.items():
-        prime_sum *= pow(prime, factor)
+    for prime in primes:
+        prime_sum *= pow(prime, all_primes[prime])
     
     return prime_sum
 
@@ -300,35 +468,26 @@ def kgv(*numbers: int) -> int:
 def chinese_remainder(*remainder_mod: str, show_ggt: bool = True) -> int:
     length: int = len(remainder_mod)
     
-    as_: list[int] = []
-    ms: list[int] = []
+    as_, ms = parse_congruences(remainder_mod)
     
-    big_m: int = 1
-    for r in remainder_mod:
-        remainder, mod = r.split(":")
-        
-        remainder = int(remainder)
-        mod = int(mod)
-        
-        as_.append(remainder)
-        ms.append(mod)
-        
-        big_m *= mod
+    # the actual solution, everything below only explains it
+    x, merged_m = garner(as_, ms)
+    
+    if not tracing():
+        return x
+    
+    big_m: int = prod(ms)
     
     indexed_print(*as_, unit="a")
     indexed_print(*ms, unit="m")
-    print("M:", big_m)
+    trace_print("M:", big_m)
     
-    # big m(i) is all modulo multiplied together except the i-th one
-    big_ms: list[int] = []
+    if merged_m != big_m:
+        trace_print(f"moduli are not coprime, merged congruences: x === {x} mod {merged_m}")
+        return x
     
-    for i in range(length):
-        m: int = 1
-        for j in range(length):
-            if i == j:
-                continue
-            m *= ms[j]
-        big_ms.append(m)
+    # big m(i) is all modulo multiplied together except the i-th one
+    big_ms: list[int] = cofactors(ms)
     
     indexed_print(*big_ms, unit="M")
     
@@ -336,14 +495,12 @@ def chinese_remainder(*remainder_mod: str, show_ggt: bool = True) -> int:
     # via M(i)y(i) === 1 mod m(i)
     ys: list[int] = []
     
-    # not too relevant, but still possible
-    Printer.enabled = show_ggt
-    
-    for i in range(length):
-        s, _, _ = ggt_extended(big_ms[i], ms[i])
-        ys.append(s % ms[i])
-    
-    Printer.enabled = True
+    if show_ggt:
+        for i in range(length):
+            s, _, _ = ggt_extended(big_ms[i], ms[i])
+            ys.append(s % ms[i])
+    else:
+        ys = [pow(big_m_i, -1, m) for big_m_i, m in zip(cofactors_mod(ms), ms)]
     
     indexed_print(*ys, unit="y")
     
@@ -352,10 +509,10 @@ def chinese_remainder(*remainder_mod: str, show_ggt: bool = True) -> int:
     for i in range(length):
         sum_ += as_[i] * big_ms[i] * ys[i]
     
-    print("sum:", sum_)
+    trace_print("sum:", sum_)
     
     # x === sum mod M
-    return sum_ % big_m
+    return x
 
 
 # given the name, should be in algebra.py, but it's too close to the discmath variant, so it stays here
@@ -364,35 +521,26 @@ def chinese_remainder(*remainder_mod: str, show_ggt: bool = True) -> int:
 def chinese_remainder_algebra(*remainder_mod: str, show_ggt: bool = True) -> int:
     length: int = len(remainder_mod)
     
-    as_: list[int] = []
-    ms: list[int] = []
+    as_, ms = parse_congruences(remainder_mod)
     
-    big_m: int = 1
-    for r in remainder_mod:
-        remainder, mod = r.split(":")
-        
-        remainder = int(remainder)
-        mod = int(mod)
-        
-        as_.append(remainder)
-        ms.append(mod)
-        
-        big_m *= mod
+    # the actual solution, everything below only explains it
+    x, merged_m = garner(as_, ms)
+    
+    if not tracing():
+        return x
+    
+    big_m: int = prod(ms)
     
     indexed_print(*as_, unit="a")
     indexed_print(*ms, unit="m")
-    print("M:", big_m)
+    trace_print("M:", big_m)
     
-    # big m(i) is all modulo multiplied together except the i-th one
-    big_ms: list[int] = []
+    if merged_m != big_m:
+        trace_print(f"moduli are not coprime, merged congruences: x === {x} mod {merged_m}")
+        return x
     
-    for i in range(length):
-        m: int = 1
-        for j in range(length):
-            if i == j:
-                continue
-            m *= ms[j]
-        big_ms.append(m)
+    # big m(i) is all modulo multiplied together except the i-th one
+    big_ms: list[int] = cofactors(ms)
     
     indexed_print(*big_ms, unit="M")
     
@@ -400,15 +548,11 @@ def chinese_remainder_algebra(*remainder_mod: str, show_ggt: bool = True) -> int
     # via M(i)y(i) === 1 mod m(i)
     es: list[int] = []
     
-    # not too relevant, but still possible
-    Printer.enabled = show_ggt
-    
+    # the coefficients of euclid are kept as they are, not normalized, both variants explain with the same numbers
     for i in range(length):
-        e, f, _ = ggt_extended(big_ms[i], ms[i])
+        e, f, _ = ggt_extended(big_ms[i], ms[i]) if show_ggt else extended_gcd(big_ms[i], ms[i])
         es.append(e * big_ms[i])
     
-    Printer.enabled = True
-    
     indexed_print(*es, unit="e")
     
     # x = [ sum_(i)^(length) a(i)M(i)y(i) ] mod M
@@ -416,10 +560,29 @@ def chinese_remainder_algebra(*remainder_mod: str, show_ggt: bool = True) -> int
     for i in range(length):
         sum_ += as_[i] * es[i]
     
-    print("sum:", sum_)
-    print("sum in (mod M):")
+    trace_print("sum:", sum_)
+    trace_print("sum in (mod M):")
+    
+    return x
+
+
+@cli("chin-batch")
+def chinese_remainder_batch(path: str, *moduli: int) -> int:
+    # the basis is computed once for the moduli, every line of the file only needs a sum of products
+    basis: CrtBasis = crt_basis(tuple(moduli))
+    
+    # every solution is written right away, the amount is the result
+    count: int = 0
+    for line in read_lines(path):
+        if not line.strip():
+            continue
+        
+        # remainders are separated by whitespace or commas
+        remainders: list[int] = [int(token) for token in line.replace(",", " ").split()]
+        emit(basis.solve(remainders))
+        count += 1
     
-    return sum_ % big_m
+    return count
 
 
 if __name__ == '__main__':
@@ -0,0 +1,156 @@
+from math import gcd
+from typing import Sequence
+
+from tu_bs_scripts.crt import cofactors_mod
+
+# bits of the leading parts lehmer works on, small enough to stay machine sized in the inner loop
+LEHMER_WORD: int = 62
+
+
+def binary_gcd(a: int, b: int) -> int:
+    """ Stein's algorithm: subtraction gcd that halves whenever it can, so it needs O(log) steps.
+    """
+    a, b = abs(a), abs(b)
+    if a == 0 or b == 0:
+        return a | b
+    
+    # common factors of two, x & -x is the lowest set bit
+    shift: int = ((a | b) & -(a | b)).bit_length() - 1
+    a >>= (a & -a).bit_length() - 1
+    
+    while b != 0:
+        b >>= (b & -b).bit_length() - 1
+        if a > b:
+            a, b = b, a
+        b -= a
+    
+    return a << shift
+
+
+def lehmer_step(a: int, b: int) -> tuple[int, int, int, int] | None:
+    """ The matrix (A, B, C, D) of as many euclid steps as the leading bits of a >= b determine, or None if not even
+    a single one is certain.
+    """
+    shift: int = max(a.bit_length() - LEHMER_WORD, 0)
+    x: int = a >> shift
+    y: int = b >> shift
+    
+    big_a, big_b, big_c, big_d = 1, 0, 0, 1
+    
+    # the quotient is only certain if both bounds of the leading parts agree on it
+    while y + big_c != 0 and y + big_d != 0:
+        q: int = (x + big_a) // (y + big_c)
+        if q != (x + big_b) // (y + big_d):
+            break
+        
+        big_a, big_c = big_c, big_a - q * big_c
+        big_b, big_d = big_d, big_b - q * big_d
+        x, y = y, x - q * y
+    
+    if big_b == 0:
+        return None
+    
+    return big_a, big_b, big_c, big_d
+
+
+def lehmer_gcd(a: int, b: int) -> int:
+    """ Euclid on the leading word of the numbers, applying many steps to the full numbers at once.
+    """
+    a, b = abs(a), abs(b)
+    if a < b:
+        a, b = b, a
+    
+    while b.bit_length() > LEHMER_WORD:
+        matrix: tuple[int, int, int, int] | None = lehmer_step(a, b)
+        
+        if matrix is None:
+            # quotient too large for the leading parts, one full division
+            a, b = b, a % b
+        else:
+            big_a, big_b, big_c, big_d = matrix
+            a, b = big_a * a + big_b * b, big_c * a + big_d * b
+    
+    # both are small now
+    while b != 0:
+        a, b = b, a % b
+    
+    return a
+
+
+def extended_gcd_steps(a: int, b: int) -> tuple[int, int, int, int]:
+    """ s, t and g = gcd(a, b) with s * a + t * b = g, and the amount of division steps, keeping only the last two
+    rows of the table.
+    """
+    r_previous, r = a, b
+    s_previous, s = 1, 0
+    t_previous, t = 0, 1
+    steps: int = 0
+    
+    while r != 0:
+        q: int = r_previous // r
+        r_previous, r = r, r_previous - q * r
+        s_previous, s = s, s_previous - q * s
+        t_previous, t = t, t_previous - q * t
+        steps += 1
+    
+    return s_previous, t_previous, r_previous, steps
+
+
+def extended_gcd(a: int, b: int) -> tuple[int, int, int]:
+    """ s, t and g = gcd(a, b) with s * a + t * b = g.
+    """
+    s, t, g, _ = extended_gcd_steps(a, b)
+    return s, t, g
+
+
+def batch_inverse(values: Sequence[int], modulus: int) -> list[int]:
+    """ The inverses of all values modulo the same modulus, with a single inversion (Montgomery's trick).
+    
+    Prefix products need k - 1 multiplications, walking back through them another 2(k - 1).
+    Raises an ArithmeticError naming the first value without an inverse.
+    """
+    if not values:
+        return []
+    
+    # prefixes[i] = values[0] * ... * values[i] mod modulus
+    prefixes: list[int] = [values[0] % modulus]
+    for value in values[1:]:
+        prefixes.append(prefixes[-1] * value % modulus)
+    
+    try:
+        inverse: int = pow(prefixes[-1], -1, modulus)
+    except ValueError:
+        culprit: int = next(value for value in values if gcd(value, modulus) != 1)
+        raise ArithmeticError(f"{culprit} has no inverse mod {modulus}") from None
+    
+    inverses: list[int] = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        # inverse is 1 / (values[0] * ... * values[i]) here
+        inverses[i] = inverse * prefixes[i - 1] % modulus
+        inverse = inverse * values[i] % modulus
+    inverses[0] = inverse
+    
+    return inverses
+
+
+def batch_gcd(moduli: Sequence[int]) -> list[int]:
+    """ gcd(m(i), product of all other moduli) for every modulus, in quasi-linear time.
+    
+    The product of the others modulo m(i) comes from a remainder tree over the product tree (Bernstein), so no
+    pair of moduli is ever compared directly. A result of m(i) itself means every factor of it is shared.
+    """
+    if len(moduli) < 2:
+        return [1] * len(moduli)
+    
+    return [gcd(cofactor, m) for cofactor, m in zip(cofactors_mod(moduli), moduli)]
+
+
+__all__ = [
+    "binary_gcd",
+    "lehmer_step",
+    "lehmer_gcd",
+    "extended_gcd_steps",
+    "extended_gcd",
+    "batch_inverse",
+    "batch_gcd",
+]
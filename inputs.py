@@ -0,0 +1,27 @@
+import sys
+from typing import Iterator, TextIO
+
+
+def read_lines(path: str) -> Iterator[str]:
+    # '-' reads stdin
+    file: TextIO = sys.stdin if path == "-" else open(path)
+    
+    try:
+        yield from file
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def read_tokens(path: str) -> Iterator[str]:
+    # whitespace separated
+    for line in read_lines(path):
+        yield from line.split()
+
+
+def read_numbers(path: str) -> Iterator[int]:
+    for token in read_tokens(path):
+        yield int(token)
+
+
+__all__ = ["read_lines", "read_tokens", "read_numbers"]
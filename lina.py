@@ -1,53 +1,608 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from contextlib import contextmanager
+from fractions import Fraction
+from math import gcd, sumprod
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from tu_bs_scripts.quick_cli import cli, quick_run
+from tu_bs_scripts.render import trace_print
+
+# ints and Fractions are exact, floats are only meant for the numpy path
+Scalar = int | Fraction | float
+
+
+def parse_scalar(token: str, numeric: bool = False) -> Scalar:
+	if numeric:
+		return float(Fraction(token))
+	
+	value: Fraction = Fraction(token)
+	return value.numerator if value.denominator == 1 else value
+
+
+def plain(value: Any) -> Any:
+	# Fractions are written as 'p/q', json and csv have no type for them
+	if isinstance(value, Fraction):
+		return value.numerator if value.denominator == 1 else str(value)
+	
+	return value
+
+
+def exact_quotient(a: Scalar, b: Scalar) -> Scalar:
+	# stays an int whenever the division works out
+	if isinstance(a, int) and isinstance(b, int):
+		return a // b if a % b == 0 else Fraction(a, b)
+	
+	value: Scalar = a / b
+	if isinstance(value, Fraction) and value.denominator == 1:
+		return value.numerator
+	return value
 
 
-@dataclass
 class Matrix:
-	a11: int
-	a12: int
-	a21: int
-	a22: int
+	""" A rows x columns matrix, the entries stored row by row in one flat tuple.
+	
+	Matrices are immutable and hashable. With int or Fraction entries, det, rank, inverse and solve are exact:
+	without a modulus they use fraction-free (Bareiss) elimination over the rationals, with a prime modulus they
+	work in Z_p. to_numpy() is the way to floating point.
+	"""
+	
+	__slots__ = ("rows", "columns", "entries")
+	
+	def __init__(self, rows: int, columns: int, entries: Iterable[Scalar]) -> None:
+		self.rows: int = rows
+		self.columns: int = columns
+		self.entries: tuple[Scalar, ...] = tuple(entries)
+		
+		if len(self.entries) != rows * columns:
+			raise ValueError(f"a {rows}x{columns} matrix needs {rows * columns} entries, got {len(self.entries)}")
+	
+	@classmethod
+	def from_rows(cls, rows: Sequence[Sequence[Scalar]]) -> Matrix:
+		columns: int = len(rows[0]) if rows else 0
+		
+		if any(len(row) != columns for row in rows):
+			raise ValueError("all rows need the same amount of entries")
+		
+		return cls(len(rows), columns, (value for row in rows for value in row))
+	
+	@classmethod
+	def parse(cls, rows: Iterable[Any], numeric: bool = False) -> Matrix:
+		""" One string per row, entries separated by commas. Entries may be ints, fractions like '1/3' or decimals.
+		"""
+		return cls.from_rows([[parse_scalar(token, numeric) for token in str(row).split(",")] for row in rows])
+	
+	@classmethod
+	def identity(cls, n: int) -> Matrix:
+		return cls(n, n, (int(i == j) for i in range(n) for j in range(n)))
+	
+	@property
+	def square(self) -> bool:
+		return self.rows == self.columns
+	
+	def __getitem__(self, index: tuple[int, int]) -> Scalar:
+		i, j = index
+		return self.entries[i * self.columns + j]
+	
+	def row(self, i: int) -> tuple[Scalar, ...]:
+		return self.entries[i * self.columns:(i + 1) * self.columns]
+	
+	def column(self, j: int) -> tuple[Scalar, ...]:
+		return self.entries[j::self.columns]
+	
+	def to_rows(self) -> list[list[Scalar]]:
+		return [list(self.row(i)) for i in range(self.rows)]
+	
+	def transpose(self) -> Matrix:
+		return Matrix(self.columns, self.rows, (value for j in range(self.columns) for value in self.column(j)))
+	
+	def reduce(self, modulus: int) -> Matrix:
+		""" Entries in [0, modulus). Fractions need an invertible denominator.
+		"""
+		return Matrix(self.rows, self.columns, (_residue(value, modulus) for value in self.entries))
+	
+	def __eq__(self, other: object) -> bool:
+		if not isinstance(other, Matrix):
+			return NotImplemented
+		return (self.rows, self.columns, self.entries) == (other.rows, other.columns, other.entries)
 	
-	def __add__(self, other) -> Matrix:
+	def __hash__(self) -> int:
+		return hash((self.rows, self.columns, self.entries))
+	
+	def __add__(self, other: Matrix) -> Matrix:
 		if not isinstance(other, Matrix):
 			return NotImplemented
-		return Matrix(self.a11 + other.a11, self.a12 + other.a12, self.a21 + other.a21, self.a22 + other.a22)
+		self._check_shape(other)
+		return Matrix(self.rows, self.columns, (a + b for a, b in zip(self.entries, other.entries)))
 	
-	def __mul__(self, other):
+	def __sub__(self, other: Matrix) -> Matrix:
 		if not isinstance(other, Matrix):
 			return NotImplemented
-		return Matrix(
-			self.a11 * other.a11 + self.a12 * other.a21,
-			self.a11 * other.a12 + self.a12 * other.a22,
-			self.a21 * other.a11 + self.a22 * other.a21,
-			self.a21 * other.a21 + self.a22 * other.a22
+		self._check_shape(other)
+		return Matrix(self.rows, self.columns, (a - b for a, b in zip(self.entries, other.entries)))
+	
+	def __neg__(self) -> Matrix:
+		return Matrix(self.rows, self.columns, (-a for a in self.entries))
+	
+	def __mul__(self, other: Matrix | Scalar) -> Matrix:
+		if isinstance(other, Matrix):
+			return self.multiply(other)
+		if isinstance(other, (int, Fraction, float)):
+			return Matrix(self.rows, self.columns, (a * other for a in self.entries))
+		return NotImplemented
+	
+	def __rmul__(self, other: Scalar) -> Matrix:
+		if isinstance(other, (int, Fraction, float)):
+			return Matrix(self.rows, self.columns, (other * a for a in self.entries))
+		return NotImplemented
+	
+	def multiply(self, other: Matrix, modulus: int | None = None) -> Matrix:
+		""" The matrix product, every entry reduced if a modulus is given.
+		"""
+		if self.columns != other.rows:
+			raise ValueError(f"cannot multiply a {self.rows}x{self.columns} by a {other.rows}x{other.columns} matrix")
+		
+		# columns of the right side are slices of its flat tuple, taken once
+		columns: list[tuple[Scalar, ...]] = [other.column(j) for j in range(other.columns)]
+		entries: list[Scalar] = []
+		
+		for i in range(self.rows):
+			row: tuple[Scalar, ...] = self.row(i)
+			for column in columns:
+				value: Scalar = sumprod(row, column)
+				entries.append(value if modulus is None else value % modulus)
+		
+		return Matrix(self.rows, other.columns, entries)
+	
+	def det(self, modulus: int | None = None) -> Scalar:
+		self._check_square("determinant")
+		
+		rows: list[list[Scalar]] = self._working_rows(modulus)
+		if modulus is None:
+			rank, det = _bareiss(rows, self.columns, full=False)
+		else:
+			rank, det = _gauss_mod(rows, self.columns, modulus)
+		
+		return det if rank == self.rows else 0
+	
+	def rank(self, modulus: int | None = None) -> int:
+		rows: list[list[Scalar]] = self._working_rows(modulus)
+		if modulus is None:
+			return _bareiss(rows, self.columns, full=False)[0]
+		return _gauss_mod(rows, self.columns, modulus)[0]
+	
+	def inverse(self, modulus: int | None = None) -> Matrix:
+		self._check_square("inverse")
+		return Matrix.from_rows(self._eliminate_augmented(Matrix.identity(self.rows), modulus))
+	
+	def solve(self, b: Sequence[Scalar], modulus: int | None = None) -> list[Scalar]:
+		""" The unique x with self * x = b. Raises an ArithmeticError if there is none or more than one.
+		"""
+		self._check_square("unique solution")
+		if len(b) != self.rows:
+			raise ValueError(f"the right side needs {self.rows} entries, got {len(b)}")
+		
+		return [row[0] for row in self._eliminate_augmented(Matrix(self.rows, 1, b), modulus)]
+	
+	def power(self, exponent: int, modulus: int | None = None) -> Matrix:
+		""" self ** exponent by repeated squaring, reduced if a modulus is given. Negative exponents invert first.
+		"""
+		self._check_square("power")
+		return self.apply_power(Matrix.identity(self.rows), exponent, modulus)
+	
+	def __pow__(self, exponent: int, modulus: int | None = None) -> Matrix:
+		# pow(matrix, exponent, modulus) works as well
+		return self.power(exponent, modulus)
+	
+	def apply_power(self, other: Matrix, exponent: int, modulus: int | None = None) -> Matrix:
+		""" self ** exponent * other, one product with a cached squaring per set bit of the exponent.
+		
+		The power itself is never formed, so for a vector every bit only costs O(k^2) once the squarings are known.
+		"""
+		self._check_square("power")
+		if exponent < 0:
+			return self.inverse(modulus).apply_power(other, -exponent, modulus)
+		
+		table: list[Matrix] = squarings(self, exponent.bit_length() - 1, modulus)
+		result: Matrix = other if modulus is None else other.reduce(modulus)
+		
+		for i in range(exponent.bit_length()):
+			if exponent >> i & 1:
+				result = table[i].multiply(result, modulus)
+		
+		return result
+	
+	def to_numpy(self) -> Any:
+		# optional, only needed for the float path
+		import numpy as np
+		
+		return np.array(self.entries, dtype=float).reshape(self.rows, self.columns)
+	
+	def _eliminate_augmented(self, right: Matrix, modulus: int | None) -> list[list[Scalar]]:
+		# gauss-jordan on [self | right], the left part ends up a multiple of the identity
+		n: int = self.rows
+		rows: list[list[Scalar]] = [
+			list(left) + list(extra) for left, extra in zip(self._working_rows(modulus), right.to_rows())
+		]
+		
+		if modulus is None:
+			rank, _ = _bareiss(rows, n, full=True)
+		else:
+			rank, _ = _gauss_mod(rows, n, modulus, full=True)
+		
+		if rank < n:
+			raise ArithmeticError("matrix is singular")
+		
+		if modulus is not None:
+			return [[value % modulus for value in row[n:]] for row in rows]
+		
+		# every row is now (d * e_i | d * x_i) with the last pivot d
+		d: Scalar = rows[-1][n - 1]
+		return [[exact_quotient(value, d) for value in row[n:]] for row in rows]
+	
+	def _working_rows(self, modulus: int | None) -> list[list[Scalar]]:
+		if modulus is None:
+			return self.to_rows()
+		return self.reduce(modulus).to_rows()
+	
+	def _check_shape(self, other: Matrix) -> None:
+		if (self.rows, self.columns) != (other.rows, other.columns):
+			raise ValueError(f"shapes {self.rows}x{self.columns} and {other.rows}x{other.columns} do not match")
+	
+	def _check_square(self, what: str) -> None:
+		if not self.square:
+			raise ValueError(f"a {what} needs a square matrix, this one is {self.rows}x{self.columns}")
+	
+	def __repr__(self) -> str:
+		return f"Matrix.from_rows({self.to_rows()!r})"
+	
+	def __str__(self) -> str:
+		cells: list[str] = [str(value) for value in self.entries]
+		width: int = max(map(len, cells), default=0)
+		
+		return "\n".join(
+			"[" + "|".join(cell.rjust(width) for cell in cells[i * self.columns:(i + 1) * self.columns]) + "]"
+			for i in range(self.rows)
 		)
+
+
+# matrix ** (2 ** i) for every i computed so far, per matrix and modulus
+_squarings: dict[tuple[Matrix, int | None], list[Matrix]] = { }
+
+# matrices whose squarings are kept, the oldest one is dropped beyond this
+SQUARINGS_CACHE_SIZE: int = 64
+
+
+def squarings(matrix: Matrix, level: int, modulus: int | None = None) -> list[Matrix]:
+	""" matrix ** (2 ** i) for every i <= level, squared once and kept for later powers of the same matrix and modulus.
+	"""
+	key: tuple[Matrix, int | None] = (matrix, modulus)
 	
-	def __str__(self):
-		return f"[{self.a11:2d}|{self.a12:2d}]\n[{self.a21:2d}|{self.a22:2d}]"
+	if key not in _squarings:
+		if len(_squarings) >= SQUARINGS_CACHE_SIZE:
+			del _squarings[next(iter(_squarings))]
+		_squarings[key] = [matrix if modulus is None else matrix.reduce(modulus)]
+	
+	known: list[Matrix] = _squarings[key]
+	while len(known) <= level:
+		known.append(known[-1].multiply(known[-1], modulus))
+	
+	return known
+
+
+def companion(coefficients: Sequence[int]) -> Matrix:
+	""" The matrix taking (a(n + k - 1), ..., a(n)) to (a(n + k), ..., a(n + 1)) for the recurrence
+	a(n + k) = c(1) * a(n + k - 1) + ... + c(k) * a(n).
+	"""
+	k: int = len(coefficients)
+	return Matrix(k, k, [*coefficients, *(int(j == i) for i in range(k - 1) for j in range(k))])
+
+
+def recurrence_terms(
+	coefficients: Sequence[int],
+	initial: Sequence[int],
+	indices: Iterable[int],
+	modulus: int | None = None,
+) -> list[int]:
+	""" a(n) for every index, given the coefficients and the initial values a(0), ..., a(k - 1).
+	
+	The indices are answered in ascending order, each state is advanced from the previous one by the difference of
+	the indices. The squarings of the companion matrix are only computed once, every further index costs O(k^2) per
+	bit of the difference. The result is in the order of the indices.
+	"""
+	indices = list(indices)
+	if len(initial) != len(coefficients):
+		raise ValueError(f"{len(coefficients)} coefficients need as many initial values, got {len(initial)}")
+	if any(index < 0 for index in indices):
+		raise ValueError("indices cannot be negative")
+	
+	matrix: Matrix = companion(coefficients)
+	# a(k - 1) first, like the rows of the companion matrix
+	state: Matrix = Matrix(len(initial), 1, reversed(initial))
+	position: int = 0
+	
+	values: dict[int, int] = { }
+	for index in sorted(set(indices)):
+		state = matrix.apply_power(state, index - position, modulus)
+		position = index
+		values[index] = state.entries[-1]
+	
+	return [values[index] for index in indices]
+
+
+def _residue(value: Scalar, modulus: int) -> int:
+	if isinstance(value, Fraction):
+		return value.numerator * pow(value.denominator, -1, modulus) % modulus
+	return value % modulus
+
+
+def _bareiss(rows: list[list[Scalar]], columns: int, full: bool) -> tuple[int, Scalar]:
+	""" Fraction-free elimination of the rows in place, pivots are only searched in the first `columns` columns.
+	
+	Every entry stays a minor of the original matrix, so the division by the previous pivot is exact and the
+	numbers only grow linearly. With `full`, the rows above each pivot are cleared as well (gauss-jordan).
+	Returns the rank and the signed last pivot, which is the determinant of a nonsingular square matrix.
+	"""
+	divide: Callable[[Scalar, Scalar], Scalar] = _divide_exact if _all_ints(rows) else _divide_field
+	
+	previous: Scalar = 1
+	rank: int = 0
+	sign: int = 1
+	
+	for column in range(columns):
+		if rank == len(rows):
+			break
+		
+		pivot_index: int | None = next((i for i in range(rank, len(rows)) if rows[i][column] != 0), None)
+		if pivot_index is None:
+			continue
+		
+		if pivot_index != rank:
+			rows[rank], rows[pivot_index] = rows[pivot_index], rows[rank]
+			sign = -sign
+		
+		pivot_row: list[Scalar] = rows[rank]
+		pivot: Scalar = pivot_row[column]
+		
+		for i in range(0 if full else rank + 1, len(rows)):
+			if i == rank:
+				continue
+			
+			row: list[Scalar] = rows[i]
+			factor: Scalar = row[column]
+			# entries left of the pivot are zero in both rows below it
+			start: int = 0 if i < rank else column
+			for j in range(start, len(row)):
+				row[j] = divide(pivot * row[j] - factor * pivot_row[j], previous)
+		
+		previous = pivot
+		rank += 1
+	
+	return rank, sign * previous
+
+
+def _gauss_mod(rows: list[list[int]], columns: int, modulus: int, full: bool = False) -> tuple[int, int]:
+	""" Elimination in Z_p in place, every pivot row is scaled to a leading 1. Returns the rank and the product of
+	the pivots, which is the determinant of a nonsingular square matrix.
+	
+	The modulus should be prime, a pivot column without an invertible entry raises an ArithmeticError.
+	"""
+	rank: int = 0
+	det: int = 1
+	
+	for column in range(columns):
+		if rank == len(rows):
+			break
+		
+		nonzero: list[int] = [i for i in range(rank, len(rows)) if rows[i][column] != 0]
+		if not nonzero:
+			continue
+		
+		pivot_index: int | None = next((i for i in nonzero if gcd(rows[i][column], modulus) == 1), None)
+		if pivot_index is None:
+			raise ArithmeticError(f"no invertible pivot in column {column}, is {modulus} prime?")
+		
+		if pivot_index != rank:
+			rows[rank], rows[pivot_index] = rows[pivot_index], rows[rank]
+			det = -det
+		
+		pivot: int = rows[rank][column]
+		det = det * pivot % modulus
+		
+		inverse: int = pow(pivot, -1, modulus)
+		pivot_row: list[int] = [value * inverse % modulus for value in rows[rank]]
+		rows[rank] = pivot_row
+		
+		for i in range(0 if full else rank + 1, len(rows)):
+			row: list[int] = rows[i]
+			factor: int = row[column]
+			if i == rank or factor == 0:
+				continue
+			
+			for j in range(len(row)):
+				row[j] = (row[j] - factor * pivot_row[j]) % modulus
+		
+		rank += 1
+	
+	return rank, det % modulus
+
+
+def _all_ints(rows: list[list[Scalar]]) -> bool:
+	return all(isinstance(value, int) for row in rows for value in row)
+
+
+def _divide_exact(a: int, b: int) -> int:
+	return a // b
+
+
+def _divide_field(a: Scalar, b: Scalar) -> Scalar:
+	return a / b
+
+
+def show(matrix: Matrix) -> None:
+	trace_print(matrix)
+	trace_print()
+
+
+@contextmanager
+def input_errors() -> Iterator[None]:
+	# shapes that do not fit and singular matrices are mistakes in the input, numpy raises ValueErrors as well
+	try:
+		yield
+	except (ValueError, ArithmeticError) as e:
+		print(e)
+		exit(1)
+
+
+def parse_rows(rows: tuple[Any, ...], numeric: bool = False) -> Matrix:
+	if not rows:
+		raise ValueError("the matrix needs at least one row")
+	
+	return Matrix.parse(rows, numeric)
+
+
+def augmented(rows: tuple[Any, ...], numeric: bool = False) -> tuple[Matrix, list[Scalar]]:
+	# the last entry of every row is the right side
+	matrix: Matrix = parse_rows(rows, numeric)
+	return Matrix.from_rows([row[:-1] for row in matrix.to_rows()]), list(matrix.column(matrix.columns - 1))
+
+
+def square_numpy(matrix: Matrix, what: str) -> Any:
+	# the same check as the exact path, so both fail with the same message
+	matrix._check_square(what)
+	return matrix.to_numpy()
+
+
+@cli("matrix-det")
+@cli("matrix-det-float", default_kwargs={ "numeric": True })
+def matrix_det(*rows: str, numeric: bool = False) -> Any:
+	with input_errors():
+		matrix: Matrix = parse_rows(rows, numeric)
+		show(matrix)
+		
+		if numeric:
+			import numpy as np
+			
+			return float(np.linalg.det(square_numpy(matrix, "determinant")))
+		
+		return plain(matrix.det())
+
+
+@cli("matrix-det-mod")
+def matrix_det_mod(modulus: int, *rows: str) -> int:
+	with input_errors():
+		matrix: Matrix = parse_rows(rows)
+		show(matrix)
+		return matrix.det(modulus)
+
+
+@cli("matrix-rank")
+@cli("matrix-rank-float", default_kwargs={ "numeric": True })
+def matrix_rank(*rows: str, numeric: bool = False) -> int:
+	with input_errors():
+		matrix: Matrix = parse_rows(rows, numeric)
+		show(matrix)
+		
+		if numeric:
+			import numpy as np
+			
+			return int(np.linalg.matrix_rank(matrix.to_numpy()))
+		
+		return matrix.rank()
+
+
+@cli("matrix-rank-mod")
+def matrix_rank_mod(modulus: int, *rows: str) -> int:
+	with input_errors():
+		matrix: Matrix = parse_rows(rows)
+		show(matrix)
+		return matrix.rank(modulus)
+
+
+@cli("matrix-inverse")
+@cli("matrix-inverse-float", default_kwargs={ "numeric": True })
+def matrix_inverse(*rows: str, numeric: bool = False) -> list[list[Any]]:
+	with input_errors():
+		matrix: Matrix = parse_rows(rows, numeric)
+		show(matrix)
+		
+		if numeric:
+			import numpy as np
+			
+			try:
+				return np.linalg.inv(square_numpy(matrix, "inverse")).tolist()
+			except np.linalg.LinAlgError:
+				raise ArithmeticError("matrix is singular") from None
+		
+		inverse: Matrix = matrix.inverse()
+		show(inverse)
+		return [[plain(value) for value in row] for row in inverse.to_rows()]
+
+
+@cli("matrix-inverse-mod")
+def matrix_inverse_mod(modulus: int, *rows: str) -> list[list[int]]:
+	with input_errors():
+		matrix: Matrix = parse_rows(rows)
+		show(matrix)
+		
+		inverse: Matrix = matrix.inverse(modulus)
+		show(inverse)
+		return inverse.to_rows()
+
+
+@cli("matrix-solve")
+@cli("matrix-solve-float", default_kwargs={ "numeric": True })
+def matrix_solve(*rows: str, numeric: bool = False) -> list[Any]:
+	with input_errors():
+		# rows of the augmented matrix (A | b)
+		matrix, b = augmented(rows, numeric)
+		show(matrix)
+		
+		if numeric:
+			import numpy as np
+			
+			try:
+				return np.linalg.solve(square_numpy(matrix, "unique solution"), np.array(b, dtype=float)).tolist()
+			except np.linalg.LinAlgError:
+				raise ArithmeticError("matrix is singular") from None
+		
+		return [plain(value) for value in matrix.solve(b)]
+
+
+@cli("matrix-solve-mod")
+def matrix_solve_mod(modulus: int, *rows: str) -> list[int]:
+	with input_errors():
+		matrix, b = augmented(rows)
+		show(matrix)
+		return matrix.solve(b, modulus)
 
 
-def det(m: Matrix):
-	return (m.a11 * m.a22) - (m.a12 * m.a21)
+def integers(values: Any) -> list[int]:
+	# a single value is already converted by the cli
+	return [int(token) for token in str(values).split(",")]
 
 
-ma = Matrix(1, 2, 3, 4)
-mb = Matrix(3, 5, 7, 9)
+@cli("recurrence", cache=True)
+def linear_recurrence(coefficients: str, initial: str, *indices: int) -> list[int]:
+	# a(n) = c(1) * a(n - 1) + ... + c(k) * a(n - k), the coefficients and a(0), ..., a(k - 1) separated by commas
+	return recurrence_terms(integers(coefficients), integers(initial), map(int, indices))
 
-print(ma + mb)
-print()
-print(ma * mb)
-print(det(ma))
-print(det(mb))
 
-print("-" * 20)
+@cli("recurrence-mod", cache=True)
+def linear_recurrence_mod(modulus: int, coefficients: str, initial: str, *indices: int) -> list[int]:
+	return recurrence_terms(integers(coefficients), integers(initial), map(int, indices), modulus)
 
-print(det(ma) + det(mb))
-print(det(ma + mb))
 
-print("-" * 20)
+__all__ = [
+	"Scalar",
+	"Matrix",
+	"parse_scalar",
+	"plain",
+	"exact_quotient",
+	"squarings",
+	"companion",
+	"recurrence_terms",
+]
 
-print(det(ma) * det(mb))
-print(det(ma * mb))
+if __name__ == '__main__':
+	quick_run()
@@ -0,0 +1,602 @@
+import os
+import struct
+from array import array
+from itertools import compress, count
+from math import gcd, isqrt, log, prod
+from typing import Iterable, Iterator
+
+# amount of odd numbers per segment, the bytearray of a segment has exactly this size
+SEGMENT_SIZE: int = 1 << 18
+
+
+def odd_base_primes(limit: int) -> list[int]:
+    """ All odd primes <= limit, using a plain odd-only sieve.
+    """
+    if limit < 3:
+        return []
+    
+    # flags[i] represents the number 2i + 1
+    flags: bytearray = bytearray(b"\x01") * ((limit + 1) // 2)
+    flags[0] = 0
+    
+    for i in range(1, (isqrt(limit) - 1) // 2 + 1):
+        if not flags[i]:
+            continue
+        
+        p: int = 2 * i + 1
+        start: int = p * p // 2
+        flags[start::p] = bytes(len(range(start, len(flags), p)))
+    
+    return list(compress(range(1, 2 * len(flags), 2), flags))
+
+
+def prime_segments(start: int, stop: int, segment_size: int = SEGMENT_SIZE) -> Iterator[list[int]]:
+    """ Yield the primes in [start, stop) in ascending order, one list per segment.
+    
+    Only the base primes up to sqrt(stop) and a single segment are held in memory.
+    """
+    if stop <= 2 or start >= stop:
+        return
+    
+    if start <= 2:
+        yield [2]
+        start = 3
+    
+    base_primes: list[int] = odd_base_primes(isqrt(stop - 1))
+    
+    # only odd numbers are sieved
+    low: int = start | 1
+    
+    while low < stop:
+        high: int = min(low + 2 * segment_size, stop)
+        count: int = (high - low + 1) // 2
+        
+        flags: bytearray = bytearray(b"\x01") * count
+        
+        for p in base_primes:
+            square: int = p * p
+            if square >= high:
+                break
+            
+            # first odd multiple of p inside the segment, but never p itself
+            multiple: int = max(square, (low + p - 1) // p * p)
+            if multiple % 2 == 0:
+                multiple += p
+            
+            index: int = (multiple - low) // 2
+            if index < count:
+                flags[index::p] = bytes((count - index - 1) // p + 1)
+        
+        if low == 1:
+            flags[0] = 0
+        
+        yield list(compress(range(low, high, 2), flags))
+        
+        low = high if high % 2 == 1 else high + 1
+
+
+def iter_primes(limit: int) -> Iterator[int]:
+    """ Stream all primes <= limit in bounded memory.
+    """
+    for segment in prime_segments(2, limit + 1):
+        yield from segment
+
+
+SMALL_PRIME_LIMIT: int = 1000
+SMALL_PRIMES: tuple[int, ...] = (2, *odd_base_primes(SMALL_PRIME_LIMIT))
+# a single gcd replaces the trial division by every small prime
+SMALL_PRIMORIAL: int = prod(SMALL_PRIMES)
+_SMALL_PRIME_SET: frozenset[int] = frozenset(SMALL_PRIMES)
+
+# using the first 13 primes as bases, Miller-Rabin is deterministic below this bound
+MILLER_RABIN_BOUND: int = 3_317_044_064_679_887_385_961_981
+MILLER_RABIN_BASES: tuple[int, ...] = SMALL_PRIMES[:13]
+
+# ranges ending below this are sieved completely, above they are only pre-sieved with the small primes
+RANGE_SIEVE_LIMIT: int = 1 << 40
+
+
+def jacobi(a: int, n: int) -> int:
+    """ Jacobi symbol (a/n) for odd n > 0.
+    """
+    a %= n
+    result: int = 1
+    
+    while a != 0:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    
+    return result if n == 1 else 0
+
+
+def _strong_probable_prime(n: int, base: int, d: int, s: int) -> bool:
+    # n - 1 = d * 2^s with d odd
+    x: int = pow(base, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    
+    return False
+
+
+def _strong_lucas_probable_prime(n: int) -> bool:
+    # perfect squares never yield a fitting D
+    if isqrt(n) ** 2 == n:
+        return False
+    
+    # Selfridge's method A: first D of 5, -7, 9, -11, ... with (D/n) = -1
+    d_: int = 5
+    while (symbol := jacobi(d_, n)) != -1:
+        if symbol == 0 and abs(d_) != n:
+            return False
+        d_ = -d_ - 2 if d_ > 0 else -d_ + 2
+    
+    p: int = 1
+    q: int = (1 - d_) // 4
+    
+    # n + 1 = d * 2^s with d odd
+    d: int = n + 1
+    s: int = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    
+    u: int = 1
+    v: int = p
+    q_k: int = q % n
+    
+    for bit in bin(d)[3:]:
+        u = u * v % n
+        v = (v * v - 2 * q_k) % n
+        q_k = q_k * q_k % n
+        
+        if bit == "1":
+            u, v = p * u + v, d_ * u + p * v
+            # halving modulo n, n is odd
+            u = (u + n if u % 2 else u) // 2 % n
+            v = (v + n if v % 2 else v) // 2 % n
+            q_k = q_k * q % n
+    
+    if u == 0 or v == 0:
+        return True
+    
+    for _ in range(s - 1):
+        v = (v * v - 2 * q_k) % n
+        q_k = q_k * q_k % n
+        if v == 0:
+            return True
+    
+    return False
+
+
+def _miller_rabin(n: int) -> bool:
+    # n is odd and has no small prime factors
+    d: int = n - 1
+    s: int = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    
+    if n < MILLER_RABIN_BOUND:
+        return all(_strong_probable_prime(n, base, d, s) for base in MILLER_RABIN_BASES)
+    
+    # Baillie-PSW: a strong base 2 test followed by a strong Lucas test
+    return _strong_probable_prime(n, 2, d, s) and _strong_lucas_probable_prime(n)
+
+
+def is_probable_prime(n: int) -> bool:
+    """ Primality test, deterministic below MILLER_RABIN_BOUND and Baillie-PSW above.
+    """
+    if n <= SMALL_PRIME_LIMIT:
+        return n in _SMALL_PRIME_SET
+    
+    if gcd(n, SMALL_PRIMORIAL) != 1:
+        return False
+    
+    # no prime factor below the limit, so it has to be prime
+    if n < SMALL_PRIME_LIMIT * SMALL_PRIME_LIMIT:
+        return True
+    
+    return _miller_rabin(n)
+
+
+def are_probable_primes(numbers: Iterable[int]) -> list[bool]:
+    return [is_probable_prime(number) for number in numbers]
+
+
+def primes_in_range(start: int, stop: int) -> list[int]:
+    """ All primes in [start, stop).
+    """
+    if stop <= RANGE_SIEVE_LIMIT:
+        return [prime for segment in prime_segments(start, stop) for prime in segment]
+    
+    start = max(start, SMALL_PRIME_LIMIT * SMALL_PRIME_LIMIT)
+    if start >= stop:
+        return []
+    
+    # cross out multiples of the small primes, only the survivors get the expensive test
+    flags: bytearray = bytearray(b"\x01") * (stop - start)
+    for p in SMALL_PRIMES:
+        index: int = -start % p
+        flags[index::p] = bytes(len(range(index, len(flags), p)))
+    
+    return [number for number in compress(range(start, stop), flags) if _miller_rabin(number)]
+
+
+class PrimeStore:
+    """ All primes up to `limit`, kept in a compact array and extended on demand.
+    
+    Extending only sieves the segment between the old and the new limit, nothing is recomputed.
+    """
+    
+    # magic, typecode width and limit, followed by the raw array
+    FILE_HEADER: struct.Struct = struct.Struct("<8sBQ")
+    FILE_MAGIC: bytes = b"TUBSPRIM"
+    
+    def __init__(self, path: str | None = None) -> None:
+        self.primes: array = array("I")
+        # every prime <= limit is stored
+        self.limit: int = 1
+        
+        # table file, only read once a request is not covered, most runs never need it
+        self.path: str | None = path
+        # limit right after reading the table file, None while it was not read
+        self.table_limit: int | None = None
+        
+        # requests that were already covered, and ones that had to sieve
+        self.hits: int = 0
+        self.misses: int = 0
+    
+    def __len__(self) -> int:
+        return len(self.primes)
+    
+    def __getitem__(self, index: int) -> int:
+        return self.primes[index]
+    
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.primes)
+    
+    def _sieve_to(self, limit: int) -> None:
+        for segment in prime_segments(self.limit + 1, limit + 1):
+            self.primes.extend(segment)
+        
+        self.limit = limit
+    
+    def _load_table(self) -> None:
+        if self.path is not None and self.table_limit is None:
+            self.load(self.path)
+            self.table_limit = self.limit
+    
+    def extend_to(self, limit: int) -> None:
+        if limit > self.limit:
+            self._load_table()
+        
+        if limit <= self.limit:
+            self.hits += 1
+            return
+        
+        self.misses += 1
+        self._sieve_to(limit)
+    
+    def ensure_count(self, count: int) -> None:
+        if len(self.primes) < count:
+            self._load_table()
+        
+        if len(self.primes) >= count:
+            self.hits += 1
+            return
+        
+        self.misses += 1
+        while len(self.primes) < count:
+            # upper bound of the n-th prime for n >= 6, otherwise just double
+            estimate: int = int(count * (log(count) + log(log(count)))) + 1 if count >= 6 else 0
+            self._sieve_to(max(estimate, 2 * self.limit, 16))
+    
+    def nth(self, n: int) -> int:
+        """ The n-th prime, starting at 1 (the first prime is 2).
+        """
+        if n < 1:
+            raise IndexError(f"there is no {n}-th prime")
+        
+        self.ensure_count(n)
+        return self.primes[n - 1]
+    
+    def load(self, path: str) -> bool:
+        """ Replace the store with a table file, if it exists and covers more than the store.
+        """
+        if not os.path.isfile(path) or os.path.getsize(path) < self.FILE_HEADER.size:
+            return False
+        
+        with open(path, "rb") as file:
+            magic, item_size, limit = self.FILE_HEADER.unpack(file.read(self.FILE_HEADER.size))
+            
+            if magic != self.FILE_MAGIC or item_size != self.primes.itemsize or limit <= self.limit:
+                return False
+            
+            # read straight into the array, the table is extended in place later on
+            primes: array = array("I")
+            primes.fromfile(file, (os.path.getsize(path) - self.FILE_HEADER.size) // item_size)
+        
+        self.primes = primes
+        self.limit = limit
+        return True
+    
+    def save(self, path: str) -> None:
+        # only needed when writing, tempfile takes a while to import
+        import tempfile
+        
+        # a file of its own for every writer, never leave a half written table behind
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)),
+            prefix=f"{os.path.basename(path)}.",
+            suffix=".tmp",
+        )
+        
+        try:
+            with open(descriptor, "wb") as file:
+                file.write(self.FILE_HEADER.pack(self.FILE_MAGIC, self.primes.itemsize, self.limit))
+                self.primes.tofile(file)
+            
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+    
+    def save_table(self) -> None:
+        """ Write the table file, if this store extended it.
+        """
+        if self.path is not None and self.table_limit is not None and self.limit > self.table_limit:
+            self.save(self.path)
+
+
+# numbers up to this are factorized with the smallest prime factor table
+SPF_LIMIT: int = 1 << 20
+# trial division covers all prime factors below this, larger ones are left to Pollard-Brent
+TRIAL_DIVISION_LIMIT: int = 1 << 16
+
+_spf_table: array | None = None
+
+
+def smallest_prime_factors() -> array:
+    """ spf[n] is the smallest prime factor of n, for all n <= SPF_LIMIT. Built on first use.
+    """
+    global _spf_table
+    
+    if _spf_table is None:
+        table: array = array("I", range(SPF_LIMIT + 1))
+        
+        # descending, so the smallest prime writes last
+        for p in reversed((2, *odd_base_primes(isqrt(SPF_LIMIT)))):
+            start: int = p * p
+            table[start::p] = array("I", [p]) * len(range(start, SPF_LIMIT + 1, p))
+        
+        _spf_table = table
+    
+    return _spf_table
+
+
+def pollard_brent(n: int) -> int:
+    """ A non-trivial factor of the composite n.
+    """
+    if n % 2 == 0:
+        return 2
+    
+    root: int = isqrt(n)
+    if root * root == n:
+        return root
+    
+    # batch this many steps into a single gcd
+    m: int = 128
+    
+    for c in count(1):
+        y: int = 2
+        x: int = y
+        y_save: int = y
+        r: int = 1
+        q: int = 1
+        g: int = 1
+        
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            
+            k: int = 0
+            while k < r and g == 1:
+                y_save = y
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            
+            r *= 2
+        
+        if g == n:
+            # the batch overshot, redo its steps one by one
+            g = 1
+            while g == 1:
+                y_save = (y_save * y_save + c) % n
+                g = gcd(abs(x - y_save), n)
+        
+        if g != n:
+            return g
+
+
+def factorize(n: int, store: PrimeStore | None = None) -> dict[int, int]:
+    """ Prime factors of n with their exponents, in ascending order.
+    
+    Small n use the smallest prime factor table, then the primes of `store` (or a fresh sieve) are trial divided
+    and whatever remains is split with Pollard-Brent, certifying the factors with is_probable_prime.
+    """
+    factors: dict[int, int] = { }
+    
+    if n < 2:
+        return factors
+    
+    if n > SPF_LIMIT:
+        if store is not None:
+            store.extend_to(TRIAL_DIVISION_LIMIT)
+            trial_primes: Iterable[int] = store
+        else:
+            trial_primes = prime_segments(2, TRIAL_DIVISION_LIMIT)
+            trial_primes = (prime for segment in trial_primes for prime in segment)
+        
+        for p in trial_primes:
+            if p >= TRIAL_DIVISION_LIMIT or p * p > n or n <= SPF_LIMIT:
+                break
+            
+            while n % p == 0:
+                n //= p
+                factors[p] = factors.get(p, 0) + 1
+    
+    if n <= SPF_LIMIT:
+        table: array = smallest_prime_factors()
+        while n > 1:
+            p = table[n]
+            n //= p
+            factors[p] = factors.get(p, 0) + 1
+        
+        return dict(sorted(factors.items()))
+    
+    remaining: list[int] = [n]
+    while remaining:
+        current: int = remaining.pop()
+        
+        if is_probable_prime(current):
+            factors[current] = factors.get(current, 0) + 1
+            continue
+        
+        divisor: int = pollard_brent(current)
+        remaining.append(divisor)
+        remaining.append(current // divisor)
+    
+    return dict(sorted(factors.items()))
+
+
+def _residue_flags(modulus: int) -> bytes:
+    flags: bytearray = bytearray(modulus)
+    for i in range(modulus):
+        flags[i * i % modulus] = 1
+    
+    return bytes(flags)
+
+
+# squares modulo these, together they reject all but about 1 in 100 non-squares before isqrt is needed
+_SQUARES_MOD_64: bytes = _residue_flags(64)
+_SQUARES_MOD_63: bytes = _residue_flags(63)
+_SQUARES_MOD_65: bytes = _residue_flags(65)
+_SQUARES_MOD_11: bytes = _residue_flags(11)
+
+
+def square_root(n: int) -> int | None:
+    """ The exact square root of n, or None if n is not a square.
+    """
+    if n < 0 or not _SQUARES_MOD_64[n & 63]:
+        return None
+    
+    # one big-int division instead of three, 45045 = 63 * 65 * 11
+    r: int = n % 45045
+    if not (_SQUARES_MOD_63[r % 63] and _SQUARES_MOD_65[r % 65] and _SQUARES_MOD_11[r % 11]):
+        return None
+    
+    root: int = isqrt(n)
+    return root if root * root == n else None
+
+
+def integer_root(n: int, k: int) -> int:
+    """ floor(n^(1/k)) for n >= 0, exact for any size.
+    """
+    if n < 2:
+        return n
+    
+    # newton from above, starting with a power of two that is surely too large
+    x: int = 1 << -(-n.bit_length() // k)
+    while True:
+        y: int = ((k - 1) * x + n // x ** (k - 1)) // k
+        if y >= x:
+            return x
+        x = y
+
+
+def fermat(n: int, start: int | None = None) -> tuple[int, int, int]:
+    """ x, y with x^2 - y^2 = n, for the smallest x >= isqrt(n) (or `start`), and the amount of steps needed.
+    
+    n must not be 2 mod 4, those are no difference of squares.
+    """
+    x: int = isqrt(n) if start is None else start
+    if x * x < n:
+        x += 1
+    
+    # r = x^2 - n, updated with (x + 1)^2 = x^2 + 2x + 1
+    r: int = x * x - n
+    steps: int = 0
+    
+    while (y := square_root(r)) is None:
+        r += 2 * x + 1
+        x += 1
+        steps += 1
+    
+    return x, y, steps
+
+
+def lehman(n: int) -> int:
+    """ A non-trivial factor of n > 1, or n itself if it is prime, in O(n^(1/3)) steps.
+    
+    Trial division covers factors up to n^(1/3), beyond that one of the multipliers k makes 4kn a difference of
+    squares close to sqrt(4kn), even for unbalanced factors.
+    """
+    bound: int = integer_root(n, 3)
+    
+    # bound is rounded down, so up to bound + 1
+    for segment in prime_segments(2, bound + 2):
+        for p in segment:
+            if n % p == 0:
+                return p
+    
+    sixth_root: int = integer_root(n, 6)
+    
+    for k in range(1, bound + 1):
+        four_kn: int = 4 * k * n
+        root: int = isqrt(four_kn)
+        
+        # a <= sqrt(4kn) + n^(1/6) / (4 sqrt(k)), one more for rounding the roots down
+        for a in range(root if root * root == four_kn else root + 1, root + sixth_root // (4 * isqrt(k)) + 2):
+            b: int | None = square_root(a * a - four_kn)
+            
+            if b is not None and 1 < (g := gcd(a + b, n)) < n:
+                return g
+    
+    return n
+
+
+__all__ = [
+    "SEGMENT_SIZE",
+    "SMALL_PRIMES",
+    "odd_base_primes",
+    "prime_segments",
+    "iter_primes",
+    "jacobi",
+    "is_probable_prime",
+    "are_probable_primes",
+    "primes_in_range",
+    "PrimeStore",
+    "smallest_prime_factors",
+    "pollard_brent",
+    "factorize",
+    "square_root",
+    "integer_root",
+    "fermat",
+    "lehman",
+]
@@ -1,8 +1,19 @@
+import importlib
 import inspect
+import io
 import sys
-from dataclasses import dataclass, field
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext, redirect_stderr, redirect_stdout
+from contextvars import Token
+from dataclasses import dataclass, field, replace
 from inspect import Parameter, Signature
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, TextIO
+
+from tu_bs_scripts.render import OUTPUT, OUTPUT_FORMATS, PROFILERS, TRACING, OutputSettings, write_result
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
 
 
 @dataclass(frozen=True)
@@ -11,6 +22,8 @@ class Function:
     min_args: int
     max_args: int
     default_kwargs: dict[str, Any] = field(default_factory=dict)
+    # results are kept in the on-disk cache, only for commands whose whole output is the result
+    cache: bool = False
     
     MAX_ARG_COUNT: int = field(default=100, repr=False, init=False, hash=False)
 
@@ -44,14 +57,23 @@ def convert_if_possible(input_: list[str]) -> list[str | int | float]:
     return output
 
 
+class UsageError(Exception):
+    """ A command was called the wrong way, like with too few arguments.
+    """
+
+
 registered_functions: dict[str, Function] = { }
 
+# names of a module started with 'python -m', multiprocessing runs it as __mp_main__ in spawned workers
+MAIN_MODULES: tuple[str, ...] = ("__main__", "__mp_main__")
+
 
 def cli(
     name: str | Callable,
     default_kwargs: dict[str, Any] | None = None,
     force_min: int | None = None,
     force_max: int | None = None,
+    cache: bool = False,
 ) -> Any:
     if (force_min is not None and force_min < 0) or (force_max is not None and force_max < 0):
         raise RuntimeError(
@@ -71,7 +93,12 @@ def cli(
         function_name: str = name
         function_name = function_name.replace("_", "-")
         
-        if function_name in registered_functions:
+        existing: Function | None = registered_functions.get(function_name)
+        # a module started as a script registers its commands again once it is imported by its real name, like
+        # by the workers of a batch, that is the same function and replaces the first one
+        if existing is not None and not (
+            existing.method.__module__ in MAIN_MODULES and existing.method.__qualname__ == func.__qualname__
+        ):
             # TODO: change this to a good error
             raise KeyError(f"a function with the name '{function_name}' has already been registered")
         
@@ -101,7 +128,7 @@ def cli(
         if force_max is not None:
             max_args = force_max
         
-        registered_functions[function_name] = Function(func, min_args, max_args, default_kwargs)
+        registered_functions[function_name] = Function(func, min_args, max_args, default_kwargs, cache)
         
         return func
     
@@ -111,59 +138,516 @@ def cli(
     return decorator
 
 
+def find_function(function_name: str) -> Function | None:
+    if function_name not in registered_functions:
+        # not imported yet, the precomputed index knows which module registers it
+        from tu_bs_scripts.commands import COMMANDS
+        
+        if function_name not in COMMANDS:
+            return None
+        
+        importlib.import_module(COMMANDS[function_name][0])
+    
+    return registered_functions.get(function_name)
+
+
+# counters of the commands themselves (iterations and the like), only ever increased
+COUNTERS: Counter[str] = Counter()
+
+# functions returning the current value of counters kept elsewhere, like cache hits of an engine
+counter_hooks: list[Callable[[], dict[str, int]]] = []
+
+
+def counters(func: Callable[[], dict[str, int]]) -> Callable[[], dict[str, int]]:
+    counter_hooks.append(func)
+    return func
+
+
+def read_counters() -> Counter[str]:
+    values: Counter[str] = Counter(COUNTERS)
+    
+    for hook in counter_hooks:
+        values.update(hook())
+    
+    return values
+
+
+def max_bits(value: Any) -> int:
+    # bit length of the largest integer in value
+    if isinstance(value, int):
+        return abs(value).bit_length()
+    if isinstance(value, dict):
+        return max((max(max_bits(key), max_bits(item)) for key, item in value.items()), default=0)
+    if isinstance(value, (list, tuple, set)):
+        return max((max_bits(item) for item in value), default=0)
+    
+    return 0
+
+
+@dataclass
+class Measurement:
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    invocations: int = 0
+    # how much every counter changed
+    counters: Counter[str] = field(default_factory=Counter)
+    # largest integer among arguments and results
+    max_bits: int = 0
+    
+    def merge(self, other: "Measurement") -> None:
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.invocations += other.invocations
+        self.counters.update(other.counters)
+        self.max_bits = max(self.max_bits, other.max_bits)
+
+
+# called with the name and measurement of every instrumented invocation, batch and daemon sum them up
+measurement_hooks: list[Callable[[str, Measurement], None]] = []
+
+
+@contextmanager
+def collect_measurements() -> Iterator[Measurement]:
+    total: Measurement = Measurement()
+    
+    def hook(_: str, measurement: Measurement) -> None:
+        total.merge(measurement)
+    
+    measurement_hooks.append(hook)
+    try:
+        yield total
+    finally:
+        measurement_hooks.remove(hook)
+
+
+def report_measurement(label: str, measurement: Measurement) -> None:
+    """ Write the enabled parts of a measurement to stderr, keeping stdout clean for the results.
+    """
+    settings: OutputSettings = OUTPUT.get()
+    
+    if settings.time:
+        print(
+            f"time: {label}:",
+            f"{measurement.wall_seconds * 1000:.3f} ms wall, {measurement.cpu_seconds * 1000:.3f} ms cpu",
+            file=sys.stderr,
+        )
+    
+    if settings.stats:
+        values: list[str] = [f"{name}={value}" for name, value in sorted(measurement.counters.items())]
+        values.append(f"max bits={measurement.max_bits}")
+        print(f"stats: {label}: {", ".join(values)}", file=sys.stderr)
+
+
+def invoke(function_name: str, function: Function, args: list[Any]) -> Any:
+    # a hit only returns the result, commands opt in with @cli(cache=True) if nothing else is printed
+    if not (function.cache and OUTPUT.get().cache):
+        return function.method(*args, **function.default_kwargs)
+    
+    from tu_bs_scripts.cache import result_cache
+    
+    found, result = result_cache().get(function_name, args)
+    if found:
+        COUNTERS["result_cache.hits"] += 1
+        return result
+    
+    COUNTERS["result_cache.misses"] += 1
+    result = function.method(*args, **function.default_kwargs)
+    result_cache().put(function_name, args, result)
+    
+    return result
+
+
+def call_measured(function_name: str, function: Function, args: list[Any]) -> Any:
+    """ Call the function, timing, counting and profiling it as far as the output settings ask for.
+    """
+    settings: OutputSettings = OUTPUT.get()
+    
+    if not (settings.time or settings.stats or settings.profile):
+        return invoke(function_name, function, args)
+    
+    before: Counter[str] = read_counters() if settings.stats else Counter()
+    
+    profiler: Any = None
+    if settings.profile == "cpu":
+        import cProfile
+        
+        profiler = cProfile.Profile()
+    elif settings.profile == "memory":
+        import tracemalloc
+        
+        tracemalloc.start()
+    
+    start_time: float = time.perf_counter()
+    start_cpu_time: float = time.process_time()
+    
+    # still None if the command failed
+    result: Any = None
+    
+    # commands may exit() or raise, the profilers are stopped and what was measured so far is reported anyway
+    try:
+        if profiler is not None:
+            result = profiler.runcall(invoke, function_name, function, args)
+        else:
+            result = invoke(function_name, function, args)
+    finally:
+        measurement: Measurement = Measurement(
+            time.perf_counter() - start_time,
+            time.process_time() - start_cpu_time,
+            1,
+        )
+        
+        if settings.profile == "cpu":
+            import pstats
+            
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(20)
+        elif settings.profile == "memory":
+            snapshot: Any = tracemalloc.take_snapshot()
+            peak: int = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            
+            print(f"memory: {function_name}: peak {peak} bytes, largest allocations:", file=sys.stderr)
+            for statistic in snapshot.statistics("lineno")[:10]:
+                print(f"\t{statistic}", file=sys.stderr)
+        
+        if settings.stats:
+            # counters only increase, so this drops everything that did not change
+            measurement.counters = read_counters() - before
+            measurement.max_bits = max(max_bits(args), max_bits(result))
+        
+        report_measurement(function_name, measurement)
+        for hook in measurement_hooks:
+            hook(function_name, measurement)
+    
+    return result
+
+
 def run_function(function_name: str, *args: str) -> bool:
+    """ Run a command, returns False if there is no such command. Raises a UsageError if the arguments do not fit.
+    """
     function_name = function_name.lower()
     function_args: list[str] = list(args)
     
     new_function_args: list[str | int | float] = convert_if_possible(function_args)
     
-    if function_name not in registered_functions:
-        return False
+    function: Function | None = find_function(function_name)
     
-    function: Function = registered_functions[function_name]
+    if function is None:
+        return False
     
     if not (function.min_args <= len(new_function_args) <= function.max_args):
-        print(
-            "args are bad, expected",
-            function.min_args,
-            "to",
-            function.max_args,
-            "got",
-            len(new_function_args),
+        raise UsageError(
+            f"args are bad, expected {function.min_args} to {function.max_args} got {len(new_function_args)}",
         )
+    
+    settings: OutputSettings = OUTPUT.get()
+    
+    if settings.format == "text":
+        result: Any = call_measured(function_name, function, new_function_args)
+        
+        if result is not None:
+            print("result:", result)
+        
         return True
     
-    result: Any = function.method(*new_function_args, **function.default_kwargs)
+    # machine readable: tables, emitted items and the result go to the real stdout, everything else the command
+    # prints is dropped, unless it fails, then it is the error message and goes to stderr
+    token: Token = OUTPUT.set(replace(settings, stream=sys.stdout, tables=[], table_count=0, items=[], item_count=0))
+    # without --trace the explanations are not even built
+    tracing_token: Token = TRACING.set(TRACING.get() and settings.trace)
+    printed: io.StringIO = io.StringIO()
     
-    if result is not None:
-        print("result:", result)
+    try:
+        try:
+            with redirect_stdout(printed):
+                result = call_measured(function_name, function, new_function_args)
+        except (Exception, SystemExit):
+            sys.stderr.write(printed.getvalue())
+            raise
+        
+        write_result(function_name, new_function_args, result)
+    finally:
+        TRACING.reset(tracing_token)
+        OUTPUT.reset(token)
     
     return True
 
 
 def list_functions() -> None:
-    for name, info in sorted(registered_functions.items()):
-        if info.min_args == info.max_args:
-            print(f"\t{name} (args: {info.min_args})")
+    from tu_bs_scripts.commands import COMMANDS
+    
+    # (min, max) of every known command, imported or not
+    arg_counts: dict[str, tuple[int, int]] = { name: (info[1], info[2]) for name, info in COMMANDS.items() }
+    arg_counts.update({ name: (info.min_args, info.max_args) for name, info in registered_functions.items() })
+    
+    for name, (min_args, max_args) in sorted(arg_counts.items()):
+        if min_args == max_args:
+            print(f"\t{name} (args: {min_args})")
         else:
-            print(f"\t{name} (args: {info.min_args} to {info.max_args})")
+            print(f"\t{name} (args: {min_args} to {max_args})")
+
+
+warmup_hooks: list[Callable[[], None]] = []
+
+
+def warmup(func: Callable[[], None]) -> Callable[[], None]:
+    # expensive tables a module wants built once per worker process, before the first job arrives
+    warmup_hooks.append(func)
+    return func
+
+
+def run_warmup() -> None:
+    for hook in warmup_hooks:
+        hook()
+
+
+def init_worker(settings: OutputSettings) -> None:
+    """ Prepare a worker process of a batch pool or the daemon.
+    
+    Under spawn and forkserver nothing of the parent is inherited, and the lazy entry point never imported the
+    commands anyway. So the settings are passed in, every command module is imported and its warmup hooks run.
+    """
+    from tu_bs_scripts.registry import import_modules
+    
+    OUTPUT.set(settings)
+    import_modules()
+    run_warmup()
+
+
+def run_line(line_number: int, line: str) -> bool:
+    """ Run a single 'name arg arg...' line. Errors are written to stderr instead of raised, returns False if it
+    failed.
+    """
+    parts: list[str] = line.split()
+    
+    # empty lines and comments
+    if not parts or parts[0].startswith("#"):
+        return True
+    
+    # in text, a failing command prints its error message like any other output, so the output of a line is held
+    # back until it is done and goes to stderr next to the note if it failed. the machine formats do that already
+    printed: io.StringIO = io.StringIO()
+    capture: Any = redirect_stdout(printed) if OUTPUT.get().format == "text" else nullcontext()
+    error: str | None = None
+    
+    try:
+        with capture:
+            if not run_function(*parts):
+                error = f"cannot find function '{parts[0]}'"
+    except UsageError as e:
+        error = str(e)
+    except (Exception, SystemExit) as e:
+        # some commands still exit() on bad input, that must not end the batch
+        error = f"{type(e).__name__}: {e}"
+    
+    if error is not None:
+        sys.stderr.write(printed.getvalue())
+        print(f"line {line_number}: {error}", file=sys.stderr)
+        return False
+    
+    sys.stdout.write(printed.getvalue())
+    return True
+
+
+def run_line_captured(line_number: int, line: str) -> tuple[str, str, bool, Measurement]:
+    # worker side of run_batch_parallel and the daemon, output and errors are sent back to be written in order
+    output: io.StringIO = io.StringIO()
+    errors: io.StringIO = io.StringIO()
+    
+    with redirect_stdout(output), redirect_stderr(errors), collect_measurements() as measurement:
+        succeeded: bool = run_line(line_number, line)
+    
+    return output.getvalue(), errors.getvalue(), succeeded, measurement
+
+
+def report_total(measurement: Measurement) -> None:
+    # only if anything was measured at all
+    if measurement.invocations > 0:
+        report_measurement(f"total of {measurement.invocations}", measurement)
+
+
+def run_batch(lines: Iterable[str]) -> int:
+    """ Run one 'name arg arg...' invocation per line, all in this process, so every cache stays warm.
+    
+    Errors only fail their own line. Returns the amount of failed lines.
+    """
+    failures: int = 0
+    
+    with collect_measurements() as total:
+        for line_number, line in enumerate(lines, start=1):
+            if not run_line(line_number, line):
+                failures += 1
+            
+            sys.stdout.flush()
+    
+    report_total(total)
+    return failures
+
+
+def run_batch_parallel(lines: Iterable[str], jobs: int) -> int:
+    """ Like run_batch, but the lines are run by a pool of worker processes.
+    
+    Output keeps the order of the input. Everything that is finished and not waiting on an earlier line is
+    printed right away, even while the next input line is still being read, and at most a few lines per worker
+    are queued at once.
+    """
+    # expensive to import, most runs never need it
+    import threading
+    from concurrent.futures import ProcessPoolExecutor, wait
+    
+    failures: int = 0
+    window: int = 4 * jobs
+    pending: "deque[Future[tuple[str, str, bool, Measurement]]]" = deque()
+    # the input loop and the thread of the pool that finishes the lines both write results
+    lock: threading.Lock = threading.Lock()
+    # measured in the workers, summed up here
+    total: Measurement = Measurement()
+    
+    def write_result(future: "Future[tuple[str, str, bool, Measurement]]") -> None:
+        nonlocal failures
+        
+        output, errors, succeeded, measurement = future.result()
+        sys.stdout.write(output)
+        sys.stdout.flush()
+        sys.stderr.write(errors)
+        total.merge(measurement)
+        
+        if not succeeded:
+            failures += 1
+    
+    def write_finished(_: object = None) -> None:
+        with lock:
+            while pending and pending[0].done():
+                write_result(pending[0])
+                pending.popleft()
+    
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker, initargs=(OUTPUT.get(),)) as executor:
+        for line_number, line in enumerate(lines, start=1):
+            future: "Future[tuple[str, str, bool, Measurement]]" = executor.submit(run_line_captured, line_number, line)
+            with lock:
+                pending.append(future)
+            # runs as soon as the line is done, or right here if it already is
+            future.add_done_callback(write_finished)
+            
+            while True:
+                with lock:
+                    oldest: "Future[tuple[str, str, bool, Measurement]] | None" = (
+                        pending[0] if len(pending) > window else None
+                    )
+                if oldest is None:
+                    break
+                
+                wait([oldest])
+                write_finished()
+    
+    # every line is done once the pool is shut down, this only raises what a callback could not
+    write_finished()
+    
+    report_total(total)
+    return failures
+
+
+def pop_option(args: list[str], option: str, default: str | None = None) -> str | None:
+    # removes '--option value' from args, returning the value
+    if option not in args:
+        return default
+    
+    index: int = args.index(option)
+    value: str = args[index + 1] if index + 1 < len(args) else ""
+    del args[index:index + 2]
+    
+    return value
+
+
+def pop_flag(args: list[str], flag: str) -> bool:
+    # removes '--flag' from args, returning whether it was there
+    if flag not in args:
+        return False
+    
+    args.remove(flag)
+    return True
 
 
 def quick_run() -> None:
-    if len(sys.argv) <= 1:
+    # results like kgv over many numbers easily exceed the default limit of 4300 digits
+    sys.set_int_max_str_digits(0)
+    
+    argv: list[str] = sys.argv[1:]
+    
+    # options in front of the function name (or --batch)
+    settings: OutputSettings = OutputSettings()
+    
+    while argv and argv[0] in ("--format", "--trace", "--time", "--stats", "--profile", "--cache", "--no-cache"):
+        option: str = argv.pop(0)
+        
+        if option in ("--cache", "--no-cache"):
+            settings.cache = option == "--cache"
+        elif option == "--trace":
+            settings.trace = True
+        elif option == "--time":
+            settings.time = True
+        elif option == "--stats":
+            settings.stats = True
+        elif option == "--profile":
+            settings.profile = argv.pop(0) if argv else ""
+        else:
+            settings.format = argv.pop(0) if argv else ""
+    
+    if settings.format not in OUTPUT_FORMATS:
+        print(f"unknown format '{settings.format}', available are: {", ".join(OUTPUT_FORMATS)}")
+        exit(1)
+    
+    if settings.profile is not None and settings.profile not in PROFILERS:
+        print(f"unknown profiler '{settings.profile}', available are: {", ".join(PROFILERS)}")
+        exit(1)
+    
+    OUTPUT.set(settings)
+    
+    if argv and argv[0] == "--batch":
+        options: list[str] = argv[1:]
+        jobs: int = int(pop_option(options, "--jobs", "1"))
+        
+        # '--batch' reads stdin, '--batch file' reads the file
+        path: str = options[0] if options else "-"
+        # exit() closes sys.stdin, so stdin is read through its own file object
+        file: TextIO = open(sys.stdin.fileno(), closefd=False) if path == "-" else open(path)
+        
+        with file:
+            failures: int = run_batch(file) if jobs <= 1 else run_batch_parallel(file, jobs)
+        
+        if failures > 0:
+            exit(1)
+        return
+    
+    if not argv:
         print("no function name given")
         list_functions()
         exit(1)
     
-    function_name: str = sys.argv[1] if len(sys.argv) > 1 else ""
-    function_args: list[str] = sys.argv[2:]
+    function_name: str = argv[0]
+    function_args: list[str] = argv[1:]
     
-    if run_function(function_name, *function_args):
-        return
+    try:
+        if run_function(function_name, *function_args):
+            return
+    except UsageError as e:
+        print(e, file=sys.stderr)
+        exit(1)
     
     print(f"cannot find function '{function_name}', available are:")
     list_functions()
     exit(1)
 
 
-__all__ = ["quick_run", "cli"]
+__all__ = [
+    "quick_run",
+    "run_batch",
+    "run_batch_parallel",
+    "find_function",
+    "UsageError",
+    "cli",
+    "warmup",
+    "COUNTERS",
+    "counters",
+    "Measurement",
+    "measurement_hooks",
+]
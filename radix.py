@@ -0,0 +1,122 @@
+from math import log2
+
+DIGITS: str = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+MIN_BASE: int = 2
+MAX_BASE: int = len(DIGITS)
+
+# python converts these bases in linear time itself
+NATIVE_FORMATS: dict[int, str] = { 2: "b", 8: "o", 16: "X" }
+NATIVE_PARSE_BASES: frozenset[int] = frozenset((2, 4, 8, 16, 32))
+
+# below this many digits, int() and the plain digit loop are faster than splitting
+SPLIT_THRESHOLD: int = 1000
+
+# base ** (chunk * 2 ** i), per base
+_powers: dict[int, list[int]] = { }
+
+
+def chunk_size(base: int) -> int:
+    # digits per leaf, base ** chunk stays a small int
+    return int(60 / log2(base))
+
+
+def powers(base: int, level: int) -> list[int]:
+    """ base ** (chunk_size(base) * 2 ** i) for every i <= level, squared once and kept for later calls.
+    """
+    known: list[int] = _powers.setdefault(base, [base ** chunk_size(base)])
+    
+    while len(known) <= level:
+        known.append(known[-1] * known[-1])
+    
+    return known
+
+
+def check_base(base: int) -> None:
+    if not MIN_BASE <= base <= MAX_BASE:
+        raise ValueError(f"base must be between {MIN_BASE} and {MAX_BASE}, got {base}")
+
+
+def _leaf_digits(n: int, base: int, width: int) -> str:
+    digits: list[str] = []
+    
+    for _ in range(width):
+        n, digit = divmod(n, base)
+        digits.append(DIGITS[digit])
+    
+    return "".join(reversed(digits))
+
+
+def _split_digits(n: int, base: int, level: int, table: list[int]) -> str:
+    # exactly chunk * 2 ** level digits, n < table[level]
+    if level == 0:
+        return _leaf_digits(n, base, chunk_size(base))
+    
+    high, low = divmod(n, table[level - 1])
+    return _split_digits(high, base, level - 1, table) + _split_digits(low, base, level - 1, table)
+
+
+def to_base(n: int, base: int) -> str:
+    """ n in the given base, with the digits 0-9 and A-Z.
+    
+    Large numbers are split in halves by precomputed powers of the base, which lets the big-int division do most
+    of the work instead of one division per digit.
+    """
+    check_base(base)
+    
+    if n < 0:
+        return "-" + to_base(-n, base)
+    
+    if base in NATIVE_FORMATS:
+        return format(n, NATIVE_FORMATS[base])
+    if base == 10:
+        return str(n)
+    
+    # at least the amount of digits of n
+    width: int = 1 + int(n.bit_length() / log2(base))
+    if width <= SPLIT_THRESHOLD:
+        return _leaf_digits(n, base, width).lstrip("0") or "0"
+    
+    level: int = 0
+    table: list[int] = powers(base, level)
+    while n >= table[level]:
+        level += 1
+        table = powers(base, level)
+    
+    return _split_digits(n, base, level, table).lstrip("0") or "0"
+
+
+def from_base(digits: str, base: int) -> int:
+    """ Parse digits in the given base, the inverse of to_base. Letters may be upper or lower case.
+    
+    Long inputs are parsed in chunks that are combined pairwise, like a product tree.
+    """
+    check_base(base)
+    digits = digits.strip()
+    
+    if base in NATIVE_PARSE_BASES or base == 10 or len(digits) <= SPLIT_THRESHOLD:
+        return int(digits, base)
+    
+    if digits[:1] in ("-", "+"):
+        value: int = from_base(digits[1:], base)
+        return -value if digits[0] == "-" else value
+    
+    size: int = chunk_size(base)
+    
+    # least significant chunk first
+    values: list[int] = [
+        int(digits[max(end - size, 0):end], base) for end in range(len(digits), 0, -size)
+    ]
+    
+    level: int = 0
+    while len(values) > 1:
+        factor: int = powers(base, level)[level]
+        values = [
+            values[i] + values[i + 1] * factor if i + 1 < len(values) else values[i] for i in range(0, len(values), 2)
+        ]
+        level += 1
+    
+    return values[0]
+
+
+__all__ = ["DIGITS", "MIN_BASE", "MAX_BASE", "check_base", "to_base", "from_base"]
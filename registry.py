@@ -0,0 +1,109 @@
+import importlib
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from tu_bs_scripts.quick_cli import pop_option, registered_functions
+
+# every module that registers commands
+MODULES: tuple[str, ...] = (
+    "tu_bs_scripts.discmath",
+    "tu_bs_scripts.algebra",
+    "tu_bs_scripts.stochastik",
+    "tu_bs_scripts.lina",
+)
+
+INDEX_PATH: Path = Path(__file__).with_name("commands.py")
+
+IMPORT_TIME_LINE: re.Pattern = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_modules() -> None:
+    # importing registers every @cli function
+    for module in MODULES:
+        importlib.import_module(module)
+
+
+def generate_index() -> str:
+    import_modules()
+    
+    lines: list[str] = [
+        "# generated by 'python -m tu_bs_scripts.registry update', do not edit",
+        "# name: (module, min args, max args, default kwargs)",
+        "COMMANDS: dict[str, tuple[str, int, int, dict]] = {",
+    ]
+    
+    for name, function in sorted(registered_functions.items()):
+        lines.append(
+            f"    {name!r}: ({function.method.__module__!r}, {function.min_args}, {function.max_args}, "
+            f"{function.default_kwargs!r}),",
+        )
+    
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def import_time(command: list[str], repeats: int = 5) -> tuple[float, list[tuple[float, str]]]:
+    """ Total import time in ms of running a command through the lazy entry point, best of `repeats`.
+    
+    Also returns the cumulative time of every top level import of that run, slowest first.
+    """
+    best: tuple[float, list[tuple[float, str]]] | None = None
+    
+    for _ in range(repeats):
+        process: subprocess.CompletedProcess = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "tu_bs_scripts", *command],
+            capture_output=True,
+            text=True,
+        )
+        
+        total: float = 0
+        top_level: list[tuple[float, str]] = []
+        
+        for match in IMPORT_TIME_LINE.finditer(process.stderr):
+            self_us, cumulative_us, indentation, module = match.groups()
+            total += int(self_us) / 1000
+            
+            if not indentation:
+                top_level.append((int(cumulative_us) / 1000, module))
+        
+        if best is None or total < best[0]:
+            best = (total, sorted(top_level, reverse=True))
+    
+    return best
+
+
+def main() -> None:
+    args: list[str] = sys.argv[1:]
+    
+    if args[:1] == ["update"]:
+        INDEX_PATH.write_text(generate_index())
+        return
+    
+    if args[:1] == ["check"]:
+        if INDEX_PATH.read_text() != generate_index():
+            print(f"{INDEX_PATH.name} is outdated, run 'python -m tu_bs_scripts.registry update'")
+            exit(1)
+        return
+    
+    if args[:1] == ["importtime"]:
+        # fails if the startup takes longer than --max-ms
+        maximum: str | None = pop_option(args, "--max-ms")
+        total, top_level = import_time(args[1:] or ["is-prime", "7"])
+        
+        for cumulative, module in top_level[:10]:
+            print(f"{cumulative:8.2f} ms  {module}")
+        print(f"{total:8.2f} ms  total")
+        
+        if maximum is not None and total > float(maximum):
+            print(f"startup is slower than {maximum} ms")
+            exit(1)
+        return
+    
+    print("usage: registry update | check | importtime [--max-ms N] [<name> <args...>]")
+    exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, TextIO
+
+# text renders tables with tabulate, the others write the raw rows
+OUTPUT_FORMATS: tuple[str, ...] = ("text", "json", "ndjson", "csv")
+
+PROFILERS: tuple[str, ...] = ("cpu", "memory")
+
+
+@dataclass
+class OutputSettings:
+    format: str = "text"
+    # machine readable formats only contain the trace tables if asked for
+    trace: bool = False
+    # where machine readable output goes, plain prints of the commands are discarded in those formats
+    stream: TextIO | None = None
+    # json collects every table, it can only be written once the command is done
+    tables: list[dict[str, Any]] = field(default_factory=list)
+    table_count: int = 0
+    # results a command streams with emit(), json can only write them together with the result as well
+    items: list[Any] = field(default_factory=list)
+    item_count: int = 0
+    # instrumentation of every invocation, reported on stderr
+    time: bool = False
+    stats: bool = False
+    # 'cpu' (cProfile) or 'memory' (tracemalloc)
+    profile: str | None = None
+    # whether commands opting in reuse results of earlier runs, off unless --cache or TU_BS_USE_CACHE=1 asks for it
+    cache: bool = field(default_factory=lambda: os.environ.get("TU_BS_USE_CACHE", "0") != "0")
+
+
+OUTPUT: ContextVar[OutputSettings] = ContextVar("output", default=OutputSettings())
+
+# whether explanations (trace tables and prints) are produced at all, algorithms skip building them otherwise
+TRACING: ContextVar[bool] = ContextVar("tracing", default=True)
+
+
+def tracing() -> bool:
+    return TRACING.get()
+
+
+@contextmanager
+def quiet() -> Iterator[None]:
+    """ No traces inside, for internal calls that only need the result.
+    """
+    token = TRACING.set(False)
+    
+    try:
+        yield
+    finally:
+        TRACING.reset(token)
+
+
+def trace_print(*args: Any, **kwargs: Any) -> None:
+    if TRACING.get():
+        print(*args, **kwargs)
+
+
+def tabulate(*args: Any, **kwargs: Any) -> str:
+    # importing tabulate costs more than most commands take, so it only happens once a table is actually printed
+    from tabulate import tabulate as tabulate_
+    
+    return tabulate_(*args, **kwargs)
+
+
+def to_json(value: Any) -> str:
+    import json
+    
+    # tuples become lists, dict keys strings and anything unknown its str()
+    return json.dumps(value, default=str)
+
+
+class Table:
+    """ Rows of a trace table, written in the current output format.
+    
+    Text collects the rows and renders them with tabulate in show(). NDJSON and CSV write every row as soon as it
+    is added, so long traces never pile up in memory. If the table is not `enabled`, callers should not even build
+    the rows.
+    """
+    
+    def __init__(self, headers: Iterable[Any], **tabulate_kwargs: Any) -> None:
+        self.settings: OutputSettings = OUTPUT.get()
+        self.enabled: bool = TRACING.get() and (self.settings.format == "text" or self.settings.trace)
+        
+        if not self.enabled:
+            return
+        
+        self.headers: list[Any] = list(headers)
+        self.tabulate_kwargs: dict[str, Any] = tabulate_kwargs
+        self.rows: list[Iterable[Any]] = []
+        
+        self.index: int = self.settings.table_count
+        self.settings.table_count += 1
+        
+        self.csv_writer: Any = None
+        if self.settings.format == "csv" and self.settings.trace:
+            import csv
+            
+            self.csv_writer = csv.writer(self.settings.stream, lineterminator="\n")
+            self.csv_writer.writerow(self.headers)
+    
+    def add(self, row: Iterable[Any]) -> None:
+        if not self.enabled:
+            return
+        
+        settings: OutputSettings = self.settings
+        
+        if settings.format in ("text", "json"):
+            self.rows.append(row)
+        elif settings.format == "ndjson":
+            # rows may be longer than the headers, those cells are numbered
+            names: list[str] = [str(header) for header in self.headers]
+            cells: dict[str, Any] = { }
+            for i, value in enumerate(row):
+                cells[names[i] if i < len(names) else str(i)] = value
+            settings.stream.write(to_json({ "table": self.index, "row": cells }) + "\n")
+        elif settings.format == "csv":
+            self.csv_writer.writerow(row)
+    
+    def extend(self, rows: Iterable[Iterable[Any]]) -> None:
+        for row in rows:
+            self.add(row)
+    
+    def show(self) -> None:
+        if not self.enabled:
+            return
+        
+        settings: OutputSettings = self.settings
+        
+        if settings.format == "text":
+            print(tabulate(self.rows, headers=self.headers, **self.tabulate_kwargs))
+        elif settings.format == "json":
+            settings.tables.append({ "headers": self.headers, "rows": self.rows })
+        elif settings.format == "csv":
+            # blank line between tables
+            settings.stream.write("\n")
+
+
+def emit(value: Any, text: str | None = None) -> None:
+    """ One result of a command that produces many, like a line of a batch file, written in the current output
+    format. Unlike trace_print, this is never turned off.
+    
+    Text prints `text` (or the value), NDJSON writes the value as an item line and CSV as a row right away. JSON
+    collects the values and writes them with the result.
+    """
+    settings: OutputSettings = OUTPUT.get()
+    settings.item_count += 1
+    
+    if settings.format == "text":
+        print(value if text is None else text)
+    elif settings.format == "json":
+        settings.items.append(value)
+    elif settings.format == "ndjson":
+        settings.stream.write(to_json({ "item": value }) + "\n")
+    elif settings.format == "csv":
+        import csv
+        
+        writer: Any = csv.writer(settings.stream, lineterminator="\n")
+        if settings.item_count == 1:
+            writer.writerow(["item"])
+        writer.writerow(value if isinstance(value, (list, tuple)) else [value])
+
+
+def write_result(function_name: str, args: list[Any], result: Any) -> None:
+    """ The final output of a command in a machine readable format.
+    """
+    settings: OutputSettings = OUTPUT.get()
+    
+    if settings.format == "json":
+        output: dict[str, Any] = { "command": function_name, "args": args, "result": result }
+        if settings.item_count > 0:
+            output["items"] = settings.items
+        if settings.trace:
+            output["tables"] = settings.tables
+        settings.stream.write(to_json(output) + "\n")
+    elif settings.format == "ndjson":
+        settings.stream.write(to_json({ "command": function_name, "args": args, "result": result }) + "\n")
+    elif settings.format == "csv":
+        import csv
+        
+        writer: Any = csv.writer(settings.stream, lineterminator="\n")
+        if settings.item_count > 0:
+            # blank line after the items, like between tables
+            settings.stream.write("\n")
+        writer.writerow(["command", "result"])
+        writer.writerow([function_name, to_json(result) if isinstance(result, (list, tuple, dict)) else result])
+
+
+__all__ = [
+    "OUTPUT_FORMATS",
+    "PROFILERS",
+    "OutputSettings",
+    "OUTPUT",
+    "TRACING",
+    "tracing",
+    "quiet",
+    "trace_print",
+    "tabulate",
+    "Table",
+    "emit",
+    "write_result",
+]
@@ -0,0 +1,68 @@
+import importlib.util
+import os
+import subprocess
+import sys
+from pathlib import Path
+from random import Random
+from typing import Callable
+
+import pytest
+
+# the checkout is the package itself, which is only importable as tu_bs_scripts once it is cloned under that name
+ROOT: Path = Path(__file__).resolve().parent.parent
+
+if "tu_bs_scripts" not in sys.modules:
+    spec = importlib.util.spec_from_file_location(
+        "tu_bs_scripts",
+        ROOT / "__init__.py",
+        submodule_search_locations=[str(ROOT)],
+    )
+    package = importlib.util.module_from_spec(spec)
+    sys.modules["tu_bs_scripts"] = package
+    spec.loader.exec_module(package)
+
+# same inputs on every run, a failure can always be reproduced
+SEED: int = 0x7B5
+
+
+@pytest.fixture
+def rng() -> Random:
+    return Random(SEED)
+
+
+
+@pytest.fixture(scope="session")
+def package_path(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    # a directory with the checkout as tu_bs_scripts in it, for the entry points in a subprocess
+    path: Path = tmp_path_factory.mktemp("path")
+    (path / "tu_bs_scripts").symlink_to(ROOT)
+    
+    return path
+
+
+@pytest.fixture
+def module_environment(package_path: Path, tmp_path: Path) -> dict[str, str]:
+    # for the entry points in a subprocess, with their own result cache and no prime table
+    environment: dict[str, str] = { **os.environ, "PYTHONPATH": str(package_path) }
+    environment.pop("TU_BS_PRIME_TABLE", None)
+    environment["TU_BS_CACHE"] = str(tmp_path / "results.sqlite")
+    
+    return environment
+
+
+@pytest.fixture
+def run_module(module_environment: dict[str, str], tmp_path: Path) -> Callable[..., subprocess.CompletedProcess]:
+    """ Run 'python -m <module> <args...>' like a user would, with its own result cache and no prime table.
+    """
+    def run(module: str, *args: str, stdin: str = "", env: dict[str, str] | None = None) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            [sys.executable, "-m", module, *args],
+            input=stdin,
+            capture_output=True,
+            text=True,
+            env={ **module_environment, **(env or { }) },
+            cwd=tmp_path,
+            timeout=120,
+        )
+    
+    return run
@@ -0,0 +1,96 @@
+import select
+import subprocess
+import sys
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+RunModule = Callable[..., subprocess.CompletedProcess]
+
+LINES: str = "kgv 4 6\nis-prime 97\nbinom 5 2\n"
+RESULTS: list[str] = ["result: 12", "result: True", "result: 10"]
+
+
+@pytest.mark.parametrize("module", ["tu_bs_scripts", "tu_bs_scripts.discmath", "tu_bs_scripts.stochastik"])
+def test_jobs_through_every_entry_point(run_module: RunModule, tmp_path: Path, module: str) -> None:
+    # a module started with -m registers its commands as __main__, the workers import it once more
+    path: Path = tmp_path / "batch.txt"
+    path.write_text(LINES)
+    
+    process: subprocess.CompletedProcess = run_module(module, "--batch", str(path), "--jobs", "2")
+    
+    assert process.returncode == 0, process.stderr
+    assert process.stdout.splitlines() == RESULTS
+
+
+@pytest.mark.parametrize("jobs", ["1", "3"])
+def test_failures_only_fail_their_line(run_module: RunModule, jobs: str) -> None:
+    # a command that exit()s after printing its error, an unknown command and bad arguments, all from stdin
+    lines: str = "kgv 4 6\nggt 1000000 999999 1\nis-prime 97\nnosuch 1\n# comment\n\nbinom 5\nbinom 5 2\n"
+    
+    process: subprocess.CompletedProcess = run_module("tu_bs_scripts", "--batch", "--jobs", jobs, stdin=lines)
+    
+    assert process.returncode == 1
+    # the error message of the failing command is not mixed into the results
+    assert process.stdout.splitlines() == RESULTS
+    
+    errors: list[str] = process.stderr.splitlines()
+    assert errors[errors.index("line 2: SystemExit: 1") - 1] == "max iteration depth reached"
+    assert "line 4: cannot find function 'nosuch'" in errors
+    assert any(error.startswith("line 7: args are bad") for error in errors)
+
+
+def test_failures_in_machine_formats(run_module: RunModule) -> None:
+    lines: str = "kgv 4 6\nggt 1000000 999999 1\nis-prime 97\n"
+    
+    process: subprocess.CompletedProcess = run_module("tu_bs_scripts", "--format", "ndjson", "--batch", stdin=lines)
+    
+    assert process.returncode == 1
+    assert process.stdout.splitlines() == [
+        '{"command": "kgv", "args": [4, 6], "result": 12}',
+        '{"command": "is-prime", "args": [97], "result": true}',
+    ]
+    assert "max iteration depth reached\nline 2: SystemExit: 1\n" in process.stderr
+
+
+def test_results_do_not_wait_for_the_next_line(module_environment: dict[str, str], tmp_path: Path) -> None:
+    # like a pipe that delivers the lines slowly, every result must arrive while stdin is still open
+    process: subprocess.Popen = subprocess.Popen(
+        [sys.executable, "-m", "tu_bs_scripts", "--batch", "--jobs", "2"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        text=True,
+        env=module_environment,
+        cwd=tmp_path,
+    )
+    
+    try:
+        for line, result in zip(LINES.splitlines(), RESULTS):
+            process.stdin.write(line + "\n")
+            process.stdin.flush()
+            
+            readable, _, _ = select.select([process.stdout], [], [], 60)
+            assert readable, f"no result for '{line}' before the next line"
+            assert process.stdout.readline() == result + "\n"
+        
+        process.stdin.close()
+        assert process.wait(timeout=60) == 0
+    finally:
+        process.kill()
+        process.stdout.close()
+
+
+def test_failed_lines_are_measured(run_module: RunModule) -> None:
+    lines: str = "ggt 1000000 999999 1\nkgv 4 6\n"
+    
+    process: subprocess.CompletedProcess = run_module(
+        "tu_bs_scripts", "--time", "--profile", "memory", "--batch", stdin=lines
+    )
+    
+    # 'kind: label: ...', the allocations below the memory reports are indented
+    reports: list[str] = [":".join(line.split(":")[:2]) for line in process.stderr.splitlines() if line[:1].isalpha()]
+    # the profiler of the line that exit()ed is stopped before the next one starts
+    assert reports.count("memory: ggt") == reports.count("memory: kgv") == 1
+    assert "time: ggt" in reports
+    assert "time: total of 2" in reports
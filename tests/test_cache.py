@@ -0,0 +1,122 @@
+import sqlite3
+import subprocess
+from fractions import Fraction
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+from tu_bs_scripts import cache
+from tu_bs_scripts.cache import ResultCache
+
+RunModule = Callable[..., subprocess.CompletedProcess]
+
+# a prime, so prime-decomp needs a moment and returns a dict with int keys
+NUMBER: str = "1000000000000000003"
+
+
+@pytest.fixture
+def result_cache(tmp_path: Path) -> ResultCache:
+    return ResultCache(tmp_path / "results.sqlite")
+
+
+@pytest.mark.parametrize("result", [0, -7, 2 ** 5000, True, None, "text", [1, 2], (3, (4, 5)), { 2: 3, 7: 1 }, []])
+def test_round_trip(result_cache: ResultCache, result: Any) -> None:
+    assert result_cache.get("command", [1, "a"]) == (False, None)
+    
+    result_cache.put("command", [1, "a"], result)
+    found, value = result_cache.get("command", [1, "a"])
+    
+    assert found
+    assert value == result and type(value) is type(result)
+    # other arguments are another entry
+    assert result_cache.get("command", [1, "b"]) == (False, None)
+
+
+@pytest.mark.parametrize("result", [Fraction(1, 2), 0.5, { 1, 2 }, [1, object()]])
+def test_only_literals_are_stored(result_cache: ResultCache, result: Any) -> None:
+    result_cache.put("command", [], result)
+    
+    assert result_cache.get("command", []) == (False, None)
+
+
+def test_large_results_are_not_stored(result_cache: ResultCache, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(cache, "MAX_VALUE_SIZE", 100)
+    
+    result_cache.put("command", ["small"], list(range(10)))
+    result_cache.put("command", ["large"], list(range(100)))
+    
+    assert result_cache.get("command", ["small"]) == (True, list(range(10)))
+    assert result_cache.get("command", ["large"]) == (False, None)
+
+
+def test_entries_are_never_executed(result_cache: ResultCache) -> None:
+    with result_cache.connection as connection:
+        connection.execute(
+            "INSERT INTO entries (key, value, used) VALUES (?, ?, 0)",
+            (cache.cache_key("command", []), "__import__('os').system('false')"),
+        )
+    
+    assert result_cache.get("command", []) == (False, None)
+
+
+def test_pickles_of_old_files_are_dropped(tmp_path: Path) -> None:
+    path: Path = tmp_path / "results.sqlite"
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE results (key TEXT PRIMARY KEY, value BLOB NOT NULL, used REAL NOT NULL)")
+        connection.execute("INSERT INTO results VALUES (?, ?, 0)", (cache.cache_key("command", []), b"\x80\x04K\x07."))
+    
+    old: ResultCache = ResultCache(path)
+    
+    assert old.get("command", []) == (False, None)
+    assert len(old) == 0
+
+
+def test_least_recently_used_are_evicted(tmp_path: Path) -> None:
+    result_cache: ResultCache = ResultCache(tmp_path / "results.sqlite", max_entries=10)
+    
+    for i in range(30):
+        result_cache.put("command", [i], i)
+    
+    assert len(result_cache) <= 10
+    assert result_cache.get("command", [29]) == (True, 29)
+    assert result_cache.get("command", [0]) == (False, None)
+
+
+def test_old_entries_are_evicted(tmp_path: Path) -> None:
+    ResultCache(tmp_path / "results.sqlite").put("command", [1], 1)
+    
+    # every entry is too old for a maximum age of 0, the first store of a process drops them
+    result_cache: ResultCache = ResultCache(tmp_path / "results.sqlite", max_age=0)
+    result_cache.put("command", [2], 2)
+    
+    assert result_cache.get("command", [1]) == (False, None)
+
+
+def test_cache_is_opt_in(run_module: RunModule, tmp_path: Path) -> None:
+    process: subprocess.CompletedProcess = run_module("tu_bs_scripts", "prime-decomp", NUMBER)
+    
+    assert process.returncode == 0, process.stderr
+    assert not (tmp_path / "results.sqlite").exists()
+
+
+@pytest.mark.parametrize("options, env", [(["--cache"], { }), ([], { "TU_BS_USE_CACHE": "1" })])
+def test_cache_hits(run_module: RunModule, tmp_path: Path, options: list[str], env: dict[str, str]) -> None:
+    runs: list[subprocess.CompletedProcess] = [
+        run_module("tu_bs_scripts", "--stats", *options, "prime-decomp", NUMBER, env=env) for _ in range(2)
+    ]
+    
+    assert [run.stdout for run in runs] == [f"result: {{{NUMBER}: 1}}\n"] * 2
+    assert "result_cache.misses=1" in runs[0].stderr
+    assert "result_cache.hits=1" in runs[1].stderr
+    
+    # --no-cache wins over the environment
+    uncached: subprocess.CompletedProcess = run_module(
+        "tu_bs_scripts",
+        "--stats",
+        "--no-cache",
+        "prime-decomp",
+        NUMBER,
+        env=env,
+    )
+    assert "result_cache" not in uncached.stderr
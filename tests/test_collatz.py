@@ -0,0 +1,97 @@
+import json
+from collections import Counter
+
+import pytest
+
+from tu_bs_scripts import collatz
+from tu_bs_scripts.collatz import (
+    PEAK_LIMIT,
+    CollatzEngine,
+    CollatzStats,
+    chunk_bounds,
+    numpy_trajectories,
+    scan_chunk,
+    trajectory_summary,
+)
+
+
+def test_engine_matches_trajectories() -> None:
+    engine: CollatzEngine = CollatzEngine(1, 5000)
+    
+    assert [engine.stopping_time(n) for n in range(1, 5001)] == [trajectory_summary(n) for n in range(1, 5001)]
+    # every value of the range is computed once, the rest are lookups
+    assert engine.hits > 0 and engine.misses > 5000
+
+
+def test_memo_is_bounded(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(collatz, "MEMO_LIMIT", 100)
+    
+    engine: CollatzEngine = CollatzEngine(1000, 10 ** 9, lru_size=50)
+    assert (engine.end, len(engine.steps), CollatzEngine.buffer_size(1000, 10 ** 9)) == (1099, 100, 1000)
+    
+    # beyond the memo, values go through the lru cache
+    assert [engine.stopping_time(n) for n in range(1000, 3000)] == [trajectory_summary(n) for n in range(1000, 3000)]
+    assert len(engine.lru) == 50
+
+
+@pytest.mark.parametrize("n", [27, 2 ** 70 + 1])
+def test_entries_too_large_for_the_buffer(monkeypatch: pytest.MonkeyPatch, n: int) -> None:
+    # 27 takes 111 steps, real step counts beyond 16 bits need numbers of thousands of digits.
+    # 2^70 + 1 climbs beyond 64 bits
+    monkeypatch.setattr(collatz, "STEPS_LIMIT", 100)
+    engine: CollatzEngine = CollatzEngine(n, n + 5)
+    expected: tuple[int, int] = trajectory_summary(n)
+    
+    assert expected[0] > 100 or expected[1] > PEAK_LIMIT
+    assert engine.stopping_time(n) == expected
+    # the second time from the memo
+    assert engine.stopping_time(n) == expected
+    assert engine.hits == 1
+
+
+def naive_records(begin: int, end: int) -> tuple[int, int]:
+    # smallest starting numbers of the longest trajectory and of the highest peak
+    summaries: list[tuple[int, int]] = [trajectory_summary(n) for n in range(begin, end + 1)]
+    longest: int = max(range(len(summaries)), key=lambda i: (summaries[i][0], -i))
+    highest: int = max(range(len(summaries)), key=lambda i: (summaries[i][1], -i))
+    
+    return begin + longest, begin + highest
+
+
+def test_chunks_merge_to_the_whole_range() -> None:
+    total: CollatzStats = CollatzStats(2, 10_000)
+    for bounds in chunk_bounds(2, 10_000, 777):
+        total.merge(scan_chunk(bounds))
+    
+    assert (total.longest[1], total.highest[1]) == naive_records(2, 10_000)
+    assert total.histogram == Counter(trajectory_summary(n)[0] for n in range(2, 10_001))
+    assert sum(total.histogram.values()) == 9999
+
+
+@pytest.mark.parametrize("begin, end, chunk_size", [(1, 3000, 500), (1000, 20_000, 1234), (5, 5, 10)])
+def test_parallel_matches_sequential(run_module, begin: int, end: int, chunk_size: int) -> None:
+    args: list[str] = [str(begin), str(end)]
+    
+    parallel = run_module("tu_bs_scripts", "--format", "json", "collatz-parallel", *args, "2", str(chunk_size))
+    sequential = run_module("tu_bs_scripts", "--format", "json", "collatz-summary-q", *args)
+    
+    assert parallel.returncode == sequential.returncode == 0, parallel.stderr + sequential.stderr
+    expected: list[int] = list(naive_records(begin, end))
+    assert json.loads(parallel.stdout)["result"] == json.loads(sequential.stdout)["result"] == expected
+
+
+@pytest.mark.parametrize("glide", [False, True])
+@pytest.mark.parametrize("begin, end", [(1, 5000), (2 ** 61, 2 ** 61 + 300), (2 ** 62 - 100, 2 ** 62 + 100)])
+def test_numpy_trajectories(glide: bool, begin: int, end: int) -> None:
+    pytest.importorskip("numpy")
+    
+    steps, peaks, large = numpy_trajectories(begin, end, glide)
+    # the ones that left int64 are marked in the arrays and computed separately
+    results: list[tuple[int, int]] = [
+        large[n] if n in large else (int(steps[n - begin]), int(peaks[n - begin])) for n in range(begin, end + 1)
+    ]
+    
+    assert results == [trajectory_summary(n, glide) for n in range(begin, end + 1)]
+    assert all(steps[n - begin] == peaks[n - begin] == -1 for n in large)
+    if begin > 2 ** 62:
+        assert large
@@ -0,0 +1,91 @@
+from math import lcm, prod
+from random import Random
+
+import pytest
+
+from tu_bs_scripts.crt import (
+    REMAINDER_TREE_THRESHOLD,
+    CrtBasis,
+    cofactors,
+    cofactors_mod,
+    crt_basis,
+    garner,
+    parse_congruences,
+    product_tree,
+)
+
+SMALL_PRIMES: tuple[int, ...] = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47)
+
+
+def naive_solutions(remainders: list[int], moduli: list[int]) -> list[int]:
+    # every x below the combined modulus that satisfies all congruences
+    return [x for x in range(lcm(*moduli)) if all((x - a) % m == 0 for a, m in zip(remainders, moduli))]
+
+
+def test_parse_congruences() -> None:
+    assert parse_congruences(["2:3", "-1:5", "0:7"]) == ([2, -1, 0], [3, 5, 7])
+
+
+def test_garner_against_search(rng: Random) -> None:
+    for _ in range(500):
+        # moduli that are not coprime as well, contradictions included
+        moduli: list[int] = [rng.randrange(1, 30) for _ in range(rng.randrange(1, 4))]
+        remainders: list[int] = [rng.randrange(-50, 50) for _ in moduli]
+        solutions: list[int] = naive_solutions(remainders, moduli)
+        
+        if not solutions:
+            with pytest.raises(ArithmeticError):
+                garner(remainders, moduli)
+            continue
+        
+        assert garner(remainders, moduli) == (solutions[0], lcm(*moduli))
+        # the solution is unique modulo the lcm
+        assert len(solutions) == 1
+
+
+def test_garner_rejects_bad_moduli() -> None:
+    with pytest.raises(ArithmeticError):
+        garner([1], [0])
+    with pytest.raises(ArithmeticError):
+        garner([1, 2], [4, 6])
+
+
+def test_cofactors(rng: Random) -> None:
+    for count in (1, 2, 5, REMAINDER_TREE_THRESHOLD, REMAINDER_TREE_THRESHOLD + 1, 3 * REMAINDER_TREE_THRESHOLD):
+        moduli: list[int] = [rng.randrange(2, 10 ** 12) for _ in range(count)]
+        expected: list[int] = [prod(moduli[:i] + moduli[i + 1:]) for i in range(count)]
+        
+        assert cofactors(moduli) == expected
+        # the remainder tree is only used above the threshold
+        assert cofactors_mod(moduli) == [c % m for c, m in zip(expected, moduli)]
+
+
+def test_product_tree(rng: Random) -> None:
+    values: list[int] = [rng.randrange(1, 1000) for _ in range(13)]
+    tree: list[list[int]] = product_tree(values)
+    
+    assert tree[0] == values
+    assert tree[-1] == [prod(values)]
+    assert all(prod(level) == prod(values) for level in tree)
+
+
+def test_basis(rng: Random) -> None:
+    for _ in range(100):
+        moduli: tuple[int, ...] = tuple(rng.sample(SMALL_PRIMES, rng.randrange(1, 5)))
+        remainders: list[int] = [rng.randrange(m) for m in moduli]
+        basis: CrtBasis = crt_basis(moduli)
+        
+        assert basis.modulus == prod(moduli)
+        for i, e in enumerate(basis.basis):
+            assert [e % m for m in moduli] == [int(i == j) for j in range(len(moduli))]
+        # unique below the product, so satisfying every congruence is enough
+        x: int = basis.solve(remainders)
+        assert 0 <= x < basis.modulus
+        assert [x % m for m in moduli] == remainders
+
+
+def test_basis_errors() -> None:
+    with pytest.raises(ArithmeticError):
+        crt_basis((4, 6))
+    with pytest.raises(ValueError):
+        crt_basis((3, 5)).solve([1])
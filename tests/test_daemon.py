@@ -0,0 +1,124 @@
+import os
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+from tu_bs_scripts.daemon import request, socket_path
+
+RunModule = Callable[..., subprocess.CompletedProcess]
+
+
+@pytest.fixture
+def private_temp(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> Path:
+    # the shared temp directory, without a runtime directory of the user
+    monkeypatch.delenv("TU_BS_SOCKET", raising=False)
+    monkeypatch.delenv("XDG_RUNTIME_DIR", raising=False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    
+    return tmp_path / f"tu-bs-scripts-{os.getuid()}"
+
+
+def test_socket_in_a_private_directory(private_temp: Path) -> None:
+    # a client does not create it, without it there is no daemon
+    with pytest.raises(FileNotFoundError):
+        socket_path()
+    
+    assert socket_path(create=True) == str(private_temp / "daemon.sock")
+    assert stat.S_IMODE(private_temp.stat().st_mode) == 0o700
+    assert socket_path() == str(private_temp / "daemon.sock")
+
+
+def test_directory_others_can_enter_is_refused(private_temp: Path) -> None:
+    private_temp.mkdir()
+    private_temp.chmod(0o777)
+    
+    with pytest.raises(PermissionError):
+        socket_path(create=True)
+    
+    # a symlink, whoever owns the directory it points to
+    private_temp.rmdir()
+    (private_temp.parent / "elsewhere").mkdir(mode=0o700)
+    private_temp.symlink_to(private_temp.parent / "elsewhere")
+    
+    with pytest.raises(PermissionError):
+        socket_path(create=True)
+
+
+def serve_once(path: str, answer: bytes) -> threading.Thread:
+    # a fake daemon that answers a single request with `answer`
+    server: socket.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    
+    def answer_once() -> None:
+        with server:
+            connection, _ = server.accept()
+            with connection:
+                connection.recv(1024)
+                connection.sendall(answer)
+    
+    thread: threading.Thread = threading.Thread(target=answer_once, daemon=True)
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize("answer", [b"", b"garbage\n", b"OK x 0\n", b"MAYBE 1 0\nresult: 1\n", b"OK 3 0\nresult: 1\n"])
+def test_malformed_responses(tmp_path: Path, answer: bytes) -> None:
+    path: str = str(tmp_path / "fake.sock")
+    thread: threading.Thread = serve_once(path, answer)
+    
+    with pytest.raises(ValueError):
+        request("kgv 4 6", path)
+    thread.join()
+
+
+def test_client_falls_back_on_a_malformed_response(run_module: RunModule, tmp_path: Path) -> None:
+    path: str = str(tmp_path / "fake.sock")
+    thread: threading.Thread = serve_once(path, b"garbage\n")
+    
+    process: subprocess.CompletedProcess = run_module(
+        "tu_bs_scripts.daemon", "kgv", "4", "6", env={ "TU_BS_SOCKET": path }
+    )
+    thread.join()
+    
+    # computed by the client itself
+    assert (process.returncode, process.stdout) == (0, "result: 12\n"), process.stderr
+
+
+def test_serve(module_environment: dict[str, str], tmp_path: Path) -> None:
+    environment: dict[str, str] = { **module_environment, "TMPDIR": str(tmp_path) }
+    environment.pop("TU_BS_SOCKET", None)
+    environment.pop("XDG_RUNTIME_DIR", None)
+    
+    daemon: subprocess.Popen = subprocess.Popen(
+        [sys.executable, "-m", "tu_bs_scripts.daemon", "serve", "--jobs", "1"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+        env=environment,
+        cwd=tmp_path,
+    )
+    
+    try:
+        path: Path = tmp_path / f"tu-bs-scripts-{os.getuid()}" / "daemon.sock"
+        assert daemon.stdout.readline() == f"listening on {path} with 1 workers\n"
+        
+        # nobody else can even reach the socket
+        assert stat.S_IMODE(path.parent.stat().st_mode) == 0o700
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+        
+        assert request("kgv 4 6", str(path)) == ("result: 12\n", "", True)
+        assert request("nosuch 1", str(path)) == ("", "line 1: cannot find function 'nosuch'\n", False)
+    finally:
+        daemon.terminate()
+        daemon.wait(timeout=60)
+        daemon.stdout.close()
+    
+    assert not path.exists()
@@ -0,0 +1,86 @@
+from math import gcd, prod
+from random import Random
+
+import pytest
+
+from tu_bs_scripts.euclid import batch_gcd, batch_inverse, binary_gcd, extended_gcd, extended_gcd_steps, lehmer_gcd
+
+
+def random_pairs(rng: Random, count: int, bits: int) -> list[tuple[int, int]]:
+    pairs: list[tuple[int, int]] = []
+    for _ in range(count):
+        # a shared factor in some of them, so not every gcd is 1
+        common: int = rng.getrandbits(rng.randrange(1, bits)) or 1
+        pairs.append((common * rng.getrandbits(bits), common * rng.getrandbits(bits)))
+    
+    return [*pairs, (0, 0), (0, 7), (7, 0), (1, 1), (2 ** bits, 2 ** (bits // 2))]
+
+
+@pytest.mark.parametrize("bits", [8, 64, 1000, 5000])
+def test_binary_gcd(rng: Random, bits: int) -> None:
+    for a, b in random_pairs(rng, 100, bits):
+        assert binary_gcd(a, b) == gcd(a, b)
+
+
+@pytest.mark.parametrize("bits", [8, 64, 1000, 5000])
+def test_lehmer_gcd(rng: Random, bits: int) -> None:
+    for a, b in random_pairs(rng, 100, bits):
+        assert lehmer_gcd(a, b) == gcd(a, b)
+        assert lehmer_gcd(b, a) == gcd(a, b)
+
+
+@pytest.mark.parametrize("bits", [8, 64, 1000])
+def test_extended_gcd(rng: Random, bits: int) -> None:
+    for a, b in random_pairs(rng, 200, bits):
+        s, t, g = extended_gcd(a, b)
+        
+        assert g == gcd(a, b)
+        assert s * a + t * b == g
+
+
+def naive_steps(a: int, b: int) -> int:
+    steps: int = 0
+    while b != 0:
+        a, b = b, a % b
+        steps += 1
+    
+    return steps
+
+
+def test_extended_gcd_steps(rng: Random) -> None:
+    for a, b in random_pairs(rng, 200, 64):
+        assert extended_gcd_steps(a, b) == (*extended_gcd(a, b), naive_steps(a, b))
+
+
+@pytest.mark.parametrize("format", ["text", "json"])
+def test_ggt_ext_counts_iterations(run_module, format: str) -> None:
+    # text builds the table, json without --trace takes the path without it
+    process = run_module("tu_bs_scripts", "--stats", "--format", format, "ggt-ext", "240", "46")
+    
+    assert process.returncode == 0, process.stderr
+    assert f"ggt-ext.iterations={naive_steps(240, 46)}," in process.stderr
+
+
+def test_batch_inverse(rng: Random) -> None:
+    for _ in range(500):
+        modulus: int = rng.randrange(2, 10 ** 20)
+        values: list[int] = [rng.randrange(1, modulus) for _ in range(rng.randrange(1, 8))]
+        
+        if all(gcd(v, modulus) == 1 for v in values):
+            assert batch_inverse(values, modulus) == [pow(v, -1, modulus) for v in values]
+        else:
+            with pytest.raises(ArithmeticError):
+                batch_inverse(values, modulus)
+
+
+def test_batch_gcd(rng: Random) -> None:
+    primes: list[int] = [10 ** 9 + 7, 10 ** 9 + 9, 2 ** 31 - 1, 999999000001, 104729, 7919, 65537]
+    
+    for count in (0, 1, 2, 10, 100):
+        # moduli made of a few of the primes, so some of them share factors
+        moduli: list[int] = [prod(rng.sample(primes, 2)) * rng.randrange(1, 100) for _ in range(count)]
+        expected: list[int] = [
+            gcd(m, prod(moduli[:i] + moduli[i + 1:])) if count > 1 else 1 for i, m in enumerate(moduli)
+        ]
+        
+        assert batch_gcd(moduli) == expected
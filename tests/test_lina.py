@@ -0,0 +1,203 @@
+from fractions import Fraction
+from itertools import permutations
+from math import prod
+from random import Random
+
+import pytest
+
+from tu_bs_scripts.lina import Matrix, recurrence_terms
+
+PRIME: int = 1_000_003
+
+
+def random_rows(rng: Random, rows: int, columns: int, bound: int = 20, rank: int | None = None) -> list[list[int]]:
+    if rank is None:
+        return [[rng.randrange(-bound, bound + 1) for _ in range(columns)] for _ in range(rows)]
+    
+    # rows beyond `rank` are combinations of the first ones, so the rank is at most `rank`
+    basis: list[list[int]] = random_rows(rng, rank, columns, bound)
+    return [
+        *basis,
+        *([sum(rng.randrange(-3, 4) * row[j] for row in basis) for j in range(columns)] for _ in range(rows - rank)),
+    ]
+
+
+def naive_product(a: list[list[int]], b: list[list[int]]) -> list[list[int]]:
+    return [[sum(a[i][k] * b[k][j] for k in range(len(b))) for j in range(len(b[0]))] for i in range(len(a))]
+
+
+def naive_det(rows: list[list[int]]) -> int:
+    # Leibniz formula, the sign of a permutation from its inversions
+    n: int = len(rows)
+    total: int = 0
+    for permutation in permutations(range(n)):
+        inversions: int = sum(permutation[i] > permutation[j] for i in range(n) for j in range(i + 1, n))
+        total += (-1) ** inversions * prod(rows[i][permutation[i]] for i in range(n))
+    
+    return total
+
+
+def naive_rank(rows: list[list[int]]) -> int:
+    # plain gaussian elimination over the rationals
+    matrix: list[list[Fraction]] = [[Fraction(value) for value in row] for row in rows]
+    rank: int = 0
+    for column in range(len(matrix[0]) if matrix else 0):
+        pivot: int | None = next((i for i in range(rank, len(matrix)) if matrix[i][column] != 0), None)
+        if pivot is None:
+            continue
+        
+        matrix[rank], matrix[pivot] = matrix[pivot], matrix[rank]
+        for i in range(rank + 1, len(matrix)):
+            factor: Fraction = matrix[i][column] / matrix[rank][column]
+            matrix[i] = [a - factor * b for a, b in zip(matrix[i], matrix[rank])]
+        rank += 1
+    
+    return rank
+
+
+def identity(n: int) -> list[list[int]]:
+    return [[int(i == j) for j in range(n)] for i in range(n)]
+
+
+def test_multiply(rng: Random) -> None:
+    for _ in range(50):
+        n, k, m = rng.randrange(1, 6), rng.randrange(1, 6), rng.randrange(1, 6)
+        a: list[list[int]] = random_rows(rng, n, k)
+        b: list[list[int]] = random_rows(rng, k, m)
+        
+        assert (Matrix.from_rows(a) * Matrix.from_rows(b)).to_rows() == naive_product(a, b)
+        assert Matrix.from_rows(a).multiply(Matrix.from_rows(b), PRIME).to_rows() == [
+            [value % PRIME for value in row] for row in naive_product(a, b)
+        ]
+
+
+def test_det(rng: Random) -> None:
+    for _ in range(200):
+        n: int = rng.randrange(1, 6)
+        # singular ones as well
+        rows: list[list[int]] = random_rows(rng, n, n, rank=rng.randrange(1, n + 1))
+        
+        assert Matrix.from_rows(rows).det() == naive_det(rows)
+        assert Matrix.from_rows(rows).det(PRIME) == naive_det(rows) % PRIME
+
+
+def test_det_fractions(rng: Random) -> None:
+    for _ in range(50):
+        n: int = rng.randrange(1, 5)
+        rows: list[list[int]] = random_rows(rng, n, n)
+        scale: int = rng.randrange(1, 10)
+        
+        # dividing every entry by `scale` divides the determinant by scale^n
+        scaled: Matrix = Matrix.from_rows([[Fraction(value, scale) for value in row] for row in rows])
+        assert scaled.det() == Fraction(naive_det(rows), scale ** n)
+
+
+def test_rank(rng: Random) -> None:
+    for _ in range(200):
+        rows, columns = rng.randrange(1, 7), rng.randrange(1, 7)
+        matrix: list[list[int]] = random_rows(rng, rows, columns, rank=rng.randrange(1, rows + 1))
+        
+        assert Matrix.from_rows(matrix).rank() == naive_rank(matrix)
+
+
+def test_inverse(rng: Random) -> None:
+    for _ in range(100):
+        n: int = rng.randrange(1, 6)
+        rows: list[list[int]] = random_rows(rng, n, n)
+        matrix: Matrix = Matrix.from_rows(rows)
+        
+        if naive_det(rows) == 0:
+            with pytest.raises(ArithmeticError):
+                matrix.inverse()
+            continue
+        
+        assert (matrix * matrix.inverse()).to_rows() == identity(n)
+        assert (matrix.inverse() * matrix).to_rows() == identity(n)
+        
+        if naive_det(rows) % PRIME != 0:
+            assert matrix.multiply(matrix.inverse(PRIME), PRIME).to_rows() == identity(n)
+
+
+def test_solve(rng: Random) -> None:
+    for _ in range(100):
+        n: int = rng.randrange(1, 6)
+        rows: list[list[int]] = random_rows(rng, n, n)
+        if naive_det(rows) == 0:
+            continue
+        
+        b: list[int] = [rng.randrange(-50, 51) for _ in range(n)]
+        x: list[Fraction] = Matrix.from_rows(rows).solve(b)
+        assert [sum(a * v for a, v in zip(row, x)) for row in rows] == b
+        
+        if naive_det(rows) % PRIME != 0:
+            x_mod: list[int] = Matrix.from_rows(rows).solve(b, PRIME)
+            assert [sum(a * v for a, v in zip(row, x_mod)) % PRIME for row in rows] == [v % PRIME for v in b]
+
+
+def test_solve_errors() -> None:
+    with pytest.raises(ArithmeticError):
+        Matrix.from_rows([[1, 2], [2, 4]]).solve([1, 2])
+    with pytest.raises(ValueError):
+        Matrix.from_rows([[1, 2], [3, 4]]).solve([1])
+    with pytest.raises(ValueError):
+        Matrix.from_rows([[1, 2, 3], [4, 5, 6]]).det()
+
+
+def test_power(rng: Random) -> None:
+    for _ in range(50):
+        n: int = rng.randrange(1, 4)
+        rows: list[list[int]] = random_rows(rng, n, n, bound=5)
+        exponent: int = rng.randrange(0, 20)
+        
+        expected: list[list[int]] = identity(n)
+        for _ in range(exponent):
+            expected = naive_product(expected, rows)
+        
+        assert Matrix.from_rows(rows).power(exponent).to_rows() == expected
+        assert pow(Matrix.from_rows(rows), exponent, PRIME).to_rows() == [[v % PRIME for v in row] for row in expected]
+        
+        if naive_det(rows) != 0:
+            # a negative power undoes the positive one
+            matrix: Matrix = Matrix.from_rows(rows)
+            assert (matrix.power(exponent) * matrix.power(-exponent)).to_rows() == identity(n)
+
+
+def test_recurrence(rng: Random) -> None:
+    for _ in range(50):
+        k: int = rng.randrange(1, 5)
+        coefficients: list[int] = [rng.randrange(-3, 4) for _ in range(k)]
+        initial: list[int] = [rng.randrange(-5, 6) for _ in range(k)]
+        
+        # a(n + k) = c(1) * a(n + k - 1) + ... + c(k) * a(n)
+        terms: list[int] = list(initial)
+        while len(terms) < 200:
+            terms.append(sum(c * terms[-1 - i] for i, c in enumerate(coefficients)))
+        
+        indices: list[int] = [rng.randrange(200) for _ in range(10)]
+        assert recurrence_terms(coefficients, initial, indices) == [terms[i] for i in indices]
+        assert recurrence_terms(coefficients, initial, indices, PRIME) == [terms[i] % PRIME for i in indices]
+
+
+def test_fibonacci() -> None:
+    assert recurrence_terms([1, 1], [0, 1], [0, 1, 2, 10, 90]) == [0, 1, 1, 55, 2880067194370816120]
+
+
+@pytest.mark.parametrize("suffix", ["", "-float"])
+@pytest.mark.parametrize("command, rows, message", [
+    ("matrix-det", [], "the matrix needs at least one row"),
+    ("matrix-det", ["1,2,3", "4,5,6"], "a determinant needs a square matrix, this one is 2x3"),
+    ("matrix-rank", ["1,2", "3"], "all rows need the same amount of entries"),
+    ("matrix-inverse", ["1,2", "2,4"], "matrix is singular"),
+    ("matrix-solve", ["1,2", "3,4"], "a unique solution needs a square matrix, this one is 2x1"),
+    ("matrix-solve", ["1,2,3", "2,4,6"], "matrix is singular"),
+])
+def test_command_errors(run_module, suffix: str, command: str, rows: list[str], message: str) -> None:
+    if suffix:
+        pytest.importorskip("numpy")
+    
+    process = run_module("tu_bs_scripts", command + suffix, *rows)
+    
+    # a message instead of a traceback
+    assert process.returncode == 1
+    assert process.stdout.splitlines()[-1] == message
+    assert "Traceback" not in process.stderr
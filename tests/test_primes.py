@@ -0,0 +1,275 @@
+import os
+from math import isqrt, prod
+from random import Random
+
+import pytest
+
+from tu_bs_scripts.primes import (
+    MILLER_RABIN_BOUND,
+    SEGMENT_SIZE,
+    PrimeStore,
+    are_probable_primes,
+    factorize,
+    fermat,
+    integer_root,
+    is_probable_prime,
+    iter_primes,
+    jacobi,
+    lehman,
+    pollard_brent,
+    prime_segments,
+    primes_in_range,
+    square_root,
+)
+
+# Mersenne primes, far beyond the deterministic Miller-Rabin bound
+LARGE_PRIMES: tuple[int, ...] = (2 ** 61 - 1, 2 ** 89 - 1, 2 ** 107 - 1, 2 ** 127 - 1)
+
+# Carmichael numbers and strong pseudoprimes to the first few prime bases, the last one to the first 13
+PSEUDOPRIMES: tuple[int, ...] = (
+    561,
+    1105,
+    2047,
+    3215031751,
+    3825123056546413051,
+    318665857834031151167461,
+    MILLER_RABIN_BOUND,
+)
+
+
+def naive_is_prime(n: int) -> bool:
+    return n >= 2 and all(n % d != 0 for d in range(2, isqrt(n) + 1))
+
+
+def naive_factorize(n: int) -> dict[int, int]:
+    factors: dict[int, int] = { }
+    d: int = 2
+    while d * d <= n:
+        while n % d == 0:
+            factors[d] = factors.get(d, 0) + 1
+            n //= d
+        d += 1
+    if n > 1:
+        factors[n] = factors.get(n, 0) + 1
+    
+    return factors
+
+
+def naive_jacobi(a: int, n: int) -> int:
+    # product of the Legendre symbols of the prime factors, each by Euler's criterion
+    result: int = 1
+    for p, e in naive_factorize(n).items():
+        legendre: int = pow(a, (p - 1) // 2, p)
+        result *= (-1 if legendre == p - 1 else legendre) ** e
+    
+    return result
+
+
+def test_segments_match_trial_division() -> None:
+    limit: int = 5000
+    expected: list[int] = [n for n in range(limit) if naive_is_prime(n)]
+    
+    assert [p for segment in prime_segments(0, limit) for p in segment] == expected
+    assert [p for segment in prime_segments(0, limit, segment_size=64) for p in segment] == expected
+    assert list(iter_primes(limit - 1)) == expected
+
+
+def test_segments_across_boundaries(rng: Random) -> None:
+    for _ in range(20):
+        start: int = rng.randrange(10 ** 6)
+        stop: int = start + rng.randrange(1, 3 * SEGMENT_SIZE // 2)
+        
+        primes: list[int] = primes_in_range(start, stop)
+        assert primes == sorted(primes)
+        assert all(start <= p < stop for p in primes)
+        # sampled, trial division for the whole range is too slow
+        for n in rng.sample(range(start, stop), min(200, stop - start)):
+            assert (n in primes) == naive_is_prime(n)
+
+
+@pytest.mark.parametrize("n", [2, 30, 3 * SEGMENT_SIZE])
+def test_sieve_output(run_module, n: int) -> None:
+    expected: list[int] = primes_in_range(0, n + 1)
+    
+    # text: a line per segment, 2 is not a line of its own
+    lines: list[str] = run_module("tu_bs_scripts", "sieve-q", str(n)).stdout.splitlines()
+    assert lines[-1] == f"result: {len(expected)}"
+    assert lines[0].split()[:2] == [str(p) for p in expected[:2]]
+    assert [int(p) for line in lines[:-1] for p in line.split()] == expected
+    
+    # the machine formats have one item per prime
+    lines = run_module("tu_bs_scripts", "--format", "ndjson", "sieve-q", str(n)).stdout.splitlines()
+    assert lines[:-1] == [f'{{"item": {p}}}' for p in expected]
+    
+    lines = run_module("tu_bs_scripts", "--format", "csv", "sieve-q", str(n)).stdout.splitlines()
+    assert lines[:len(expected) + 1] == ["item", *map(str, expected)]
+
+
+def test_small_numbers() -> None:
+    assert [n for n in range(-5, 20000) if is_probable_prime(n)] == [n for n in range(20000) if naive_is_prime(n)]
+
+
+def test_random_numbers_agree_with_trial_division(rng: Random) -> None:
+    numbers: list[int] = [rng.randrange(2, 10 ** 10) for _ in range(300)]
+    
+    assert [is_probable_prime(n) for n in numbers] == [naive_is_prime(n) for n in numbers]
+    assert are_probable_primes(numbers) == [naive_is_prime(n) for n in numbers]
+
+
+@pytest.mark.parametrize("n", PSEUDOPRIMES)
+def test_pseudoprimes_are_composite(n: int) -> None:
+    assert not is_probable_prime(n)
+
+
+@pytest.mark.parametrize("p", LARGE_PRIMES)
+def test_large_primes(p: int) -> None:
+    assert is_probable_prime(p)
+    # products of two large primes need Baillie-PSW
+    assert not is_probable_prime(p * LARGE_PRIMES[0])
+    assert not is_probable_prime(p * p)
+
+
+def test_jacobi(rng: Random) -> None:
+    for _ in range(500):
+        n: int = rng.randrange(1, 10 ** 5) | 1
+        a: int = rng.randrange(-10 ** 6, 10 ** 6)
+        
+        assert jacobi(a, n) == naive_jacobi(a, n)
+
+
+def test_factorize_small(rng: Random) -> None:
+    for n in [*range(1, 2000), *(rng.randrange(2, 10 ** 10) for _ in range(200))]:
+        factors: dict[int, int] = factorize(n)
+        
+        assert factors == naive_factorize(n)
+        assert list(factors) == sorted(factors)
+
+
+def test_factorize_large(rng: Random) -> None:
+    for _ in range(10):
+        # a few small factors and two beyond trial division
+        expected: dict[int, int] = naive_factorize(rng.randrange(2, 10 ** 6))
+        for p in rng.sample([10 ** 9 + 7, 10 ** 9 + 9, 2 ** 31 - 1, 999999000001], 2):
+            expected[p] = expected.get(p, 0) + rng.randrange(1, 3)
+        
+        n: int = prod(p ** e for p, e in expected.items())
+        assert factorize(n) == dict(sorted(expected.items()))
+
+
+def test_pollard_brent(rng: Random) -> None:
+    for _ in range(50):
+        p, q = rng.sample([10 ** 9 + 7, 10 ** 9 + 9, 2 ** 31 - 1, 104729, 7919, 65537], 2)
+        factor: int = pollard_brent(p * q)
+        
+        assert factor in (p, q)
+
+
+def test_prime_store(tmp_path) -> None:
+    store: PrimeStore = PrimeStore()
+    store.extend_to(1000)
+    assert list(store) == [n for n in range(1001) if naive_is_prime(n)]
+    
+    # extending sieves only the new part, the result must be the same as a fresh sieve
+    store.extend_to(100_000)
+    assert list(store) == primes_in_range(0, 100_001)
+    
+    assert store.nth(1) == 2
+    assert store.nth(10_000) == 104729
+    with pytest.raises(IndexError):
+        store.nth(0)
+    
+    path: str = str(tmp_path / "primes.bin")
+    store.save(path)
+    loaded: PrimeStore = PrimeStore()
+    assert loaded.load(path)
+    assert (loaded.limit, list(loaded)) == (store.limit, list(store))
+    # a table that does not cover more is ignored
+    assert not loaded.load(path)
+    assert not PrimeStore().load(str(tmp_path / "missing.bin"))
+
+
+def test_prime_table_file(tmp_path) -> None:
+    path: str = str(tmp_path / "primes.bin")
+    store: PrimeStore = PrimeStore(path)
+    # nothing sieved yet, nothing to write
+    store.save_table()
+    assert not os.path.exists(path)
+    
+    store.extend_to(50_000)
+    store.save_table()
+    assert os.listdir(tmp_path) == ["primes.bin"]
+    
+    # the table is read on the first request that is not covered, not before
+    loaded: PrimeStore = PrimeStore(path)
+    assert loaded.table_limit is None
+    loaded.extend_to(40_000)
+    # read from the file, nothing sieved
+    assert (loaded.limit, loaded.hits, loaded.misses) == (store.limit, 1, 0)
+    assert list(loaded) == list(store)
+    
+    # covered by the table, so it is not written again
+    os.remove(path)
+    loaded.save_table()
+    assert not os.path.exists(path)
+
+
+def test_prime_table_only_saved_by_the_main_process(run_module, tmp_path) -> None:
+    path: str = str(tmp_path / "primes.bin")
+    # large enough for trial division by the stored primes
+    (tmp_path / "batch.txt").write_text("prime-decomp 1000000016000000063\nprime-decomp 999999000001\n")
+    
+    result = run_module(
+        "tu_bs_scripts", "--batch", "batch.txt", "--jobs", "2", env={ "TU_BS_PRIME_TABLE": path }
+    )
+    assert result.returncode == 0, result.stderr
+    # the workers sieved, the process that started them did not, so no table and no leftover temporary files
+    assert not [name for name in os.listdir(tmp_path) if name.startswith("primes.bin")]
+    
+    result = run_module("tu_bs_scripts", "prime-decomp", "999999000001", env={ "TU_BS_PRIME_TABLE": path })
+    assert result.returncode == 0, result.stderr
+    assert [name for name in os.listdir(tmp_path) if name.startswith("primes.bin")] == ["primes.bin"]
+    
+    table: PrimeStore = PrimeStore()
+    assert table.load(path)
+    assert list(table) == primes_in_range(0, table.limit + 1)
+
+
+def test_square_root(rng: Random) -> None:
+    for n in range(-10, 5000):
+        assert square_root(n) == (isqrt(n) if n >= 0 and isqrt(n) ** 2 == n else None)
+    
+    for _ in range(200):
+        root: int = rng.getrandbits(rng.randrange(1, 600))
+        assert square_root(root * root) == root
+        assert square_root(root * root + 1 + rng.randrange(2 * root + 1 if root else 1)) in (None, root + 1)
+
+
+def test_integer_root(rng: Random) -> None:
+    for _ in range(500):
+        n: int = rng.getrandbits(rng.randrange(1, 1500))
+        k: int = rng.randrange(1, 12)
+        x: int = integer_root(n, k)
+        
+        assert x ** k <= n < (x + 1) ** k
+
+
+def test_fermat(rng: Random) -> None:
+    for _ in range(200):
+        n: int = rng.randrange(1, 10 ** 5)
+        if n % 4 == 2:
+            continue
+        
+        x, y, steps = fermat(n)
+        assert x * x - y * y == n
+        # the smallest such x, every x between isqrt(n) and it was tried
+        assert not any(square_root(z * z - n) is not None for z in range(isqrt(n - 1) + 1, x))
+
+
+def test_lehman(rng: Random) -> None:
+    for n in [*range(2, 3000), *(rng.randrange(2, 10 ** 12) for _ in range(200))]:
+        factor: int = lehman(n)
+        
+        if naive_is_prime(n):
+            assert factor == n
+        else:
+            assert 1 < factor < n and n % factor == 0
@@ -0,0 +1,65 @@
+from random import Random
+
+import pytest
+
+from tu_bs_scripts.radix import DIGITS, MAX_BASE, MIN_BASE, SPLIT_THRESHOLD, check_base, from_base, to_base
+
+
+def naive_to_base(n: int, base: int) -> str:
+    # one division per digit, like on paper
+    if n < 0:
+        return "-" + naive_to_base(-n, base)
+    
+    digits: list[str] = []
+    while True:
+        n, digit = divmod(n, base)
+        digits.append(DIGITS[digit])
+        if n == 0:
+            return "".join(reversed(digits))
+
+
+def naive_from_base(digits: str, base: int) -> int:
+    value: int = 0
+    for digit in digits.upper():
+        value = value * base + DIGITS.index(digit)
+    
+    return value
+
+
+@pytest.mark.parametrize("base", range(MIN_BASE, MAX_BASE + 1))
+def test_small_numbers(rng: Random, base: int) -> None:
+    for n in [*range(-40, 40), *(rng.getrandbits(rng.randrange(1, 200)) for _ in range(50))]:
+        digits: str = to_base(n, base)
+        
+        assert digits == naive_to_base(n, base)
+        assert from_base(digits, base) == n
+        assert from_base(digits.lower(), base) == n
+
+
+# 10 is left out, python itself refuses to convert decimal numbers of this size
+@pytest.mark.parametrize("base", [2, 3, 7, 16, 27, 36])
+def test_large_numbers(rng: Random, base: int) -> None:
+    # beyond SPLIT_THRESHOLD digits, where both directions split the number
+    for bits in (4 * SPLIT_THRESHOLD, 20 * SPLIT_THRESHOLD, 50 * SPLIT_THRESHOLD):
+        n: int = rng.getrandbits(bits) | (1 << (bits - 1))
+        digits: str = to_base(n, base)
+        
+        assert digits == naive_to_base(n, base)
+        assert from_base(digits, base) == naive_from_base(digits, base) == n
+        assert from_base("-" + digits, base) == -n
+
+
+def test_leading_zeros_and_whitespace() -> None:
+    assert from_base("  000Z ", 36) == 35
+    assert from_base("0" * (2 * SPLIT_THRESHOLD) + "11", 3) == 4
+    assert to_base(3 ** (2 * SPLIT_THRESHOLD), 3) == "1" + "0" * (2 * SPLIT_THRESHOLD)
+
+
+@pytest.mark.parametrize("base", [-2, 0, 1, MAX_BASE + 1])
+def test_invalid_bases(base: int) -> None:
+    with pytest.raises(ValueError):
+        check_base(base)
+    with pytest.raises(ValueError):
+        to_base(5, base)
+    with pytest.raises(ValueError):
+        from_base("1", base)
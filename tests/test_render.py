@@ -0,0 +1,122 @@
+import io
+import json
+import subprocess
+import sys
+from contextvars import Token
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+
+from tu_bs_scripts.render import OUTPUT, TRACING, OutputSettings, Table, emit, quiet, write_result
+
+RunModule = Callable[..., subprocess.CompletedProcess]
+
+
+@pytest.fixture(params=["json", "ndjson", "csv"])
+def settings(request: pytest.FixtureRequest) -> Iterator[OutputSettings]:
+    # a machine readable format with the trace tables, written into a string
+    settings: OutputSettings = OutputSettings(format=request.param, trace=True, stream=io.StringIO())
+    token: Token = OUTPUT.set(settings)
+    
+    yield settings
+    
+    OUTPUT.reset(token)
+
+
+def run_command(settings: OutputSettings) -> str:
+    # a table with a row longer than its headers, two items and a result
+    table: Table = Table(["a", "b"])
+    table.add([1, "x"])
+    table.add([2, "y", 3.5])
+    table.show()
+    
+    emit(7)
+    emit([8, 9])
+    write_result("test", [1, 2], { "k": (1, 2) })
+    
+    return settings.stream.getvalue()
+
+
+def test_machine_formats(settings: OutputSettings) -> None:
+    output: str = run_command(settings)
+    
+    if settings.format == "json":
+        assert json.loads(output) == {
+            "command": "test",
+            "args": [1, 2],
+            "result": { "k": [1, 2] },
+            "items": [7, [8, 9]],
+            "tables": [{ "headers": ["a", "b"], "rows": [[1, "x"], [2, "y", 3.5]] }],
+        }
+    elif settings.format == "ndjson":
+        assert [json.loads(line) for line in output.splitlines()] == [
+            { "table": 0, "row": { "a": 1, "b": "x" } },
+            { "table": 0, "row": { "a": 2, "b": "y", "2": 3.5 } },
+            { "item": 7 },
+            { "item": [8, 9] },
+            { "command": "test", "args": [1, 2], "result": { "k": [1, 2] } },
+        ]
+    else:
+        assert output == 'a,b\n1,x\n2,y,3.5\n\nitem\n7\n8,9\n\ncommand,result\ntest,"{""k"": [1, 2]}"\n'
+
+
+def test_tables_need_trace(settings: OutputSettings) -> None:
+    settings.trace = False
+    assert not Table(["a"]).enabled
+    
+    settings.trace = True
+    with quiet():
+        assert not TRACING.get()
+        assert not Table(["a"]).enabled
+    assert Table(["a"]).enabled
+
+
+def test_text(capsys: pytest.CaptureFixture[str]) -> None:
+    emit([1, 2], "1 2")
+    emit(3)
+    
+    table: Table = Table(["a", "b"], tablefmt="plain")
+    table.add([1, 2])
+    table.show()
+    
+    lines: list[str] = capsys.readouterr().out.splitlines()
+    assert lines[:2] == ["1 2", "3"]
+    assert [line.split() for line in lines[2:]] == [["a", "b"], ["1", "2"]]
+
+
+@pytest.mark.parametrize("format", ["json", "ndjson", "csv"])
+def test_errors_go_to_stderr(run_module: RunModule, format: str) -> None:
+    # ggt prints its error before it exits, nothing of it is machine readable
+    process: subprocess.CompletedProcess = run_module(
+        "tu_bs_scripts", "--format", format, "ggt", "1000000", "999999", "1"
+    )
+    
+    assert process.returncode == 1
+    assert process.stdout == ""
+    assert "max iteration depth reached" in process.stderr
+
+
+def test_plain_prints_are_dropped(run_module: RunModule) -> None:
+    # the explanations of collatz-summary are prints, only the result is left
+    process: subprocess.CompletedProcess = run_module("tu_bs_scripts", "--format", "json", "collatz-summary", "1", "30")
+    
+    assert process.returncode == 0, process.stderr
+    assert json.loads(process.stdout) == { "command": "collatz-summary", "args": [1, 30], "result": [27, 27] }
+
+
+def test_tabulate_is_not_imported(module_environment: dict[str, str], tmp_path: Path) -> None:
+    # importing it costs more than most commands, the machine formats never need it
+    process: subprocess.CompletedProcess = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "tu_bs_scripts", "--format", "json", "--trace", "ggt", "12", "8"],
+        capture_output=True,
+        text=True,
+        env=module_environment,
+        cwd=tmp_path,
+    )
+    
+    assert process.returncode == 0, process.stderr
+    assert json.loads(process.stdout)["tables"]
+    # the command and what it needs were imported
+    assert "tu_bs_scripts.primes" in process.stderr
+    assert "tabulate" not in process.stderr